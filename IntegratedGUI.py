@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk, ImageOps, ImageDraw, ImageFont
+from render_tk import PuenteRender, manejador_imagen
 import threading
 import cv2
 from deepface import DeepFace
@@ -74,6 +75,12 @@ class EmotionDashboard:
         self.emoji_panel = tk.Label(self.video_area, bg="black", width=150)
         self.emoji_panel.pack(side="right", fill="y")
 
+        # El hilo de detección publica imágenes; el hilo de Tk las muestra con after()
+        self.render = PuenteRender(self.root)
+        self.render.registrar("video", manejador_imagen(self.video_label))
+        self.render.registrar("emoji", manejador_imagen(self.emoji_panel))
+        self.render.iniciar()
+
     def iniciar(self):
         self.running = True
         modelo = self.selected_model.get()
@@ -170,9 +177,7 @@ class EmotionDashboard:
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             pil = Image.fromarray(rgb)
             pil = ImageOps.contain(pil, (780, 440))
-            tk_img = ImageTk.PhotoImage(pil)
-            self.video_label.imgtk = tk_img
-            self.video_label.configure(image=tk_img)
+            self.render.publicar("video", pil)
 
             # render emoji
             if detected_emotion in emoji_imgs:
@@ -188,13 +193,11 @@ class EmotionDashboard:
                 text = f"{detected_emotion.capitalize()}\n{conf}%"
                 draw.text((30, 270), text, font=font, fill=(255,255,255,255))
 
-                tk_emo = ImageTk.PhotoImage(canvas)
-                self.emoji_panel.imgtk = tk_emo
-                self.emoji_panel.configure(image=tk_emo)
+                self.render.publicar("emoji", canvas)
 
         cap.release()
-        self.video_label.configure(image="")
-        self.emoji_panel.configure(image="")
+        self.render.publicar("video", None)
+        self.render.publicar("emoji", None)
 
 if __name__ == "__main__":
     root = tk.Tk()
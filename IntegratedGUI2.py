@@ -8,7 +8,8 @@ import numpy as np
 import os
 import sys
 import time
-from collections import Counter
+from suavizado import SuavizadorEmociones
+from render_tk import PuenteRender, manejador_imagen, manejador_texto
 import csv
 import os
 import tkinter as tk
@@ -34,7 +35,7 @@ class EmotionDashboard:
         self.running = False
         self.use_hist_eq = tk.IntVar(value=1)
         self.smoothing_window = 5
-        self.last_emotions = []
+        self.suavizador = SuavizadorEmociones(self.smoothing_window, modo="mayoria")
         self.frame_times = []
 
         # ---- Menú izquierdo ----
@@ -122,6 +123,16 @@ class EmotionDashboard:
         # Mostrar bienvenida inicialmente
         self.show_welcome()
 
+        # ---- Puente de render: el hilo de detección publica, Tk muestra con after() ----
+        self.usar_hist = self.use_hist_eq.get() == 1
+        self.use_hist_eq.trace_add("write", lambda *_: setattr(self, "usar_hist", self.use_hist_eq.get() == 1))
+        self.render = PuenteRender(self.root)
+        self.render.registrar("video", manejador_imagen(self.video_label))
+        self.render.registrar("emoji", manejador_imagen(self.emoji_panel))
+        self.render.registrar("rostros", manejador_texto(self.face_count_label))
+        self.render.registrar("fps", manejador_texto(self.fps_label))
+        self.render.iniciar()
+
         # ---- Carga de emojis ----
         self.emotion_labels = ["angry","disgust","fear","happy","sad","surprise","neutral"]
         self.emoji_imgs = {}
@@ -173,13 +184,13 @@ class EmotionDashboard:
             ret, frame = cap.read()
             if not ret: break
 
-            if self.use_hist_eq.get() == 1:
+            if self.usar_hist:
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 gray = cv2.equalizeHist(gray)
                 frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
 
             faces = self.detector.detect_emotions(frame)
-            self.face_count_label.config(text=f"Rostros: {len(faces)}")
+            self.render.publicar("rostros", f"Rostros: {len(faces)}")
 
             emo, conf = None, 0
             if faces:
@@ -188,10 +199,8 @@ class EmotionDashboard:
                 best = max(emotions, key=emotions.get)
                 conf = int(emotions[best] * 100)
                 emo = best
-                self.last_emotions.append(emo)
-                if len(self.last_emotions) > self.smoothing_window:
-                    self.last_emotions.pop(0)
-                emo = Counter(self.last_emotions).most_common(1)[0][0]
+                self.suavizador.agregar(emotions)
+                emo, _ = self.suavizador.dominante()
                 x,y,w,h = box
                 cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,0), 2)
                 cv2.putText(frame, f"{emo} ({conf}%)", (x, y-10),
@@ -200,9 +209,7 @@ class EmotionDashboard:
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             pil = Image.fromarray(rgb)
             pil = ImageOps.contain(pil, (780, 440))
-            tk_img = ImageTk.PhotoImage(pil)
-            self.video_label.imgtk = tk_img
-            self.video_label.configure(image=tk_img)
+            self.render.publicar("video", pil)
 
             # Emoji panel update
             if emo in self.emoji_imgs:
@@ -215,9 +222,7 @@ class EmotionDashboard:
                 draw = ImageDraw.Draw(canvas)
                 font = ImageFont.load_default()
                 draw.text((30,270), f"{emo.capitalize()}\n{conf}%", font=font, fill=(255,255,255,255))
-                tk_e = ImageTk.PhotoImage(canvas)
-                self.emoji_panel.imgtk = tk_e
-                self.emoji_panel.configure(image=tk_e)
+                self.render.publicar("emoji", canvas)
 
             frame_time = time.time() - start
             self.frame_times.append(frame_time)
@@ -225,12 +230,12 @@ class EmotionDashboard:
                 self.frame_times.pop(0)
             if time.time() - last_time >= 1.0:
                 fps = len(self.frame_times) / sum(self.frame_times)
-                self.fps_label.config(text=f"FPS: {fps:.1f}")
+                self.render.publicar("fps", f"FPS: {fps:.1f}")
                 last_time = time.time()
 
         cap.release()
-        self.video_label.configure(image=None)
-        self.emoji_panel.configure(image=None)
+        self.render.publicar("video", None)
+        self.render.publicar("emoji", None)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+
+from suavizado import EMOCIONES
+from bitacora_emociones import SumideroAsincrono
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("almacen_columnar")
+
+MANIFIESTO = "manifiesto.json"
+CUANTIZACIONES = ("uint8", "float16")
+
+
+def cuantizar(probabilidades, tipo):
+    """Probabilidades [0, 1] a uint8 (pasos de 1/255) o float16"""
+    if tipo == "uint8":
+        return np.rint(np.clip(probabilidades, 0.0, 1.0) * 255.0).astype(np.uint8)
+    return probabilidades.astype(np.float16)
+
+
+def decuantizar(valores):
+    if valores.dtype == np.uint8:
+        return valores.astype(np.float32) / 255.0
+    return valores.astype(np.float32)
+
+
+class AlmacenColumnar(SumideroAsincrono):
+    """
+    Resultados de detección en bloques columnares .npz dentro de un
+    directorio. Cada bloque guarda columnas separadas (timestamp, pista,
+    usuario codificado, probabilidades cuantizadas, caja, fps) y el
+    manifiesto registra el rango de tiempo de cada bloque, de modo que un
+    lector puede saltarse los que no necesita sin abrirlos.
+
+    Un bloque se escribe al juntar `filas_bloque` filas o cuando el más
+    antiguo pendiente tiene más de `segundos_bloque` segundos (se comprueba
+    también sin eventos nuevos, en cada vuelta del hilo escritor).
+    """
+
+    nombre = "columnar"
+
+    def __init__(self, directorio, filas_bloque=5000, segundos_bloque=60.0, cuantizacion="uint8",
+                 comprimir=True, **kwargs):
+        super().__init__(**kwargs)
+        if cuantizacion not in CUANTIZACIONES:
+            raise ValueError(f"Cuantización desconocida: {cuantizacion}")
+        self.directorio = directorio
+        self.filas_bloque = filas_bloque
+        self.segundos_bloque = segundos_bloque
+        self.cuantizacion = cuantizacion
+        self.comprimir = comprimir
+        self.pendientes = []
+        self.pendiente_desde = None
+        self.manifiesto = {"version": 1, "emociones": EMOCIONES, "bloques": []}
+
+    def abrir(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self.manifiesto = cargar_manifiesto(self.directorio) or self.manifiesto
+
+    def cerrar(self):
+        if self.pendientes:
+            self._escribir_bloque()
+
+    def escribir_lote(self, eventos):
+        if not self.pendientes:
+            self.pendiente_desde = time.monotonic()
+        self.pendientes.extend(eventos)
+        if len(self.pendientes) >= self.filas_bloque:
+            self._escribir_bloque()
+        else:
+            self.vaciar_si_toca()
+
+    def vaciar_si_toca(self):
+        if self.pendientes and time.monotonic() - self.pendiente_desde >= self.segundos_bloque:
+            self._escribir_bloque()
+
+    def _escribir_bloque(self):
+        eventos = sorted(self.pendientes, key=lambda e: e["timestamp"])
+        self.pendientes = []
+        usuarios, codigos = np.unique([e["usuario"] for e in eventos], return_inverse=True)
+        probabilidades = np.array([[e[emo] for emo in EMOCIONES] for e in eventos], dtype=np.float32)
+        columnas = {
+            "timestamp": np.array([e["timestamp"] for e in eventos], dtype=np.float64),
+            "pista": np.array([e["pista"] for e in eventos], dtype=np.int32),
+            "usuario": codigos.astype(np.uint16),
+            "usuarios": usuarios.astype(str),
+            "probabilidades": cuantizar(probabilidades, self.cuantizacion),
+            "caja": np.array([[e["x"], e["y"], e["w"], e["h"]] for e in eventos], dtype=np.int16),
+            "fps": np.array([e["fps"] for e in eventos], dtype=np.float16)
+        }
+        numero = len(self.manifiesto["bloques"])
+        archivo = f"bloque_{numero:06d}.npz"
+        ruta = os.path.join(self.directorio, archivo)
+        guardar = np.savez_compressed if self.comprimir else np.savez
+        with open(ruta + ".tmp", "wb") as f:
+            guardar(f, **columnas)
+        os.replace(ruta + ".tmp", ruta)
+
+        self.manifiesto["bloques"].append({
+            "archivo": archivo,
+            "inicio": float(columnas["timestamp"][0]),
+            "fin": float(columnas["timestamp"][-1]),
+            "filas": len(eventos),
+            "bytes": os.path.getsize(ruta)
+        })
+        # El manifiesto se reemplaza de forma atómica: un lector nunca ve un bloque a medias
+        ruta_manifiesto = os.path.join(self.directorio, MANIFIESTO)
+        with open(ruta_manifiesto + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifiesto, f, indent=1)
+        os.replace(ruta_manifiesto + ".tmp", ruta_manifiesto)
+
+
+def cargar_manifiesto(directorio):
+    """Manifiesto del almacén, o None si no existe"""
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def leer_rango(directorio, desde=None, hasta=None, columnas=None):
+    """
+    Recorre los bloques con filas en [desde, hasta] (timestamps; None = sin
+    límite) y devuelve, bloque a bloque, un dict de columnas ya filtrado.
+    Solo se abre un bloque a la vez. Las probabilidades se devuelven en
+    float32 y el usuario como texto.
+    """
+    manifiesto = cargar_manifiesto(directorio)
+    if manifiesto is None:
+        return
+    for bloque in manifiesto["bloques"]:
+        if (desde is not None and bloque["fin"] < desde) or (hasta is not None and bloque["inicio"] > hasta):
+            continue
+        with np.load(os.path.join(directorio, bloque["archivo"])) as datos:
+            timestamp = datos["timestamp"]
+            mascara = np.ones(len(timestamp), dtype=bool)
+            if desde is not None:
+                mascara &= timestamp >= desde
+            if hasta is not None:
+                mascara &= timestamp <= hasta
+            if not mascara.any():
+                continue
+            resultado = {}
+            for nombre in columnas or ("timestamp", "pista", "usuario", "probabilidades", "caja", "fps"):
+                if nombre == "usuario":
+                    resultado["usuario"] = datos["usuarios"][datos["usuario"][mascara]]
+                elif nombre == "probabilidades":
+                    resultado["probabilidades"] = decuantizar(datos["probabilidades"][mascara])
+                else:
+                    resultado[nombre] = datos[nombre][mascara]
+        yield resultado
+
+
+def leer_todo(directorio, desde=None, hasta=None, columnas=None):
+    """Concatena leer_rango() en un solo dict de columnas"""
+    partes = list(leer_rango(directorio, desde, hasta, columnas))
+    if not partes:
+        return {}
+    return {nombre: np.concatenate([p[nombre] for p in partes]) for nombre in partes[0]}
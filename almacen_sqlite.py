@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Base de datos SQLite local con las emociones detectadas y las respuestas
+de la encuesta, para cruzar ambas sin unir archivos de texto.
+
+- Modo WAL: el detector escribe mientras la encuesta o el análisis leen.
+- Inserciones por lotes con executemany dentro de una transacción.
+- Índices por usuario y por timestamp en ambas tablas.
+
+Importar los CSV existentes (se puede repetir: solo se añaden las filas nuevas):
+    python almacen_sqlite.py --importar emociones_log.csv data/respuestas_encuesta.csv
+"""
+
+import os
+import csv
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+import logging
+from datetime import datetime
+
+from suavizado import EMOCIONES
+from bitacora_emociones import SumideroAsincrono
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("almacen_sqlite")
+
+COLUMNAS_EMOCIONES = (["timestamp", "sesion", "pista", "usuario", "emocion", "confianza"] + EMOCIONES
+                      + ["x", "y", "w", "h", "fps"])
+COLUMNAS_ENCUESTAS = ["timestamp", "nombre", "email", "emocion", "intensidad", "comentario"]
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS emociones (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    sesion TEXT,
+    pista INTEGER,
+    usuario TEXT,
+    emocion TEXT,
+    confianza REAL,
+    {", ".join(f"{e} REAL" for e in EMOCIONES)},
+    x INTEGER, y INTEGER, w INTEGER, h INTEGER,
+    fps REAL
+);
+CREATE INDEX IF NOT EXISTS idx_emociones_usuario ON emociones(usuario, timestamp);
+CREATE INDEX IF NOT EXISTS idx_emociones_timestamp ON emociones(timestamp);
+
+CREATE TABLE IF NOT EXISTS encuestas (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    nombre TEXT,
+    email TEXT,
+    emocion TEXT,
+    intensidad INTEGER,
+    comentario TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_encuestas_nombre ON encuestas(nombre, timestamp);
+CREATE INDEX IF NOT EXISTS idx_encuestas_timestamp ON encuestas(timestamp);
+
+CREATE TABLE IF NOT EXISTS importaciones (
+    archivo TEXT PRIMARY KEY,
+    bytes INTEGER,
+    filas INTEGER,
+    momento REAL,
+    huella TEXT
+);
+"""
+
+INSERTAR_EMOCION = (f"INSERT INTO emociones ({', '.join(COLUMNAS_EMOCIONES)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNAS_EMOCIONES))})")
+INSERTAR_ENCUESTA = (f"INSERT INTO encuestas ({', '.join(COLUMNAS_ENCUESTAS)}) "
+                     f"VALUES ({', '.join('?' * len(COLUMNAS_ENCUESTAS))})")
+
+
+def ruta_por_defecto():
+    from config import BASE_DATOS
+    return BASE_DATOS
+
+
+def a_epoch(texto):
+    """'2025-04-06 17:44:37' (con o sin milisegundos) a segundos desde epoch, hora local"""
+    texto = texto.strip()
+    for formato in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(texto, formato).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no reconocida: {texto}")
+
+
+class BaseDatos:
+    """Conexión a la base de datos con el esquema creado y las inserciones por lotes"""
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or ruta_por_defecto()
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        # La conexión se comparte entre hilos protegida por el lock
+        self.conexion = sqlite3.connect(self.ruta, timeout=10.0, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conexion.execute("PRAGMA journal_mode=WAL")
+            self.conexion.execute("PRAGMA synchronous=NORMAL")
+            self.conexion.executescript(ESQUEMA)
+            columnas = [c[1] for c in self.conexion.execute("PRAGMA table_info(importaciones)")]
+            if "huella" not in columnas:
+                # Bases creadas antes de la importación incremental
+                self.conexion.execute("ALTER TABLE importaciones ADD COLUMN huella TEXT")
+
+    def cerrar(self):
+        with self.lock:
+            self.conexion.close()
+
+    @staticmethod
+    def _filas_emociones(eventos, sesion=None):
+        return [
+            [e["timestamp"], e.get("sesion", sesion), e["pista"], e["usuario"], e["emocion"], e["confianza"]]
+            + [e[emo] for emo in EMOCIONES] + [e["x"], e["y"], e["w"], e["h"], e["fps"]]
+            for e in eventos
+        ]
+
+    @staticmethod
+    def _filas_encuestas(respuestas):
+        filas = []
+        for r in respuestas:
+            momento = r["timestamp"]
+            if isinstance(momento, str):
+                momento = a_epoch(momento)
+            filas.append([momento, r["nombre"], r["email"], r["emocion"],
+                          int(r["intensidad"]) if str(r["intensidad"]).strip() else None, r.get("comentario", "")])
+        return filas
+
+    def insertar_emociones(self, eventos, sesion=None):
+        """Inserta eventos de emociones (dicts de crear_evento) en una sola transacción"""
+        filas = self._filas_emociones(eventos, sesion)
+        with self.lock, self.conexion:
+            self.conexion.executemany(INSERTAR_EMOCION, filas)
+        return len(filas)
+
+    def insertar_encuestas(self, respuestas):
+        """Inserta respuestas de la encuesta (timestamp en epoch o en texto)"""
+        filas = self._filas_encuestas(respuestas)
+        with self.lock, self.conexion:
+            self.conexion.executemany(INSERTAR_ENCUESTA, filas)
+        return len(filas)
+
+    def consultar(self, sql, parametros=()):
+        with self.lock:
+            return self.conexion.execute(sql, parametros).fetchall()
+
+    # Importación incremental de CSV: `importaciones` guarda hasta qué byte se importó cada
+    # archivo y una huella de su comienzo; si el archivo crece solo se lee lo nuevo, y si
+    # encoge o su comienzo cambió (rotado o reescrito) se importa desde el principio.
+
+    @staticmethod
+    def _huella(ruta, hasta):
+        """Huella de los primeros bytes ya importados (como mucho 1 KB), que no cambian al crecer el archivo"""
+        with open(ruta, "rb") as f:
+            return hashlib.sha1(f.read(min(hasta, 1024))).hexdigest()
+
+    def _posicion_importada(self, ruta):
+        """Byte desde el que continuar la importación de un archivo (0 = desde el principio)"""
+        fila = self.consultar("SELECT bytes, huella FROM importaciones WHERE archivo = ?", (os.path.abspath(ruta),))
+        if not fila:
+            return 0
+        posicion, huella = fila[0]
+        # Sin huella: importado entero por una versión anterior, `bytes` es el tamaño de entonces
+        if os.path.getsize(ruta) < posicion or (huella is not None and huella != self._huella(ruta, posicion)):
+            logger.info(f"{ruta} cambió desde la última importación, se importa desde el principio")
+            with self.lock, self.conexion:
+                self.conexion.execute("DELETE FROM importaciones WHERE archivo = ?", (os.path.abspath(ruta),))
+            return 0
+        return posicion
+
+    def _importar_lote(self, sql, filas, ruta, posicion, total):
+        """Inserta un lote y avanza la posición importada del archivo en la misma transacción"""
+        with self.lock, self.conexion:
+            if filas:
+                self.conexion.executemany(sql, filas)
+            self.conexion.execute("INSERT OR REPLACE INTO importaciones (archivo, bytes, filas, momento, huella) "
+                                  "VALUES (?, ?, COALESCE((SELECT filas FROM importaciones WHERE archivo = ?), 0) "
+                                  "+ ?, ?, ?)",
+                                  (os.path.abspath(ruta), posicion, os.path.abspath(ruta), total, time.time(),
+                                   self._huella(ruta, posicion)))
+
+    @staticmethod
+    def _leer_csv_desde(ruta, desde):
+        """
+        Recorre las filas de un CSV a partir del byte `desde` (0 = tras el
+        encabezado) como (dict, byte tras la fila). Una última línea sin salto
+        de línea se considera a medio escribir y se deja para la próxima vez.
+        """
+        with open(ruta, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8", errors="replace")]), [])
+            if desde > f.tell():
+                f.seek(desde)
+
+            def lineas():
+                while True:
+                    linea = f.readline()
+                    if not linea.endswith(b"\n"):
+                        return
+                    yield linea.decode("utf-8", errors="replace")
+
+            # csv.reader pide líneas de una en una, así que f.tell() queda justo tras la fila
+            for valores in csv.reader(lineas()):
+                yield dict(zip(encabezado, valores)), f.tell()
+
+    @staticmethod
+    def es_bitacora_activa(ruta):
+        """
+        Si la ruta es la bitácora CSV del detector (o una de sus copias) y el
+        detector escribe también en la base de datos: sus filas ya estarían aquí.
+        """
+        from config import BITACORA_CSV, BASE_DATOS
+        if not (BITACORA_CSV and BASE_DATOS):
+            return False
+        base = os.path.splitext(os.path.abspath(BITACORA_CSV))[0]
+        ruta = os.path.abspath(ruta)
+        return os.path.dirname(ruta) == os.path.dirname(base) and ruta.startswith(base)
+
+    def importar_csv_emociones(self, ruta, lote=5000, forzar=False):
+        """
+        Importa una bitácora CSV: el formato actual de BitacoraCSV o el
+        antiguo (FechaHora, Emocion, Confianza (%)). Solo se importan las filas
+        añadidas desde la importación anterior. La bitácora que escribe el
+        detector junto a la base de datos se rechaza salvo con forzar=True.
+        """
+        if not forzar and self.es_bitacora_activa(ruta):
+            logger.warning(f"{ruta} es la bitácora del detector, que ya guarda sus eventos en la base de "
+                           f"datos; no se importa para no duplicarlos (usar --forzar si hace falta)")
+            return 0
+        with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+            antiguo = "FechaHora" in f.readline()
+        sesion = f"importado:{os.path.basename(ruta)}"
+        desde = self._posicion_importada(ruta)
+        total = 0
+        posicion = desde
+        eventos = []
+        for fila, despues in self._leer_csv_desde(ruta, desde):
+            try:
+                if antiguo:
+                    emocion = fila["Emocion"].strip()
+                    confianza = float(fila["Confianza (%)"]) / 100.0
+                    evento = {"timestamp": a_epoch(fila["FechaHora"]), "pista": None, "usuario": None,
+                              "emocion": emocion, "confianza": confianza,
+                              "x": None, "y": None, "w": None, "h": None, "fps": None}
+                    for e in EMOCIONES:
+                        # Solo se conoce la probabilidad de la emoción dominante
+                        evento[e] = confianza if e == emocion else None
+                else:
+                    evento = {"timestamp": a_epoch(fila["timestamp"]), "pista": int(fila["pista"]),
+                              "usuario": fila["usuario"], "emocion": fila["emocion"],
+                              "confianza": float(fila["confianza"]),
+                              "x": int(fila["x"]), "y": int(fila["y"]), "w": int(fila["w"]), "h": int(fila["h"]),
+                              "fps": float(fila["fps"])}
+                    for e in EMOCIONES:
+                        evento[e] = float(fila[e])
+                eventos.append(evento)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Fila omitida en {ruta}: {str(e)}")
+            posicion = despues
+            if len(eventos) >= lote:
+                self._importar_lote(INSERTAR_EMOCION, self._filas_emociones(eventos, sesion), ruta, posicion,
+                                    len(eventos))
+                total += len(eventos)
+                eventos = []
+        if eventos or posicion != desde:
+            self._importar_lote(INSERTAR_EMOCION, self._filas_emociones(eventos, sesion), ruta, posicion,
+                                len(eventos))
+            total += len(eventos)
+        logger.info(f"Importadas {total} emociones desde {ruta}")
+        return total
+
+    def importar_csv_encuestas(self, ruta):
+        """Importa las respuestas añadidas a respuestas_encuesta.csv desde la importación anterior"""
+        desde = self._posicion_importada(ruta)
+        filas = []
+        posicion = desde
+        for fila, despues in self._leer_csv_desde(ruta, desde):
+            try:
+                filas.extend(self._filas_encuestas([fila]))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Fila omitida en {ruta}: {str(e)}")
+            posicion = despues
+        if filas or posicion != desde:
+            self._importar_lote(INSERTAR_ENCUESTA, filas, ruta, posicion, len(filas))
+        logger.info(f"Importadas {len(filas)} respuestas de encuesta desde {ruta}")
+        return len(filas)
+
+
+# Conexión compartida del proceso (encuesta y consultas); el sumidero del detector abre la suya
+_base_datos = {}
+_lock_base_datos = threading.Lock()
+
+
+def obtener_base_datos(ruta=None):
+    """BaseDatos compartida para una ruta, creada la primera vez"""
+    ruta = ruta or ruta_por_defecto()
+    with _lock_base_datos:
+        if ruta not in _base_datos:
+            _base_datos[ruta] = BaseDatos(ruta)
+        return _base_datos[ruta]
+
+
+class AlmacenSQLite(SumideroAsincrono):
+    """Sumidero del detector que inserta los eventos de emociones en la base de datos por lotes"""
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta=None, sesion=None, **kwargs):
+        super().__init__(**kwargs)
+        self.ruta = ruta
+        self.sesion = sesion
+        self.base_datos = None
+
+    def abrir(self):
+        self.base_datos = BaseDatos(self.ruta)
+        if self.sesion is None:
+            # Una sesión por arranque del detector
+            self.sesion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def cerrar(self):
+        if self.base_datos:
+            self.base_datos.cerrar()
+            self.base_datos = None
+        self.sesion = None
+
+    def escribir_lote(self, eventos):
+        self.base_datos.insertar_emociones(eventos, self.sesion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Base de datos SQLite de emociones y encuestas")
+    parser.add_argument("--base", default=None, help="ruta de la base de datos (por defecto, config.py)")
+    parser.add_argument("--importar", nargs="+", default=[], help="CSV de emociones o de encuestas")
+    parser.add_argument("--forzar", action="store_true",
+                        help="importar también la bitácora CSV que escribe el detector")
+    args = parser.parse_args()
+
+    base_datos = BaseDatos(args.base)
+    for ruta in args.importar:
+        with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+            encabezado = f.readline()
+        inicio = time.time()
+        if "email" in encabezado:
+            filas = base_datos.importar_csv_encuestas(ruta)
+        else:
+            filas = base_datos.importar_csv_emociones(ruta, forzar=args.forzar)
+        print(f"{ruta}: {filas} filas importadas ({time.time() - inicio:.1f} s)")
+    for tabla in ("emociones", "encuestas"):
+        print(f"{tabla}: {base_datos.consultar(f'SELECT COUNT(*) FROM {tabla}')[0][0]} filas")
+    base_datos.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Análisis por lotes, sin interfaz, de vídeos grabados y carpetas de imágenes.
+
+Usa el mismo núcleo que la GUI (NucleoDeteccion): detección de rostros,
+emociones, pistas e identificación. Los vídeos se dividen en tramos de
+frames y las imágenes en grupos; un pool de procesos los reparte y los
+resultados se escriben en orden según termina cada tarea, una fila por
+rostro y frame analizado (con las columnas del rostro vacías si no hay
+ninguno), en CSV o en Parquet (si la salida termina en .parquet y está
+instalado pyarrow).
+
+Uso:
+    python analisis_lote.py clase1.mp4 clase2.mp4 --salida resultados.csv
+    python analisis_lote.py fotos/ --salida resultados.parquet --procesos 4
+    python analisis_lote.py clase.mp4 --paso 5 --sin-reconocimiento
+"""
+
+import os
+import csv
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from clasificador_emociones import ETIQUETAS
+
+EXTENSIONES_VIDEO = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+COLUMNAS = ["archivo", "frame", "tiempo_s", "pista", "usuario", "x", "y", "w", "h",
+            "emocion", "confianza"] + list(ETIQUETAS)
+
+# Núcleo de cada proceso del pool: los modelos se cargan una vez por proceso
+_nucleo = None
+
+
+def _iniciar_proceso(data_path, reconocer, intervalo_deteccion):
+    global _nucleo
+    from nucleo_deteccion import NucleoDeteccion
+    _nucleo = NucleoDeteccion(data_path, intervalo_deteccion=intervalo_deteccion, reconocer=reconocer)
+
+
+def _filas_frame(archivo, n_frame, tiempo, prefijo, resultado):
+    """Una fila por rostro del frame, o una con las columnas del rostro vacías si no hay ninguno"""
+    if not resultado["pistas"]:
+        return [[archivo, n_frame, round(tiempo, 3)] + [None] * (len(COLUMNAS) - 3)]
+    filas = []
+    for pista, cara in resultado["pistas"]:
+        x, y, w, h = [int(v) for v in cara["box"]]
+        emociones = cara["emotions"]
+        emocion = max(emociones, key=emociones.get) if emociones else ""
+        filas.append([
+            archivo, n_frame, round(tiempo, 3), f"{prefijo}{pista.id}", pista.identidad or "Desconocido",
+            x, y, w, h, emocion, round(float(emociones.get(emocion, 0.0)), 4)
+        ] + [round(float(emociones.get(e, 0.0)), 4) for e in ETIQUETAS])
+    return filas
+
+
+def _procesar_tramo_video(tarea):
+    """Procesa los frames [inicio, fin) de un vídeo con un núcleo recién reiniciado"""
+    ruta, inicio, fin, paso, usar_hist = tarea
+    _nucleo.reiniciar()
+    # Las pistas de cada tramo son independientes: el prefijo evita IDs repetidos
+    prefijo = f"{inicio}-"
+    filas = []
+    cap = cv2.VideoCapture(ruta)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if inicio:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+        n_frame = inicio
+        while n_frame < fin:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            tiempo = n_frame / fps
+            # El reloj del vídeo gobierna la reverificación de identidades
+            resultado = _nucleo.procesar(frame, usar_hist, momento=tiempo)
+            filas.extend(_filas_frame(ruta, n_frame, tiempo, prefijo, resultado))
+            n_frame += 1
+            # Saltar frames sin decodificarlos
+            for _ in range(paso - 1):
+                if n_frame >= fin or not cap.grab():
+                    n_frame = fin
+                    break
+                n_frame += 1
+    finally:
+        cap.release()
+    return filas
+
+
+def _procesar_imagenes(tarea):
+    """Procesa un grupo de imágenes sueltas (cada una es una secuencia propia)"""
+    rutas, usar_hist = tarea
+    filas = []
+    for ruta in rutas:
+        frame = cv2.imread(ruta)
+        if frame is None:
+            print(f"No se pudo leer {ruta}")
+            continue
+        _nucleo.reiniciar()
+        # Sin seguimiento: cada imagen necesita una detección completa
+        _nucleo.seguidor = None
+        resultado = _nucleo.procesar(frame, usar_hist, momento=0.0)
+        filas.extend(_filas_frame(ruta, 0, 0.0, "", resultado))
+    return filas
+
+
+def _procesar(tarea):
+    tipo, datos = tarea
+    if tipo == "video":
+        return _procesar_tramo_video(datos)
+    return _procesar_imagenes(datos)
+
+
+def expandir_entradas(entradas):
+    """Separa las entradas en vídeos e imágenes (las carpetas se recorren recursivamente)"""
+    videos, imagenes = [], []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for raiz, _, archivos in os.walk(entrada):
+                for archivo in sorted(archivos):
+                    ruta = os.path.join(raiz, archivo)
+                    if archivo.lower().endswith(EXTENSIONES_VIDEO):
+                        videos.append(ruta)
+                    elif archivo.lower().endswith(EXTENSIONES_IMAGEN):
+                        imagenes.append(ruta)
+        elif entrada.lower().endswith(EXTENSIONES_VIDEO):
+            videos.append(entrada)
+        elif entrada.lower().endswith(EXTENSIONES_IMAGEN):
+            imagenes.append(entrada)
+        else:
+            print(f"Se omite {entrada}: formato no reconocido")
+    return videos, imagenes
+
+
+def crear_tareas(videos, imagenes, frames_tramo, imagenes_grupo, paso, usar_hist):
+    """Divide los vídeos en tramos de frames y las imágenes en grupos"""
+    tareas = []
+    for ruta in videos:
+        cap = cv2.VideoCapture(ruta)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total <= 0:
+            print(f"No se pudo leer la duración de {ruta}")
+            continue
+        # Tramos múltiplos del paso para que los frames muestreados no dependan del reparto
+        tramo = max(paso, frames_tramo - frames_tramo % paso)
+        for inicio in range(0, total, tramo):
+            tareas.append(("video", (ruta, inicio, min(inicio + tramo, total), paso, usar_hist)))
+    for i in range(0, len(imagenes), imagenes_grupo):
+        tareas.append(("imagenes", (imagenes[i:i + imagenes_grupo], usar_hist)))
+    return tareas
+
+
+class EscritorResultados:
+    """
+    Escribe las filas a medida que llegan: CSV, o Parquet (un grupo de filas
+    por tarea) si la salida termina en .parquet y está instalado pyarrow.
+    """
+
+    def __init__(self, salida):
+        self.salida = salida
+        self.filas = 0
+        self.archivo = None
+        self.parquet = None
+        if salida.lower().endswith(".parquet"):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                tipos = {"frame": pa.int64(), "tiempo_s": pa.float64(), "x": pa.int32(), "y": pa.int32(),
+                         "w": pa.int32(), "h": pa.int32(), "confianza": pa.float32()}
+                tipos.update({e: pa.float32() for e in ETIQUETAS})
+                self.esquema = pa.schema([(c, tipos.get(c, pa.string())) for c in COLUMNAS])
+                self.pa = pa
+                self.parquet = pq.ParquetWriter(salida, self.esquema)
+                return
+            except ImportError:
+                self.salida = os.path.splitext(salida)[0] + ".csv"
+                print(f"pyarrow no disponible, se guarda en CSV: {self.salida}")
+        self.archivo = open(self.salida, "w", newline="", encoding="utf-8")
+        self.escritor = csv.writer(self.archivo)
+        self.escritor.writerow(COLUMNAS)
+
+    def escribir(self, filas):
+        if not filas:
+            return
+        if self.parquet is not None:
+            columnas = list(zip(*filas))
+            tabla = self.pa.Table.from_arrays(
+                [self.pa.array(columnas[i], type=self.esquema.field(i).type) for i in range(len(COLUMNAS))],
+                schema=self.esquema)
+            self.parquet.write_table(tabla)
+        else:
+            self.escritor.writerows(filas)
+            self.archivo.flush()
+        self.filas += len(filas)
+
+    def cerrar(self):
+        if self.parquet is not None:
+            self.parquet.close()
+        if self.archivo:
+            self.archivo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis de emociones por lotes (vídeos e imágenes)")
+    parser.add_argument("entradas", nargs="+", help="vídeos, imágenes o carpetas")
+    parser.add_argument("--salida", default="resultados_emociones.csv", help=".csv o .parquet")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--frames-tramo", type=int, default=900, help="frames de vídeo por tarea")
+    parser.add_argument("--imagenes-grupo", type=int, default=50, help="imágenes por tarea")
+    parser.add_argument("--paso", type=int, default=1, help="analizar uno de cada N frames")
+    parser.add_argument("--intervalo-deteccion", type=int, default=None,
+                        help="detección completa cada N frames analizados (por defecto, config.py)")
+    parser.add_argument("--hist", action="store_true", help="ecualizar el histograma")
+    parser.add_argument("--sin-reconocimiento", action="store_true", help="no identificar usuarios")
+    parser.add_argument("--data", default=None, help="carpeta de datos (por defecto, config.py)")
+    args = parser.parse_args()
+
+    videos, imagenes = expandir_entradas(args.entradas)
+    tareas = crear_tareas(videos, imagenes, args.frames_tramo, args.imagenes_grupo,
+                          max(1, args.paso), args.hist)
+    if not tareas:
+        print("No hay nada que analizar")
+        return
+    print(f"{len(videos)} vídeos y {len(imagenes)} imágenes en {len(tareas)} tareas, {args.procesos} procesos")
+
+    inicio = time.time()
+    escritor = EscritorResultados(args.salida)
+    try:
+        with ProcessPoolExecutor(max_workers=args.procesos, initializer=_iniciar_proceso,
+                                 initargs=(args.data, not args.sin_reconocimiento,
+                                           args.intervalo_deteccion)) as pool:
+            # map conserva el orden de las tareas: las filas salen ordenadas por archivo y frame
+            # y cada tarea se escribe al terminar, sin acumular todo el análisis en memoria
+            for i, filas in enumerate(pool.map(_procesar, tareas), 1):
+                escritor.escribir(filas)
+                print(f"Tarea {i}/{len(tareas)} completada ({escritor.filas} filas)")
+    finally:
+        escritor.cerrar()
+    print(f"{escritor.filas} filas guardadas en {escritor.salida} ({time.time() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Resúmenes de emociones por usuario y por sesión sobre la base de datos
+SQLite (almacen_sqlite): proporción de cada emoción dominante, histogramas
+por minuto, matrices de transición entre emociones y cruce con la encuesta.
+
+Los resúmenes son incrementales: se guardan en tablas de la propia base de
+datos (por usuario, por usuario y minuto, por sesión) junto con el último
+id procesado (marca de agua). Cada actualización solo lee las filas nuevas
+y solo reescribe las claves que han cambiado. Los cálculos sobre cada tanda
+de filas son group-bys vectorizados con NumPy (bincount sobre claves
+combinadas).
+
+Uso:
+    python analitica_emociones.py
+    python analitica_emociones.py --usuario Maycol --minutos
+    python analitica_emociones.py --reiniciar
+"""
+
+import json
+import argparse
+import logging
+import numpy as np
+from datetime import datetime
+
+from suavizado import EMOCIONES
+from almacen_sqlite import BaseDatos
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("analitica_emociones")
+
+N = len(EMOCIONES)
+INDICE_EMOCION = {e: i for i, e in enumerate(EMOCIONES)}
+
+# Una sesión cuya última fila es anterior en más de este margen al comienzo de una tanda
+# ya no puede continuar sus secuencias (los sumideros escriben con algo de retraso)
+MARGEN_SESION_S = 60.0
+
+COLUMNAS_CONTEOS = ", ".join(f"{e} INTEGER" for e in EMOCIONES)
+
+ESQUEMA_ESTADO = f"""
+CREATE TABLE IF NOT EXISTS analitica_estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS analitica_usuarios (
+    usuario TEXT PRIMARY KEY,
+    {COLUMNAS_CONTEOS}
+);
+CREATE TABLE IF NOT EXISTS analitica_minutos (
+    usuario TEXT,
+    minuto INTEGER,
+    {COLUMNAS_CONTEOS},
+    PRIMARY KEY (usuario, minuto)
+);
+CREATE TABLE IF NOT EXISTS analitica_sesiones (
+    sesion TEXT PRIMARY KEY,
+    inicio REAL,
+    fin REAL,
+    usuarios TEXT,
+    {COLUMNAS_CONTEOS}
+);
+CREATE TABLE IF NOT EXISTS analitica_transiciones (
+    usuario TEXT,
+    anterior INTEGER,
+    siguiente INTEGER,
+    n INTEGER,
+    PRIMARY KEY (usuario, anterior, siguiente)
+);
+CREATE TABLE IF NOT EXISTS analitica_ultimas (
+    secuencia TEXT PRIMARY KEY,
+    sesion TEXT,
+    usuario TEXT,
+    emocion INTEGER
+);
+"""
+
+TABLAS_ESTADO = ["analitica_estado", "analitica_usuarios", "analitica_minutos", "analitica_sesiones",
+                 "analitica_transiciones", "analitica_ultimas"]
+MARCAS = ", ".join("?" * N)
+
+
+def cargar_emociones(base_datos, desde_id=0, limite=None):
+    """
+    Filas de emociones con id > desde_id, como columnas NumPy. Usuarios y
+    sesiones vienen codificados (índices sobre `usuarios` y `sesiones`) y la
+    emoción como índice de EMOCIONES (-1 si falta).
+    """
+    sql = "SELECT id, timestamp, usuario, sesion, pista, emocion FROM emociones WHERE id > ? ORDER BY id"
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    filas = base_datos.consultar(sql, (desde_id,))
+    if not filas:
+        return None
+    ids, tiempos, usuarios, sesiones, pistas, emociones = zip(*filas)
+    nombres_usuario, cod_usuario = np.unique([u or "Desconocido" for u in usuarios], return_inverse=True)
+    nombres_sesion, cod_sesion = np.unique([s or "" for s in sesiones], return_inverse=True)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "timestamp": np.array(tiempos, dtype=np.float64),
+        "usuario": cod_usuario.astype(np.int64),
+        "usuarios": nombres_usuario,
+        "sesion": cod_sesion.astype(np.int64),
+        "sesiones": nombres_sesion,
+        "pista": np.array([-1 if p is None else p for p in pistas], dtype=np.int64),
+        "emocion": np.array([INDICE_EMOCION.get(e, -1) for e in emociones], dtype=np.int64)
+    }
+
+
+def conteos_por_grupo(grupo, emocion, n_grupos):
+    """Matriz (n_grupos, emociones) con cuántas veces fue dominante cada emoción en cada grupo"""
+    validos = emocion >= 0
+    planos = np.bincount(grupo[validos] * N + emocion[validos], minlength=n_grupos * N)
+    return planos.reshape(n_grupos, N)
+
+
+def proporciones(conteos):
+    """Normaliza los conteos por fila (0 donde no hay muestras)"""
+    conteos = np.asarray(conteos, dtype=np.float64)
+    totales = conteos.sum(axis=-1, keepdims=True)
+    return np.divide(conteos, totales, out=np.zeros_like(conteos), where=totales > 0)
+
+
+def histograma_minutos(timestamp, emocion):
+    """(minutos, conteos): minuto (epoch // 60) y conteo de cada emoción dominante en ese minuto"""
+    validos = emocion >= 0
+    minuto = (timestamp[validos] // 60).astype(np.int64)
+    minutos, cod = np.unique(minuto, return_inverse=True)
+    return minutos, conteos_por_grupo(cod, emocion[validos], len(minutos))
+
+
+def transiciones(secuencia, timestamp, emocion, n_secuencias):
+    """
+    Matrices (n_secuencias, emociones, emociones) de transiciones entre
+    emociones dominantes consecutivas dentro de cada secuencia (p. ej. una
+    pista de una sesión), ordenadas por tiempo. Devuelve también la última
+    emoción de cada secuencia (-1 si no hay) y la primera de cada una
+    (secuencias, emociones), para enlazar con la tanda anterior.
+    """
+    validos = emocion >= 0
+    secuencia, timestamp, emocion = secuencia[validos], timestamp[validos], emocion[validos]
+    matrices = np.zeros((n_secuencias, N, N), dtype=np.int64)
+    ultima = np.full(n_secuencias, -1, dtype=np.int64)
+    vacio = np.zeros(0, dtype=np.int64)
+    if len(emocion) == 0:
+        return matrices, ultima, vacio, vacio
+    orden = np.lexsort((timestamp, secuencia))
+    secuencia, emocion = secuencia[orden], emocion[orden]
+    misma = secuencia[1:] == secuencia[:-1]
+    planos = np.bincount(secuencia[1:][misma] * N * N + emocion[:-1][misma] * N + emocion[1:][misma],
+                         minlength=n_secuencias * N * N)
+    matrices += planos.reshape(n_secuencias, N, N)
+    fin = np.r_[~misma, True]
+    ultima[secuencia[fin]] = emocion[fin]
+    primera = np.r_[True, ~misma]
+    return matrices, ultima, secuencia[primera], emocion[primera]
+
+
+class ResumenesEmociones:
+    """
+    Resúmenes acumulados por usuario y por sesión, actualizados solo con
+    las filas nuevas de la base de datos. El estado (conteos, histogramas
+    por minuto, transiciones y marca de agua) se guarda en las tablas
+    analitica_*, y cada actualización escribe solo las claves que tocó.
+    """
+
+    def __init__(self, base_datos, lote=50000):
+        self.base_datos = base_datos
+        self.lote = lote
+        with base_datos.lock, base_datos.conexion:
+            base_datos.conexion.executescript(ESQUEMA_ESTADO)
+        self._vaciar()
+        self._cargar_estado()
+
+    def _vaciar(self):
+        self.ultimo_id = 0
+        self.usuarios = {}       # usuario -> conteos por emoción
+        self.sesiones = {}       # sesión -> {"conteos", "inicio", "fin", "usuarios"}
+        self.minutos = {}        # usuario -> {minuto -> conteos}
+        self.transiciones = {}   # usuario -> matriz emociones x emociones
+        self.ultimas = {}        # sesión -> {"sesión|pista|usuario" -> (usuario, última emoción)}
+        self._cambios()
+
+    def _cambios(self):
+        """Claves modificadas desde el último guardado"""
+        self.cambiados = {"usuarios": set(), "minutos": set(), "sesiones": set(),
+                          "transiciones": set(), "ultimas": set(), "sesiones_cerradas": set()}
+
+    def reiniciar(self):
+        """Descarta los resúmenes guardados para recalcularlos desde el principio"""
+        with self.base_datos.lock, self.base_datos.conexion:
+            for tabla in TABLAS_ESTADO:
+                self.base_datos.conexion.execute(f"DELETE FROM {tabla}")
+        self._vaciar()
+
+    def _cargar_estado(self):
+        consultar = self.base_datos.consultar
+        filas = consultar("SELECT valor FROM analitica_estado WHERE clave = 'ultimo_id'")
+        if not filas:
+            return
+        self.ultimo_id = int(filas[0][0])
+        for usuario, *conteos in consultar(f"SELECT usuario, {', '.join(EMOCIONES)} FROM analitica_usuarios"):
+            self.usuarios[usuario] = np.array(conteos, dtype=np.int64)
+        for usuario, minuto, *conteos in consultar(
+                f"SELECT usuario, minuto, {', '.join(EMOCIONES)} FROM analitica_minutos"):
+            self.minutos.setdefault(usuario, {})[minuto] = np.array(conteos, dtype=np.int64)
+        for sesion, inicio, fin, usuarios, *conteos in consultar(
+                f"SELECT sesion, inicio, fin, usuarios, {', '.join(EMOCIONES)} FROM analitica_sesiones"):
+            self.sesiones[sesion] = {"conteos": np.array(conteos, dtype=np.int64), "inicio": inicio,
+                                     "fin": fin, "usuarios": json.loads(usuarios)}
+        for usuario, anterior, siguiente, n in consultar(
+                "SELECT usuario, anterior, siguiente, n FROM analitica_transiciones"):
+            self.transiciones.setdefault(usuario, np.zeros((N, N), dtype=np.int64))[anterior, siguiente] = n
+        for secuencia, sesion, usuario, emocion in consultar(
+                "SELECT secuencia, sesion, usuario, emocion FROM analitica_ultimas"):
+            self.ultimas.setdefault(sesion, {})[secuencia] = (usuario, emocion)
+
+    def _guardar_estado(self):
+        """Escribe la marca de agua y las claves modificadas en una sola transacción"""
+        c = self.cambiados
+        conexion = self.base_datos.conexion
+        with self.base_datos.lock, conexion:
+            conexion.execute("INSERT OR REPLACE INTO analitica_estado VALUES ('ultimo_id', ?)",
+                             (str(self.ultimo_id),))
+            conexion.executemany(f"INSERT OR REPLACE INTO analitica_usuarios VALUES (?, {MARCAS})",
+                                 [[u] + self.usuarios[u].tolist() for u in c["usuarios"]])
+            conexion.executemany(f"INSERT OR REPLACE INTO analitica_minutos VALUES (?, ?, {MARCAS})",
+                                 [[u, m] + self.minutos[u][m].tolist() for u, m in c["minutos"]])
+            conexion.executemany(f"INSERT OR REPLACE INTO analitica_sesiones VALUES (?, ?, ?, ?, {MARCAS})",
+                                 [[s, d["inicio"], d["fin"], json.dumps(d["usuarios"])] + d["conteos"].tolist()
+                                  for s, d in ((s, self.sesiones[s]) for s in c["sesiones"])])
+            conexion.executemany("INSERT OR REPLACE INTO analitica_transiciones VALUES (?, ?, ?, ?)",
+                                 [(u, a, b, int(self.transiciones[u][a, b])) for u in c["transiciones"]
+                                  for a, b in zip(*(i.tolist() for i in np.nonzero(self.transiciones[u])))])
+            conexion.executemany("DELETE FROM analitica_ultimas WHERE sesion = ?",
+                                 [(s,) for s in c["sesiones_cerradas"]])
+            conexion.executemany("INSERT OR REPLACE INTO analitica_ultimas VALUES (?, ?, ?, ?)",
+                                 [(k, s) + self.ultimas[s][k] for s, k in c["ultimas"] if k in self.ultimas.get(s, {})])
+        self._cambios()
+
+    def actualizar(self):
+        """Incorpora las filas nuevas (id > marca de agua); devuelve cuántas se procesaron"""
+        total = 0
+        while True:
+            datos = cargar_emociones(self.base_datos, self.ultimo_id, self.lote)
+            if datos is None:
+                break
+            self._incorporar(datos)
+            self.ultimo_id = int(datos["id"][-1])
+            total += len(datos["id"])
+            if len(datos["id"]) < self.lote:
+                break
+        if total:
+            self._guardar_estado()
+            logger.info(f"Resúmenes actualizados con {total} filas nuevas (hasta id {self.ultimo_id})")
+        return total
+
+    def _incorporar(self, datos):
+        usuarios, sesiones = datos["usuarios"], datos["sesiones"]
+        emocion, timestamp = datos["emocion"], datos["timestamp"]
+
+        # Conteos por usuario y por sesión
+        cambiados = self.cambiados
+        for i, c in enumerate(conteos_por_grupo(datos["usuario"], emocion, len(usuarios))):
+            self.usuarios[usuarios[i]] = self.usuarios.get(usuarios[i], np.zeros(N, dtype=np.int64)) + c
+        cambiados["usuarios"].update(usuarios.tolist())
+        cambiados["sesiones"].update(sesiones.tolist())
+        conteos_sesion = conteos_por_grupo(datos["sesion"], emocion, len(sesiones))
+        inicio = np.full(len(sesiones), np.inf)
+        fin = np.full(len(sesiones), -np.inf)
+        np.minimum.at(inicio, datos["sesion"], timestamp)
+        np.maximum.at(fin, datos["sesion"], timestamp)
+        for i, nombre in enumerate(sesiones):
+            previa = self.sesiones.get(nombre)
+            usuarios_sesion = sorted(set(usuarios[np.unique(datos["usuario"][datos["sesion"] == i])]))
+            if previa is None:
+                self.sesiones[nombre] = {"conteos": conteos_sesion[i], "inicio": float(inicio[i]),
+                                         "fin": float(fin[i]), "usuarios": usuarios_sesion}
+            else:
+                previa["conteos"] = previa["conteos"] + conteos_sesion[i]
+                previa["inicio"] = min(previa["inicio"], float(inicio[i]))
+                previa["fin"] = max(previa["fin"], float(fin[i]))
+                previa["usuarios"] = sorted(set(previa["usuarios"]) | set(usuarios_sesion))
+
+        # Histogramas por minuto de cada usuario
+        for u, nombre in enumerate(usuarios):
+            mascara = datos["usuario"] == u
+            minutos, conteos = histograma_minutos(timestamp[mascara], emocion[mascara])
+            historial = self.minutos.setdefault(nombre, {})
+            for m, c in zip(minutos.tolist(), conteos):
+                historial[m] = historial.get(m, np.zeros(N, dtype=np.int64)) + c
+                cambiados["minutos"].add((nombre, m))
+
+        # Transiciones dentro de cada pista de cada sesión, por separado para cada usuario de la
+        # pista (una pista empieza como "Desconocido" y se identifica después)
+        claves = np.char.add(np.char.add(sesiones[datos["sesion"]].astype(str), "|"), datos["pista"].astype(str))
+        claves = np.char.add(np.char.add(claves, "|"), usuarios[datos["usuario"]].astype(str))
+        nombres_secuencia, secuencia = np.unique(claves, return_inverse=True)
+        usuario_secuencia = np.zeros(len(nombres_secuencia), dtype=np.int64)
+        usuario_secuencia[secuencia] = datos["usuario"]
+        sesion_secuencia = np.zeros(len(nombres_secuencia), dtype=np.int64)
+        sesion_secuencia[secuencia] = datos["sesion"]
+        matrices, ultima, primeras_seq, primeras_emo = transiciones(
+            secuencia, timestamp, emocion, len(nombres_secuencia))
+        for s, nombre in enumerate(nombres_secuencia):
+            usuario = usuarios[usuario_secuencia[s]]
+            matriz = self.transiciones.get(usuario, np.zeros((N, N), dtype=np.int64)) + matrices[s]
+            self.transiciones[usuario] = matriz
+        cambiados["transiciones"].update(usuarios.tolist())
+        # Enlazar con la última emoción de la tanda anterior en la misma secuencia
+        for s, e in zip(primeras_seq.tolist(), primeras_emo.tolist()):
+            previa = self.ultimas.get(sesiones[sesion_secuencia[s]], {}).get(nombres_secuencia[s])
+            if previa is not None:
+                usuario, anterior = previa
+                self.transiciones[usuario][anterior, e] += 1
+        for s in np.flatnonzero(ultima >= 0).tolist():
+            sesion = sesiones[sesion_secuencia[s]]
+            self.ultimas.setdefault(sesion, {})[nombres_secuencia[s]] = (usuarios[usuario_secuencia[s]], int(ultima[s]))
+            cambiados["ultimas"].add((sesion, nombres_secuencia[s]))
+
+        # Solo las sesiones que seguían activas al empezar esta tanda pueden continuar sus secuencias
+        limite = float(timestamp.min()) - MARGEN_SESION_S
+        for sesion in [s for s in self.ultimas if self.sesiones[s]["fin"] < limite]:
+            del self.ultimas[sesion]
+            cambiados["sesiones_cerradas"].add(sesion)
+
+    def resumen_usuario(self, usuario):
+        conteos = self.usuarios.get(usuario, np.zeros(N, dtype=np.int64))
+        transiciones_usuario = self.transiciones.get(usuario, np.zeros((N, N), dtype=np.int64))
+        return {
+            "usuario": usuario,
+            "muestras": int(conteos.sum()),
+            "proporciones": dict(zip(EMOCIONES, proporciones(conteos).round(4).tolist())),
+            "transiciones": proporciones(transiciones_usuario).round(4).tolist()
+        }
+
+    def resumen_sesiones(self):
+        return [{
+            "sesion": nombre,
+            "inicio": d["inicio"],
+            "fin": d["fin"],
+            "usuarios": d["usuarios"],
+            "muestras": int(d["conteos"].sum()),
+            "proporciones": dict(zip(EMOCIONES, proporciones(d["conteos"]).round(4).tolist()))
+        } for nombre, d in sorted(self.sesiones.items(), key=lambda item: item[1]["inicio"])]
+
+    def histograma_usuario(self, usuario):
+        """(minutos, conteos) ordenados del histograma por minuto de un usuario"""
+        historial = self.minutos.get(usuario, {})
+        minutos = np.array(sorted(historial), dtype=np.int64)
+        conteos = np.array([historial[m] for m in minutos], dtype=np.int64).reshape(-1, N)
+        return minutos, conteos
+
+
+def cruce_encuestas(base_datos, ventana_s=600.0):
+    """
+    Para cada respuesta de la encuesta, la emoción dominante detectada para
+    ese usuario en los `ventana_s` segundos anteriores y si coincide con la
+    declarada. Usa el índice (usuario, timestamp) de la tabla emociones.
+    """
+    resultado = []
+    for momento, nombre, declarada, intensidad in base_datos.consultar(
+            "SELECT timestamp, nombre, emocion, intensidad FROM encuestas ORDER BY timestamp"):
+        filas = base_datos.consultar(
+            "SELECT emocion FROM emociones WHERE usuario = ? AND timestamp BETWEEN ? AND ?",
+            (nombre.strip(), momento - ventana_s, momento))
+        emocion = np.array([INDICE_EMOCION.get(f[0], -1) for f in filas], dtype=np.int64)
+        conteos = np.bincount(emocion[emocion >= 0], minlength=N)
+        detectada = EMOCIONES[int(conteos.argmax())] if conteos.sum() else None
+        resultado.append({
+            "timestamp": momento,
+            "usuario": nombre,
+            "declarada": declarada,
+            "intensidad": intensidad,
+            "detectada": detectada,
+            "muestras": int(conteos.sum()),
+            "proporciones": dict(zip(EMOCIONES, proporciones(conteos).round(4).tolist())),
+            "coincide": detectada == declarada if detectada else None
+        })
+    return resultado
+
+
+def _fecha(momento):
+    return datetime.fromtimestamp(momento).strftime("%Y-%m-%d %H:%M")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resúmenes de emociones por usuario y sesión")
+    parser.add_argument("--base", default=None, help="ruta de la base de datos (por defecto, config.py)")
+    parser.add_argument("--usuario", help="mostrar solo este usuario")
+    parser.add_argument("--minutos", action="store_true", help="mostrar el histograma por minuto")
+    parser.add_argument("--reiniciar", action="store_true", help="recalcular desde el principio")
+    args = parser.parse_args()
+
+    base_datos = BaseDatos(args.base)
+    resumenes = ResumenesEmociones(base_datos)
+    if args.reiniciar:
+        resumenes.reiniciar()
+    nuevas = resumenes.actualizar()
+    print(f"{nuevas} filas nuevas procesadas (marca de agua: id {resumenes.ultimo_id})\n")
+
+    usuarios = [args.usuario] if args.usuario else sorted(resumenes.usuarios)
+    print(f"{'usuario':>15} | {'muestras':>8} | " + " | ".join(f"{e[:7]:>7}" for e in EMOCIONES))
+    for usuario in usuarios:
+        r = resumenes.resumen_usuario(usuario)
+        print(f"{usuario[:15]:>15} | {r['muestras']:8d} | "
+              + " | ".join(f"{r['proporciones'][e] * 100:6.1f}%" for e in EMOCIONES))
+
+    print("\nSesiones:")
+    for s in resumenes.resumen_sesiones():
+        dominante = max(s["proporciones"], key=s["proporciones"].get)
+        print(f"  {s['sesion']}: {_fecha(s['inicio'])} - {_fecha(s['fin'])}, {s['muestras']} muestras, "
+              f"dominante {dominante} ({s['proporciones'][dominante] * 100:.1f}%), usuarios: {', '.join(s['usuarios'])}")
+
+    if args.minutos:
+        for usuario in usuarios:
+            minutos, conteos = resumenes.histograma_usuario(usuario)
+            print(f"\nHistograma por minuto de {usuario}:")
+            for m, c in zip(minutos, conteos):
+                print(f"  {_fecha(m * 60)} " + " ".join(f"{e[:3]}:{n}" for e, n in zip(EMOCIONES, c) if n))
+
+    cruce = cruce_encuestas(base_datos)
+    if cruce:
+        print("\nEncuestas frente a emociones detectadas (10 min previos):")
+        for c in cruce:
+            print(f"  {_fecha(c['timestamp'])} {c['usuario']}: declarada {c['declarada']}, "
+                  f"detectada {c['detectada'] or '-'} ({c['muestras']} muestras)")
+    base_datos.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import time
+import threading
+import logging
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("arranque")
+
+ESTADOS = ("pendiente", "cargando", "listo", "error")
+
+
+class Arranque:
+    """
+    Orquestador de arranque: ejecuta en un hilo de fondo las tareas de carga
+    (modelos, calentamiento, construcción del detector) mientras la interfaz
+    ya está visible. La interfaz consulta `estado` y `mensaje` con after().
+    """
+
+    def __init__(self):
+        self.tareas = []
+        self.resultados = {}
+        self.errores = {}
+        self.estado = "pendiente"
+        self.mensaje = "Esperando..."
+        self.completadas = 0
+        self.listo = threading.Event()
+        self.thread = None
+
+    def agregar(self, nombre, funcion, obligatoria=True):
+        """Añade una tarea; si es obligatoria y falla, el arranque termina en "error" """
+        self.tareas.append((nombre, funcion, obligatoria))
+
+    def iniciar(self):
+        if self.thread is None:
+            self.estado = "cargando"
+            self.thread = threading.Thread(target=self._loop, name="arranque", daemon=True)
+            self.thread.start()
+
+    def _loop(self):
+        inicio_total = time.perf_counter()
+        for nombre, funcion, obligatoria in self.tareas:
+            self.mensaje = f"Cargando {nombre}..."
+            inicio = time.perf_counter()
+            try:
+                self.resultados[nombre] = funcion()
+                logger.info(f"Arranque: {nombre} listo en {time.perf_counter() - inicio:.2f} s")
+            except Exception as e:
+                logger.error(f"Arranque: error en {nombre}: {str(e)}")
+                self.errores[nombre] = e
+                if obligatoria:
+                    self.estado = "error"
+            self.completadas += 1
+        if self.estado != "error":
+            self.estado = "listo"
+        self.mensaje = "Listo" if self.estado == "listo" else "Error al cargar"
+        logger.info(f"Arranque completado en {time.perf_counter() - inicio_total:.2f} s (estado: {self.estado})")
+        self.listo.set()
+
+    def terminado(self):
+        return self.listo.is_set()
+
+    def progreso(self):
+        """(tareas completadas, total de tareas, mensaje actual)"""
+        return self.completadas, len(self.tareas), self.mensaje
+
+
+def calentar_face_recognition(data_path=None):
+    """Carga face_recognition y codifica una imagen vacía para cargar los modelos de dlib"""
+    from modelos import obtener_face_recognition
+    face_recognition = obtener_face_recognition(data_path)
+    imagen = np.zeros((120, 120, 3), dtype=np.uint8)
+    face_recognition.face_encodings(imagen, known_face_locations=[(10, 110, 110, 10)])
+    return face_recognition
+
+
+def calentar_clasificador():
+    """Carga el clasificador de emociones y ejecuta una inferencia de prueba"""
+    from config import CLASIFICADOR
+    from modelos import obtener_detector_lote, obtener_fer
+    if CLASIFICADOR == "lote":
+        detector = obtener_detector_lote()
+        if detector is not None:
+            alto, ancho = detector.clasificador.tamano[1], detector.clasificador.tamano[0]
+            detector.clasificador.clasificar_lote([np.zeros((alto, ancho), dtype=np.uint8)])
+            return detector
+    detector = obtener_fer()
+    if detector is not None:
+        # Con face_rectangles FER salta la detección y solo ejecuta el clasificador
+        detector.detect_emotions(np.zeros((120, 120, 3), dtype=np.uint8), face_rectangles=[(20, 20, 64, 64)])
+    return detector
+
+
+def crear_arranque_modelos(data_path=None):
+    """
+    Arranque con la carga y el calentamiento de todos los modelos compartidos.
+    TensorFlow solo se importa si el backend de emociones elegido lo necesita.
+    """
+    from modelos import obtener_detector_rostros
+    arranque = Arranque()
+    arranque.agregar("detector de rostros", obtener_detector_rostros)
+    arranque.agregar("clasificador de emociones", calentar_clasificador, obligatoria=False)
+    arranque.agregar("reconocimiento facial", lambda: calentar_face_recognition(data_path), obligatoria=False)
+    return arranque
@@ -0,0 +1,237 @@
+import os
+import time
+import logging
+import cv2
+import numpy as np
+
+from clasificador_emociones import ClasificadorEmociones, ETIQUETAS, preprocesar, recortar_rostro
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("backends_emociones")
+
+# Orden de preferencia del modo "auto": el más ligero disponible primero
+ORDEN_AUTO = ("onnx", "tflite", "opencv", "keras")
+
+
+def _ruta_por_defecto(nombre):
+    from config import DATA_DIR
+    return os.path.join(DATA_DIR, nombre)
+
+
+class BackendKeras(ClasificadorEmociones):
+    """Modelo original emotion_model.hdf5 ejecutado con TensorFlow/Keras"""
+
+    nombre = "keras"
+
+
+class BackendONNXRuntime:
+    """Modelo convertido a ONNX ejecutado con onnxruntime (sin TensorFlow)"""
+
+    nombre = "onnx"
+
+    def __init__(self, ruta_modelo=None, hilos=0):
+        ruta_modelo = ruta_modelo or _ruta_por_defecto("emotion_model.onnx")
+        if not os.path.exists(ruta_modelo):
+            raise FileNotFoundError(f"No se encontró el modelo ONNX: {ruta_modelo}")
+        import onnxruntime as ort
+
+        inicio = time.time()
+        opciones = ort.SessionOptions()
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+        self.ruta_modelo = ruta_modelo
+        self.sesion = ort.InferenceSession(ruta_modelo, opciones, providers=["CPUExecutionProvider"])
+        entrada = self.sesion.get_inputs()[0]
+        self.entrada = entrada.name
+        alto, ancho = entrada.shape[1:3]
+        self.tamano = (int(ancho), int(alto))
+        logger.info(f"Modelo ONNX cargado desde {ruta_modelo} en {time.time() - inicio:.2f} s")
+
+    def clasificar_lote(self, recortes):
+        if len(recortes) == 0:
+            return np.zeros((0, len(ETIQUETAS)), dtype=np.float32)
+        return self.sesion.run(None, {self.entrada: preprocesar(recortes)})[0].astype(np.float32)
+
+
+class BackendOpenCVDNN:
+    """Modelo ONNX ejecutado con el módulo dnn de OpenCV (sin dependencias extra)"""
+
+    nombre = "opencv"
+
+    def __init__(self, ruta_modelo=None, tamano=(64, 64)):
+        ruta_modelo = ruta_modelo or _ruta_por_defecto("emotion_model.onnx")
+        if not os.path.exists(ruta_modelo):
+            raise FileNotFoundError(f"No se encontró el modelo ONNX: {ruta_modelo}")
+        inicio = time.time()
+        self.ruta_modelo = ruta_modelo
+        self.red = cv2.dnn.readNetFromONNX(ruta_modelo)
+        self.red.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.red.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        # El grafo ONNX no expone su forma de entrada a cv2.dnn; se asume la de FER
+        self.tamano = tamano
+        logger.info(f"Modelo ONNX cargado en OpenCV DNN desde {ruta_modelo} en {time.time() - inicio:.2f} s")
+
+    def clasificar_lote(self, recortes):
+        if len(recortes) == 0:
+            return np.zeros((0, len(ETIQUETAS)), dtype=np.float32)
+        # El modelo convertido conserva la entrada NHWC de Keras
+        self.red.setInput(preprocesar(recortes))
+        return np.asarray(self.red.forward(), dtype=np.float32).reshape(len(recortes), -1)
+
+
+class BackendTFLite:
+    """
+    Modelo TFLite (float, float16 o cuantizado) con tflite_runtime o, si no
+    está instalado, con el intérprete de TensorFlow. Si la entrada o la
+    salida son enteras se aplican la escala y el punto cero del modelo.
+    """
+
+    nombre = "tflite"
+
+    def __init__(self, ruta_modelo=None, hilos=None):
+        ruta_modelo = ruta_modelo or _ruta_por_defecto("emotion_model.tflite")
+        if not os.path.exists(ruta_modelo):
+            raise FileNotFoundError(f"No se encontró el modelo TFLite: {ruta_modelo}")
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        inicio = time.time()
+        self.ruta_modelo = ruta_modelo
+        self.interprete = Interpreter(model_path=ruta_modelo, num_threads=hilos)
+        self.interprete.allocate_tensors()
+        self.entrada = self.interprete.get_input_details()[0]
+        self.salida = self.interprete.get_output_details()[0]
+        alto, ancho = self.entrada["shape"][1:3]
+        self.tamano = (int(ancho), int(alto))
+        self.lote_actual = int(self.entrada["shape"][0])
+        logger.info(f"Modelo TFLite cargado desde {ruta_modelo} en {time.time() - inicio:.2f} s "
+                    f"(entrada {np.dtype(self.entrada['dtype']).name})")
+
+    def clasificar_lote(self, recortes):
+        if len(recortes) == 0:
+            return np.zeros((0, len(ETIQUETAS)), dtype=np.float32)
+        tensor = preprocesar(recortes)
+        if len(recortes) != self.lote_actual:
+            # El intérprete solo se redimensiona cuando cambia el tamaño de lote
+            self.interprete.resize_tensor_input(self.entrada["index"], tensor.shape)
+            self.interprete.allocate_tensors()
+            self.entrada = self.interprete.get_input_details()[0]
+            self.salida = self.interprete.get_output_details()[0]
+            self.lote_actual = len(recortes)
+
+        tipo = np.dtype(self.entrada["dtype"])
+        if tipo.kind in "iu":
+            escala, cero = self.entrada["quantization"]
+            info = np.iinfo(tipo)
+            tensor = np.clip(np.rint(tensor / escala + cero), info.min, info.max).astype(tipo)
+        self.interprete.set_tensor(self.entrada["index"], tensor)
+        self.interprete.invoke()
+        salida = self.interprete.get_tensor(self.salida["index"])
+        if np.dtype(self.salida["dtype"]).kind in "iu":
+            escala, cero = self.salida["quantization"]
+            salida = (salida.astype(np.float32) - cero) * escala
+        return np.asarray(salida, dtype=np.float32).reshape(len(recortes), -1)
+
+
+CONSTRUCTORES = {
+    "keras": BackendKeras,
+    "onnx": BackendONNXRuntime,
+    "tflite": BackendTFLite,
+    "opencv": BackendOpenCVDNN
+}
+
+# Variantes del modelo: "float" es el original; el resto las genera cuantizar_modelo.py
+VARIANTES = ("float", "dinamico", "float16", "int8")
+EXTENSIONES = {"keras": ".hdf5", "onnx": ".onnx", "opencv": ".onnx", "tflite": ".tflite"}
+
+
+def ruta_variante(backend, variante="float", directorio=None):
+    """Ruta del modelo de una variante para un backend (p. ej. emotion_model_int8.tflite)"""
+    if variante not in VARIANTES:
+        raise ValueError(f"Variante de modelo desconocida: {variante}")
+    if directorio is None:
+        from config import DATA_DIR
+        directorio = DATA_DIR
+    sufijo = "" if variante == "float" else f"_{variante}"
+    return os.path.join(directorio, f"emotion_model{sufijo}{EXTENSIONES[backend]}")
+
+
+def crear_backend(tipo="auto", ruta_modelo=None, variante="float"):
+    """
+    Crea el backend de emociones indicado ("keras", "onnx", "tflite", "opencv")
+    o, con "auto", el primero que se pueda cargar en el orden ORDEN_AUTO. La
+    variante elige el modelo cuantizado correspondiente si no se da una ruta.
+    Devuelve None si ninguno está disponible.
+    """
+    tipo = (tipo or "auto").lower()
+    if tipo != "auto" and tipo not in CONSTRUCTORES:
+        raise ValueError(f"Backend de emociones desconocido: {tipo}")
+    candidatos = ORDEN_AUTO if tipo == "auto" else (tipo,)
+    for candidato in candidatos:
+        if variante != "float" and candidato == "keras":
+            # El .hdf5 solo existe en precisión completa
+            continue
+        try:
+            ruta = ruta_modelo or ruta_variante(candidato, variante)
+            backend = CONSTRUCTORES[candidato](ruta)
+            logger.info(f"Backend de emociones: {candidato} ({variante})")
+            return backend
+        except Exception as e:
+            logger.warning(f"Backend de emociones {candidato} ({variante}) no disponible: {str(e)}")
+    return None
+
+
+def recortes_de_muestra(directorio, detector_rostros, tamano=(64, 64), maximo=200):
+    """Recortes de rostros de las imágenes de un directorio (recursivo), para comparar o calibrar"""
+    recortes = []
+    for raiz, _, archivos in os.walk(directorio):
+        for archivo in sorted(archivos):
+            if not archivo.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")):
+                continue
+            imagen = cv2.imread(os.path.join(raiz, archivo))
+            if imagen is None:
+                continue
+            gray = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+            for caja in detector_rostros.detectar(imagen, gray):
+                recorte = recortar_rostro(gray, caja, tamano)
+                if recorte is not None:
+                    recortes.append(recorte)
+                    if len(recortes) >= maximo:
+                        return recortes
+    return recortes
+
+
+def comparar_backends(referencia, candidato, recortes, tolerancia=1e-3):
+    """
+    Compara las probabilidades de dos backends sobre los mismos recortes.
+    Devuelve la diferencia absoluta máxima, la coincidencia top-1 global y por
+    etiqueta (según la referencia), y si la diferencia queda dentro de la tolerancia.
+    """
+    p_ref = referencia.clasificar_lote(recortes)
+    p_cand = candidato.clasificar_lote(recortes)
+    top_ref, top_cand = p_ref.argmax(axis=1), p_cand.argmax(axis=1)
+    coincide = top_ref == top_cand
+    por_etiqueta = {}
+    for i, etiqueta in enumerate(ETIQUETAS):
+        mascara = top_ref == i
+        if mascara.any():
+            por_etiqueta[etiqueta] = {"muestras": int(mascara.sum()), "coincidencia": float(coincide[mascara].mean())}
+    diferencia = float(np.abs(p_ref - p_cand).max()) if len(recortes) else 0.0
+    return {
+        "muestras": len(recortes),
+        "diferencia_max": diferencia,
+        "coincidencia_top1": float(coincide.mean()) if len(recortes) else 1.0,
+        "por_etiqueta": por_etiqueta,
+        "paridad": diferencia <= tolerancia
+    }
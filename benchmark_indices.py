@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de recall vs latencia de los índices de identidades.
+
+Genera una población sintética de usuarios (varias fotos por usuario, con la
+misma escala de distancias que los embeddings de face_recognition) y compara
+la galería exacta contra el índice IVF con distintos valores de n_sondeo.
+
+Uso:
+    python benchmark_indices.py --usuarios 20000 --fotos 5 --consultas 500
+"""
+
+import argparse
+import time
+import numpy as np
+
+from galeria import GaleriaRostros
+from indice_identidades import IndiceIVF
+
+
+def generar_poblacion(usuarios, fotos, dim=128, semilla=0):
+    """Centros por usuario a ~0.9 de distancia entre sí y fotos a ~0.3 de su centro"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(0.0, 0.9 / np.sqrt(2 * dim), size=(usuarios, dim)).astype(np.float32)
+    ruido = rng.normal(0.0, 0.3 / np.sqrt(dim), size=(usuarios * fotos, dim)).astype(np.float32)
+    embeddings = np.repeat(centros, fotos, axis=0) + ruido
+    nombres = [f"usuario_{i}" for i in range(usuarios) for _ in range(fotos)]
+    return centros, embeddings, nombres
+
+
+def medir(galeria, consultas):
+    """Devuelve (nombres predichos, latencia media en ms)"""
+    predichos = []
+    inicio = time.perf_counter()
+    for q in consultas:
+        predichos.append(galeria.buscar(q, k=1)["candidatos"][0][0])
+    return predichos, (time.perf_counter() - inicio) / len(consultas) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latencia de índices de identidades")
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--fotos", type=int, default=5)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--sondeos", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    centros, embeddings, nombres = generar_poblacion(args.usuarios, args.fotos)
+    rng = np.random.default_rng(1)
+    elegidos = rng.choice(args.usuarios, args.consultas, replace=True)
+    consultas = centros[elegidos] + rng.normal(0.0, 0.3 / np.sqrt(centros.shape[1]),
+                                               size=(args.consultas, centros.shape[1])).astype(np.float32)
+
+    print(f"Población: {args.usuarios} usuarios x {args.fotos} fotos = {len(nombres)} embeddings")
+
+    exacta = GaleriaRostros.desde_embeddings(embeddings, nombres)
+    referencia, lat_exacta = medir(exacta, consultas)
+    aciertos = np.mean([p == f"usuario_{u}" for p, u in zip(referencia, elegidos)])
+    print(f"{'índice':<16}{'recall@1':>10}{'latencia (ms)':>16}")
+    print(f"{'exacto':<16}{1.0:>10.3f}{lat_exacta:>16.3f}   (acierto real {aciertos:.3f})")
+
+    indice = IndiceIVF()
+    inicio = time.perf_counter()
+    aproximada = GaleriaRostros.desde_embeddings(embeddings, nombres, indice=indice)
+    print(f"(construcción IVF: {time.perf_counter() - inicio:.2f} s)")
+    for n_sondeo in args.sondeos:
+        indice.n_sondeo = n_sondeo
+        predichos, latencia = medir(aproximada, consultas)
+        recall = np.mean([p == r for p, r in zip(predichos, referencia)])
+        print(f"{'ivf/' + str(n_sondeo):<16}{recall:>10.3f}{latencia:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark del coste por frame de mostrar el video en un Label de Tk.
+
+Compara el camino anterior (cvtColor + Image.fromarray + ImageOps.contain
+con Lanczos + un PhotoImage nuevo por frame) con RenderizadorVideo
+(cv2.resize en buffers reservados + paste en un único PhotoImage).
+
+Sin pantalla (sin DISPLAY) solo se mide la preparación del frame, sin la
+parte de Tk.
+
+Uso:
+    python benchmark_render.py --frames 300 --origen 640x480 --destino 780x440
+"""
+
+import argparse
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageOps, ImageTk
+
+from render_tk import RenderizadorVideo
+
+
+def tamano(texto):
+    ancho, alto = texto.lower().split("x")
+    return int(ancho), int(alto)
+
+
+def generar_frames(n, ancho, alto, semilla=0):
+    """Frames sintéticos con algo de textura para que el resize no sea trivial"""
+    rng = np.random.default_rng(semilla)
+    base = rng.integers(0, 256, size=(alto, ancho, 3), dtype=np.uint8)
+    return [np.roll(base, i * 3, axis=1) for i in range(min(n, 30))]
+
+
+def camino_anterior(frame, destino, label=None):
+    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    img = ImageOps.contain(img, destino)
+    if label is not None:
+        tk_img = ImageTk.PhotoImage(img)
+        label.imgtk = tk_img
+        label.configure(image=tk_img)
+
+
+def medir(funcion, frames, total, label=None):
+    """Mediana y p95 en ms por frame"""
+    tiempos = []
+    for i in range(total):
+        inicio = time.perf_counter()
+        funcion(frames[i % len(frames)])
+        if label is not None:
+            label.update_idletasks()
+        tiempos.append((time.perf_counter() - inicio) * 1000.0)
+    return float(np.median(tiempos)), float(np.percentile(tiempos, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por frame del render de video en Tk")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--origen", type=tamano, default=(640, 480), help="tamaño de la cámara, AxB")
+    parser.add_argument("--destino", type=tamano, default=(780, 440), help="tamaño del Label, AxB")
+    args = parser.parse_args()
+
+    frames = generar_frames(args.frames, *args.origen)
+    label = None
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        label = tk.Label(root)
+        label.pack()
+    except Exception as e:
+        print(f"Sin Tk ({e}): solo se mide la preparación del frame")
+
+    renderizador = RenderizadorVideo()
+    mostrar = renderizador.manejador(label) if label is not None else None
+
+    def camino_nuevo(frame):
+        valor = renderizador.preparar(frame, args.destino)
+        if mostrar is not None:
+            mostrar(valor)
+
+    # Calentamiento (reserva de buffers y primer PhotoImage)
+    camino_anterior(frames[0], args.destino, label)
+    camino_nuevo(frames[0])
+
+    resultados = [
+        ("anterior", medir(lambda f: camino_anterior(f, args.destino, label), frames, args.frames, label)),
+        ("renderizador", medir(camino_nuevo, frames, args.frames, label))
+    ]
+    print(f"\n{args.origen[0]}x{args.origen[1]} -> {args.destino[0]}x{args.destino[1]}, "
+          f"{args.frames} frames{' (con Tk)' if label is not None else ''}")
+    print(f"{'camino':>13} | {'mediana':>9} | {'p95':>9}")
+    for nombre, (mediana, p95) in resultados:
+        print(f"{nombre:>13} | {mediana:6.2f} ms | {p95:6.2f} ms")
+    ahorro = resultados[0][1][0] - resultados[1][1][0]
+    print(f"\nAhorro por frame: {ahorro:.2f} ms ({ahorro / resultados[0][1][0] * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import os
+import csv
+import time
+import queue
+import threading
+import logging
+from datetime import datetime
+
+from suavizado import EMOCIONES
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("bitacora_emociones")
+
+CAMPOS = ["timestamp", "pista", "usuario", "emocion", "confianza"] + EMOCIONES + ["x", "y", "w", "h", "fps"]
+POLITICAS = ("descartar", "muestrear")
+FSYNC = ("nunca", "lote", "intervalo")
+
+
+def crear_evento(momento, pista, cara, fps=0.0):
+    """Evento de la bitácora para un rostro analizado"""
+    emociones = cara.get("emotions") or {}
+    emocion = max(emociones, key=emociones.get) if emociones else None
+    x, y, w, h = [int(v) for v in cara["box"]]
+    evento = {
+        "timestamp": momento,
+        "pista": pista.id,
+        "usuario": pista.identidad or "Desconocido",
+        "emocion": emocion,
+        "confianza": float(emociones.get(emocion, 0.0)) if emocion else 0.0,
+        "x": x, "y": y, "w": w, "h": h,
+        "fps": float(fps)
+    }
+    for e in EMOCIONES:
+        evento[e] = float(emociones.get(e, 0.0))
+    return evento
+
+
+class SumideroAsincrono:
+    """
+    Base de los sumideros de eventos del detector. registrar() nunca bloquea:
+    encola el evento en una cola acotada y un hilo escritor los vuelca por
+    lotes, cuando se juntan `lote` eventos o pasan `intervalo_s` segundos.
+
+    Con la cola llena se pierde el evento. Con la política "muestrear",
+    además, a partir de `umbral_muestreo` de ocupación solo se acepta uno de
+    cada 2, 4, 8... eventos según se va llenando, para repartir las pérdidas.
+
+    Las subclases implementan escribir_lote(eventos) y, si lo necesitan,
+    abrir(), cerrar() y vaciar_si_toca(), que el hilo escritor llama al menos
+    cada `intervalo_s` segundos aunque no lleguen eventos.
+    """
+
+    nombre = "sumidero"
+
+    def __init__(self, capacidad=10000, lote=500, intervalo_s=1.0, politica="descartar",
+                 umbral_muestreo=0.5):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de sumidero desconocida: {politica}")
+        self.cola = queue.Queue(maxsize=max(1, int(capacidad)))
+        self.capacidad = max(1, int(capacidad))
+        self.lote = max(1, int(lote))
+        self.intervalo_s = intervalo_s
+        self.politica = politica
+        self.umbral_muestreo = umbral_muestreo
+        self.running = False
+        self.thread = None
+
+        self.lock = threading.Lock()
+        self.recibidos = 0
+        self.escritos = 0
+        self.descartados = 0
+        self.muestreados = 0
+        self.lotes = 0
+        self.errores = 0
+
+    def registrar(self, evento):
+        """Encola un evento sin bloquear; devuelve si se aceptó"""
+        with self.lock:
+            self.recibidos += 1
+            n = self.recibidos
+        if self.politica == "muestrear":
+            ocupacion = self.cola.qsize() / self.capacidad
+            if ocupacion >= self.umbral_muestreo:
+                # 1 de cada 2 al llegar al umbral, 1 de cada 4 a medio camino del lleno...
+                exceso = (ocupacion - self.umbral_muestreo) / max(1e-6, 1.0 - self.umbral_muestreo)
+                paso = 2 ** (1 + int(exceso * 4))
+                if n % paso:
+                    with self.lock:
+                        self.muestreados += 1
+                    return False
+        try:
+            self.cola.put_nowait(evento)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.descartados += 1
+            return False
+
+    def iniciar(self):
+        if not self.running:
+            if self.thread is not None:
+                # Un escritor anterior que no terminó a tiempo debe cerrar antes de reabrir
+                self.thread.join()
+                self.thread = None
+            self.abrir()
+            self.running = True
+            self.thread = threading.Thread(target=self._loop, name=f"sumidero-{self.nombre}", daemon=True)
+            self.thread.start()
+
+    def detener(self, timeout=5.0):
+        """
+        Detiene el escritor tras volcar lo que quede en la cola. El propio
+        hilo escritor cierra el sumidero al terminar; si no termina en
+        `timeout` segundos se deja que acabe el volcado por su cuenta.
+        """
+        if not self.running:
+            return
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            if self.thread.is_alive():
+                logger.warning(f"Sumidero {self.nombre}: el volcado no terminó en {timeout} s, "
+                               f"se cerrará al acabar ({self.cola.qsize()} eventos en cola)")
+                return
+            self.thread = None
+        logger.info(f"Sumidero {self.nombre}: {self.resumen()}")
+
+    def _loop(self):
+        try:
+            self._escribir_pendientes()
+        finally:
+            try:
+                self.cerrar()
+            except Exception as e:
+                logger.error(f"Error cerrando {self.nombre}: {str(e)}")
+
+    def _escribir_pendientes(self):
+        while self.running or not self.cola.empty():
+            eventos = []
+            limite = time.monotonic() + self.intervalo_s
+            while len(eventos) < self.lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    eventos.append(self.cola.get(timeout=min(restante, 0.1)))
+                except queue.Empty:
+                    if not self.running:
+                        break
+            if eventos:
+                self._volcar(eventos)
+            try:
+                self.vaciar_si_toca()
+            except Exception as e:
+                logger.error(f"Error vaciando {self.nombre}: {str(e)}")
+                with self.lock:
+                    self.errores += 1
+
+    def _volcar(self, eventos):
+        try:
+            self.escribir_lote(eventos)
+            with self.lock:
+                self.escritos += len(eventos)
+                self.lotes += 1
+        except Exception as e:
+            logger.error(f"Error escribiendo lote en {self.nombre}: {str(e)}")
+            with self.lock:
+                self.errores += 1
+                self.descartados += len(eventos)
+
+    def abrir(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+    def vaciar_si_toca(self):
+        pass
+
+    def escribir_lote(self, eventos):
+        raise NotImplementedError
+
+    def estadisticas(self):
+        with self.lock:
+            return {
+                "recibidos": self.recibidos,
+                "escritos": self.escritos,
+                "descartados": self.descartados,
+                "muestreados": self.muestreados,
+                "lotes": self.lotes,
+                "errores": self.errores,
+                "en_cola": self.cola.qsize()
+            }
+
+    def resumen(self):
+        s = self.estadisticas()
+        return (f"{s['escritos']} eventos escritos en {s['lotes']} lotes, "
+                f"{s['descartados']} descartados, {s['muestreados']} omitidos por muestreo")
+
+
+class BitacoraCSV(SumideroAsincrono):
+    """
+    Bitácora de emociones en CSV con el archivo abierto durante toda la
+    sesión. Se rota al superar `max_bytes` (0 = sin límite) o, con
+    diaria=True, al cambiar de día; se conservan `copias` archivos
+    anteriores (archivo.1.csv, archivo.2.csv...).
+
+    Si la ruta ya existe con otras columnas (no la escribió esta bitácora),
+    no se toca: se escribe en archivo_2.csv, archivo_3.csv... la primera
+    libre o con el formato actual.
+
+    fsync: "nunca" (lo decide el sistema), "lote" (tras cada lote) o
+    "intervalo" (como mucho cada `fsync_s` segundos).
+    """
+
+    nombre = "csv"
+
+    def __init__(self, ruta="eventos_emociones.csv", max_bytes=50 * 1024 * 1024, diaria=False, copias=5,
+                 fsync="lote", fsync_s=5.0, **kwargs):
+        super().__init__(**kwargs)
+        if fsync not in FSYNC:
+            raise ValueError(f"Política de fsync desconocida: {fsync}")
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.diaria = diaria
+        self.copias = copias
+        self.fsync = fsync
+        self.fsync_s = fsync_s
+        self.archivo = None
+        self.escritor = None
+        self.dia = None
+        self.ultimo_fsync = 0.0
+        self.rotaciones = 0
+
+    def _ruta_copia(self, n):
+        base, ext = os.path.splitext(self.ruta)
+        return f"{base}.{n}{ext}"
+
+    @staticmethod
+    def _formato_propio(ruta):
+        """Si la ruta no existe, está vacía o tiene el encabezado de CAMPOS"""
+        if not os.path.exists(ruta) or os.path.getsize(ruta) == 0:
+            return True
+        with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+            return f.readline().strip() == ",".join(CAMPOS)
+
+    def abrir(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        if not self._formato_propio(self.ruta):
+            # Un archivo con otras columnas no se mezcla ni se rota: se usa otro nombre
+            base, ext = os.path.splitext(self.ruta)
+            n = 2
+            while not self._formato_propio(f"{base}_{n}{ext}"):
+                n += 1
+            logger.warning(f"{self.ruta} tiene otro formato y no se modifica; "
+                           f"los eventos se escriben en {base}_{n}{ext}")
+            self.ruta = f"{base}_{n}{ext}"
+        self.archivo = open(self.ruta, "a", newline="", encoding="utf-8")
+        self.escritor = csv.DictWriter(self.archivo, fieldnames=CAMPOS, extrasaction="ignore")
+        if self.archivo.tell() == 0:
+            self.escritor.writeheader()
+        self.dia = datetime.now().date()
+
+    def cerrar(self):
+        if self.archivo:
+            try:
+                self.archivo.flush()
+                if self.fsync != "nunca":
+                    os.fsync(self.archivo.fileno())
+            finally:
+                self.archivo.close()
+                self.archivo = None
+                self.escritor = None
+
+    def _rotar_archivos(self):
+        if self.copias <= 0:
+            os.remove(self.ruta)
+            return
+        for n in range(self.copias - 1, 0, -1):
+            if os.path.exists(self._ruta_copia(n)):
+                os.replace(self._ruta_copia(n), self._ruta_copia(n + 1))
+        os.replace(self.ruta, self._ruta_copia(1))
+        self.rotaciones += 1
+
+    def _rotar_si_toca(self):
+        hoy = datetime.now().date()
+        por_tamano = self.max_bytes and self.archivo.tell() >= self.max_bytes
+        por_dia = self.diaria and hoy != self.dia
+        if por_tamano or por_dia:
+            self.cerrar()
+            self._rotar_archivos()
+            self.abrir()
+
+    def escribir_lote(self, eventos):
+        self._rotar_si_toca()
+        filas = []
+        for evento in eventos:
+            fila = dict(evento)
+            fila["timestamp"] = datetime.fromtimestamp(evento["timestamp"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            fila["confianza"] = round(evento["confianza"], 4)
+            for e in EMOCIONES:
+                fila[e] = round(evento[e], 4)
+            fila["fps"] = round(evento["fps"], 1)
+            filas.append(fila)
+        self.escritor.writerows(filas)
+        self.archivo.flush()
+        ahora = time.monotonic()
+        if self.fsync == "lote" or (self.fsync == "intervalo" and ahora - self.ultimo_fsync >= self.fsync_s):
+            os.fsync(self.archivo.fileno())
+            self.ultimo_fsync = ahora
@@ -0,0 +1,196 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("cache_embeddings")
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class CacheEmbeddings:
+    """
+    Almacén versionado de embeddings faciales en disco.
+
+    Guarda una matriz float32 (N x 128) en un archivo .npy que se abre con
+    memory-map, junto con un manifiesto JSON que registra, para cada foto,
+    el usuario, la ruta relativa, mtime, tamaño, hash y la fila que ocupa.
+    Al sincronizar solo se recodifican las fotos nuevas o modificadas.
+    """
+
+    VERSION = 1
+    ARCHIVO_MATRIZ = "embeddings.npy"
+    ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+    def __init__(self, directorio_usuarios, directorio_cache, face_recognition, persistir=True):
+        self.directorio_usuarios = directorio_usuarios
+        self.directorio_cache = directorio_cache
+        self.face_recognition = face_recognition
+        self.persistir = persistir
+        self.ruta_matriz = os.path.join(directorio_cache, self.ARCHIVO_MATRIZ)
+        self.ruta_manifiesto = os.path.join(directorio_cache, self.ARCHIVO_MANIFIESTO)
+
+    @staticmethod
+    def _hash_archivo(ruta):
+        """Calcula el SHA-1 del contenido de un archivo"""
+        h = hashlib.sha1()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 16), b""):
+                h.update(bloque)
+        return h.hexdigest()
+
+    def _listar_fotos(self):
+        """Devuelve {ruta_relativa: (usuario, ruta_absoluta, stat)} de las fotos en disco"""
+        fotos = {}
+        if not os.path.exists(self.directorio_usuarios):
+            return fotos
+        for user in sorted(os.listdir(self.directorio_usuarios)):
+            carpeta = os.path.join(self.directorio_usuarios, user)
+            if not os.path.isdir(carpeta):
+                continue
+            for img_file in sorted(os.listdir(carpeta)):
+                if not img_file.lower().endswith(EXTENSIONES_IMAGEN):
+                    continue
+                img_path = os.path.join(carpeta, img_file)
+                try:
+                    fotos[f"{user}/{img_file}"] = (user, img_path, os.stat(img_path))
+                except OSError as e:
+                    logger.error(f"No se pudo leer {img_path}: {str(e)}")
+        return fotos
+
+    def _cargar(self):
+        """Carga manifiesto y matriz del disco; devuelve (entradas, matriz) o ({}, None)"""
+        try:
+            if not (os.path.exists(self.ruta_manifiesto) and os.path.exists(self.ruta_matriz)):
+                return {}, None
+            with open(self.ruta_manifiesto, "r", encoding="utf-8") as f:
+                manifiesto = json.load(f)
+            if manifiesto.get("version") != self.VERSION:
+                logger.info("Versión de caché distinta, se reconstruirá")
+                return {}, None
+            matriz = np.load(self.ruta_matriz, mmap_mode="r")
+            if matriz.ndim != 2 or matriz.shape[0] != manifiesto.get("filas"):
+                logger.warning("Caché de embeddings inconsistente, se reconstruirá")
+                return {}, None
+            return {e["ruta"]: e for e in manifiesto.get("entradas", [])}, matriz
+        except Exception as e:
+            logger.error(f"Error al leer caché de embeddings: {str(e)}")
+            return {}, None
+
+    def _codificar(self, img_path):
+        """Obtiene el primer embedding de una foto o None si no hay rostro"""
+        try:
+            img = self.face_recognition.load_image_file(img_path)
+            encs = self.face_recognition.face_encodings(img)
+            if encs:
+                return np.asarray(encs[0], dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error al procesar {img_path}: {str(e)}")
+        return None
+
+    def _guardar(self, entradas, matriz):
+        """Escribe matriz y manifiesto de forma atómica (archivo temporal + replace)"""
+        try:
+            os.makedirs(self.directorio_cache, exist_ok=True)
+            tmp_matriz = self.ruta_matriz + ".tmp"
+            with open(tmp_matriz, "wb") as f:
+                np.save(f, matriz)
+            os.replace(tmp_matriz, self.ruta_matriz)
+
+            manifiesto = {
+                "version": self.VERSION,
+                "dim": int(matriz.shape[1]),
+                "filas": int(matriz.shape[0]),
+                "entradas": entradas
+            }
+            tmp_manifiesto = self.ruta_manifiesto + ".tmp"
+            with open(tmp_manifiesto, "w", encoding="utf-8") as f:
+                json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_manifiesto, self.ruta_manifiesto)
+        except Exception as e:
+            logger.error(f"No se pudo guardar la caché de embeddings: {str(e)}")
+
+    def sincronizar(self):
+        """
+        Sincroniza la caché con data/usuarios y devuelve (matriz, nombres).
+        Las fotos sin cambios reutilizan su fila; las añadidas o modificadas se
+        codifican y las eliminadas se descartan.
+        """
+        previas, matriz_previa = self._cargar() if self.persistir else ({}, None)
+        fotos = self._listar_fotos()
+
+        entradas = []
+        filas = []
+        nombres = []
+        reutilizadas = codificadas = 0
+        metadatos_cambiados = False
+
+        for rel, (user, img_path, st) in fotos.items():
+            previa = previas.get(rel)
+            fila_previa = None
+            sha1 = None
+            if previa is not None:
+                if previa["mtime"] == st.st_mtime and previa["tamano"] == st.st_size:
+                    fila_previa = previa["fila"]
+                    sha1 = previa["sha1"]
+                else:
+                    sha1 = self._hash_archivo(img_path)
+                    metadatos_cambiados = True
+                    if sha1 == previa["sha1"]:
+                        fila_previa = previa["fila"]
+
+            if fila_previa is not None:
+                reutilizadas += 1
+                vector = matriz_previa[fila_previa] if fila_previa >= 0 else None
+            else:
+                codificadas += 1
+                sha1 = sha1 or self._hash_archivo(img_path)
+                vector = self._codificar(img_path)
+
+            entrada = {
+                "ruta": rel,
+                "nombre": user.replace("_", " "),
+                "mtime": st.st_mtime,
+                "tamano": st.st_size,
+                "sha1": sha1,
+                "fila": -1
+            }
+            # Las fotos sin rostro quedan en el manifiesto con fila -1 para no reintentarlas
+            if vector is not None:
+                entrada["fila"] = len(filas)
+                filas.append(vector)
+                nombres.append(entrada["nombre"])
+            entradas.append(entrada)
+
+        eliminadas = len(set(previas) - set(fotos))
+        sin_cambios = codificadas == 0 and eliminadas == 0 and not metadatos_cambiados \
+            and matriz_previa is not None \
+            and len(filas) == matriz_previa.shape[0] \
+            and all(e["fila"] == previas[e["ruta"]]["fila"] for e in entradas)
+
+        if sin_cambios:
+            matriz = matriz_previa
+        elif filas:
+            matriz = np.vstack(filas).astype(np.float32)
+        else:
+            matriz = np.zeros((0, 128), dtype=np.float32)
+
+        if self.persistir and not sin_cambios:
+            # Soltar el memory-map antes de reemplazar el archivo (necesario en Windows)
+            filas.clear()
+            vector = matriz_previa = None
+            self._guardar(entradas, matriz)
+
+        logger.info(f"Caché de embeddings: {reutilizadas} reutilizadas, {codificadas} codificadas, "
+                    f"{eliminadas} eliminadas")
+        return matriz, nombres
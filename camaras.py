@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Varias cámaras (aulas) en una sola máquina. Cada fuente tiene su hilo de
+captura (CapturaCamara) que conserva solo el frame más reciente, y un
+grupo de hilos de análisis compartido por todas las fuentes atiende las
+cámaras por turnos: cada hilo toma la siguiente cámara con un frame nuevo,
+con como mucho un frame en análisis por cámara, de modo que una cámara con
+muchos rostros no acapara a las demás.
+
+Los modelos no se copian por cámara: cada fuente tiene su propio núcleo
+(seguidor y pistas) clonado de uno común, y los recortes de todas las
+cámaras se clasifican en el mismo micro-lote. La capacidad total crece con
+el número de hilos, no con el número de cámaras.
+
+Uso:
+    python camaras.py 0 1
+    python camaras.py aula1.mp4 aula2.mp4 rtsp://camara3/stream --hilos 4 --segundos 60
+    python camaras.py aula1.mp4 aula2.mp4 --repetir --base data/detector.db
+"""
+
+import os
+import time
+import argparse
+import threading
+import logging
+from datetime import datetime
+
+from config import FUENTE_CAMARA, FUENTES_CAMARAS, HILOS_CAMARAS
+from captura import CapturaCamara, interpretar_fuente
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("camaras")
+
+
+def fuentes_configuradas():
+    """Fuentes de config.py: FUENTES_CAMARAS separadas por comas, o solo FUENTE_CAMARA"""
+    fuentes = [f.strip() for f in FUENTES_CAMARAS.split(",") if f.strip()]
+    return [interpretar_fuente(f) for f in fuentes or [FUENTE_CAMARA]]
+
+
+class Camara:
+    """Estado de una fuente: captura, núcleo propio y último resultado"""
+
+    def __init__(self, indice, fuente, captura, nucleo):
+        self.indice = indice
+        self.fuente = fuente
+        self.nombre = f"camara{indice}"
+        self.captura = captura
+        self.nucleo = nucleo
+        self.ultimo_id = 0
+        self.en_analisis = False
+        self.resultado = None
+
+        # Estadísticas
+        self.analizados = 0
+        self.segundos = 0.0
+        self.latencia = 0.0
+
+    def hay_frame_nuevo(self):
+        return self.captura.frame_id > self.ultimo_id
+
+
+class GestorCamaras:
+    """
+    Abre N fuentes (índices de dispositivo, archivos o URLs) y las analiza
+    con un grupo de `hilos` hilos compartido (0 = uno por núcleo).
+
+    `al_resultado(camara, resultado)` se llama desde el hilo de análisis con
+    el dict de NucleoDeteccion.procesar() más "frame_id" y "t_captura".
+    """
+
+    def __init__(self, fuentes=None, hilos=None, reconocer=True, usar_hist=False, al_resultado=None,
+                 ancho=640, alto=480, tiempo_real=True, repetir=False):
+        self.fuentes = [interpretar_fuente(f) for f in fuentes] if fuentes else fuentes_configuradas()
+        hilos = HILOS_CAMARAS if hilos is None else hilos
+        self.hilos = hilos if hilos > 0 else (os.cpu_count() or 1)
+        self.reconocer = reconocer
+        self.usar_hist = usar_hist
+        self.al_resultado = al_resultado
+        self.ancho = ancho
+        self.alto = alto
+        self.tiempo_real = tiempo_real
+        self.repetir = repetir
+
+        self.camaras = []
+        self.trabajadores = []
+        self.running = False
+        self.condicion = threading.Condition()
+        self.turno = 0
+        self.inicio = None
+
+    def iniciar(self):
+        """Abre las fuentes y arranca los hilos de análisis; devuelve cuántas fuentes se abrieron"""
+        if self.running:
+            return len(self.camaras)
+        from nucleo_deteccion import NucleoDeteccion
+        base = NucleoDeteccion(reconocer=self.reconocer)
+
+        for indice, fuente in enumerate(self.fuentes):
+            captura = CapturaCamara(fuente, self.ancho, self.alto, tiempo_real=self.tiempo_real,
+                                    repetir=self.repetir, al_frame=self._avisar)
+            if not captura.iniciar():
+                continue
+            self.camaras.append(Camara(indice, fuente, captura, base.clonar()))
+        if not self.camaras:
+            logger.error("No se pudo abrir ninguna fuente de video")
+            return 0
+
+        self.running = True
+        self.inicio = time.time()
+        for i in range(self.hilos):
+            hilo = threading.Thread(target=self._trabajador, name=f"analisis-{i}", daemon=True)
+            hilo.start()
+            self.trabajadores.append(hilo)
+        logger.info(f"{len(self.camaras)} cámaras con {self.hilos} hilos de análisis compartidos")
+        return len(self.camaras)
+
+    def detener(self):
+        self.running = False
+        with self.condicion:
+            self.condicion.notify_all()
+        for hilo in self.trabajadores:
+            hilo.join(timeout=2.0)
+        self.trabajadores = []
+        for camara in self.camaras:
+            camara.captura.detener()
+        if self.camaras:
+            logger.info(f"Cámaras detenidas: {self.resumen()}")
+
+    def activas(self):
+        """Si queda alguna cámara capturando o algún frame por analizar"""
+        with self.condicion:
+            return any(c.captura.running or c.hay_frame_nuevo() or c.en_analisis for c in self.camaras)
+
+    def _avisar(self, captura):
+        with self.condicion:
+            self.condicion.notify()
+
+    def _siguiente(self):
+        """Siguiente cámara por turnos con un frame nuevo y sin otro frame en análisis, o None"""
+        with self.condicion:
+            while self.running:
+                n = len(self.camaras)
+                for paso in range(n):
+                    posicion = (self.turno + paso) % n
+                    camara = self.camaras[posicion]
+                    if not camara.en_analisis and camara.hay_frame_nuevo():
+                        camara.en_analisis = True
+                        # El turno pasa a la cámara siguiente a la atendida
+                        self.turno = (posicion + 1) % n
+                        return camara
+                self.condicion.wait(0.1)
+            return None
+
+    def _trabajador(self):
+        while self.running:
+            camara = self._siguiente()
+            if camara is None:
+                break
+            try:
+                frame_id, frame, t_captura = camara.captura.leer(camara.ultimo_id, timeout=0)
+                if frame is None:
+                    continue
+                camara.ultimo_id = frame_id
+                inicio = time.perf_counter()
+                resultado = camara.nucleo.procesar(frame, self.usar_hist)
+                camara.segundos += time.perf_counter() - inicio
+                camara.latencia = time.time() - t_captura
+                camara.analizados += 1
+                resultado["frame_id"] = frame_id
+                resultado["t_captura"] = t_captura
+                camara.resultado = resultado
+                if self.al_resultado:
+                    self.al_resultado(camara, resultado)
+            except Exception as e:
+                logger.error(f"Error analizando {camara.nombre}: {str(e)}")
+            finally:
+                with self.condicion:
+                    camara.en_analisis = False
+                    # Puede haber llegado un frame mientras tanto
+                    self.condicion.notify()
+
+    def estadisticas(self):
+        transcurrido = max(1e-6, time.time() - self.inicio) if self.inicio else 0.0
+        camaras = [{
+            "nombre": c.nombre,
+            "fuente": c.fuente,
+            "leidos": c.captura.frames_leidos,
+            "analizados": c.analizados,
+            "fps_analisis": c.analizados / transcurrido if transcurrido else 0.0,
+            "ms_por_frame": c.segundos / c.analizados * 1000 if c.analizados else 0.0,
+            "latencia_ms": c.latencia * 1000
+        } for c in self.camaras]
+        total = sum(c["analizados"] for c in camaras)
+        return {"camaras": camaras, "analizados": total,
+                "fps_total": total / transcurrido if transcurrido else 0.0}
+
+    def resumen(self):
+        e = self.estadisticas()
+        partes = [f"{c['nombre']} {c['fps_analisis']:.1f} fps" for c in e["camaras"]]
+        return f"{e['fps_total']:.1f} frames/s analizados en total ({', '.join(partes)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis de emociones en varias cámaras a la vez")
+    parser.add_argument("fuentes", nargs="*", help="índices de cámara, archivos o URLs (por defecto, config.py)")
+    parser.add_argument("--hilos", type=int, default=None, help="hilos de análisis (0 = uno por núcleo)")
+    parser.add_argument("--segundos", type=float, default=0, help="duración (0 = hasta que terminen las fuentes)")
+    parser.add_argument("--repetir", action="store_true", help="repetir los archivos de vídeo al terminar")
+    parser.add_argument("--sin-ritmo", action="store_true", help="leer los archivos tan rápido como se pueda")
+    parser.add_argument("--hist", action="store_true", help="ecualizar histograma")
+    parser.add_argument("--sin-reconocimiento", action="store_true", help="no identificar usuarios")
+    parser.add_argument("--base", default=None, help="guardar las emociones en esta base de datos SQLite")
+    args = parser.parse_args()
+
+    sumideros = {}
+    if args.base:
+        from almacen_sqlite import AlmacenSQLite
+        from bitacora_emociones import crear_evento
+
+    def al_resultado(camara, resultado):
+        sumidero = sumideros.get(camara.indice)
+        if sumidero:
+            for pista, cara in resultado["pistas"]:
+                sumidero.registrar(crear_evento(resultado["t_captura"], pista, cara))
+
+    gestor = GestorCamaras(args.fuentes or None, args.hilos, reconocer=not args.sin_reconocimiento,
+                           usar_hist=args.hist, al_resultado=al_resultado,
+                           tiempo_real=not args.sin_ritmo, repetir=args.repetir)
+    if args.base:
+        # Una sesión por cámara, para poder resumir cada aula por separado
+        arranque = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for i, fuente in enumerate(gestor.fuentes):
+            sumideros[i] = AlmacenSQLite(args.base, sesion=f"{arranque} camara{i} ({fuente})")
+            sumideros[i].iniciar()
+    try:
+        if not gestor.iniciar():
+            return
+        fin = time.time() + args.segundos if args.segundos else None
+        while gestor.activas() and (fin is None or time.time() < fin):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gestor.detener()
+        for sumidero in sumideros.values():
+            sumidero.detener()
+
+    e = gestor.estadisticas()
+    for c in e["camaras"]:
+        print(f"{c['nombre']} ({c['fuente']}): {c['analizados']}/{c['leidos']} frames analizados, "
+              f"{c['fps_analisis']:.1f} fps, {c['ms_por_frame']:.1f} ms/frame, latencia {c['latencia_ms']:.0f} ms")
+    print(f"Total: {e['analizados']} frames, {e['fps_total']:.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import logging
+import cv2
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("captura")
+
+
+def interpretar_fuente(fuente):
+    """Índice de dispositivo si la fuente es un número ("0", 1...), si no la ruta o URL tal cual"""
+    if isinstance(fuente, str) and fuente.strip().isdigit():
+        return int(fuente.strip())
+    return fuente
+
+
+def es_archivo(fuente):
+    return isinstance(fuente, str) and os.path.isfile(fuente)
+
+
+class CapturaCamara:
+    """
+    Hilo de captura que drena cv2.VideoCapture continuamente y conserva solo
+    el frame más reciente. Los consumidores piden el último frame con leer()
+    y los frames que nadie llegó a leer se descartan, así la latencia entre
+    la cámara y la inferencia queda acotada a una inferencia.
+
+    La fuente puede ser un índice de dispositivo, una URL o un archivo de
+    vídeo. Los archivos se leen a su ritmo nominal (como si fueran una
+    cámara en directo) salvo con tiempo_real=False, y con repetir=True
+    vuelven a empezar al terminar. `al_frame`, si se indica, se llama desde
+    el hilo de captura con cada frame nuevo.
+    """
+
+    def __init__(self, fuente=0, ancho=640, alto=480, max_errores=30, tiempo_real=True, repetir=False,
+                 al_frame=None):
+        self.fuente = interpretar_fuente(fuente)
+        self.ancho = ancho
+        self.alto = alto
+        self.max_errores = max_errores
+        self.archivo = es_archivo(self.fuente)
+        self.tiempo_real = tiempo_real
+        self.repetir = repetir
+        self.al_frame = al_frame
+        self.intervalo = 0.0
+
+        self.cap = None
+        self.thread = None
+        self.running = False
+        self.condicion = threading.Condition()
+        self.frame = None
+        self.frame_id = 0
+        self.timestamp = 0.0
+
+        # Estadísticas
+        self.frames_leidos = 0
+        self.frames_descartados = 0
+        self._ultimo_entregado = 0
+
+    def iniciar(self):
+        """Abre la fuente y arranca el hilo de captura; devuelve True si se abrió"""
+        if self.running:
+            return True
+        self.cap = cv2.VideoCapture(self.fuente)
+        if not self.cap.isOpened():
+            logger.error(f"No se pudo abrir la fuente de video: {self.fuente}")
+            self.cap.release()
+            self.cap = None
+            return False
+        if self.archivo:
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.intervalo = 1.0 / fps if self.tiempo_real and fps and fps > 0 else 0.0
+        else:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.ancho)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.alto)
+            # Pedir al driver el búfer mínimo (no todos los backends lo respetan)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Captura iniciada en fuente {self.fuente}")
+        return True
+
+    def detener(self):
+        """Detiene el hilo y libera la cámara"""
+        self.running = False
+        with self.condicion:
+            self.condicion.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        if self.cap:
+            try:
+                self.cap.release()
+            except Exception as e:
+                logger.error(f"Error al liberar la cámara: {str(e)}")
+            self.cap = None
+        logger.info(f"Captura detenida ({self.frames_leidos} leídos, {self.frames_descartados} descartados)")
+
+    def _loop(self):
+        errores = 0
+        siguiente = time.perf_counter()
+        while self.running:
+            if self.intervalo:
+                # Archivos al ritmo nominal; si se va con retraso no se acumula
+                espera = siguiente - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                siguiente = max(siguiente + self.intervalo, time.perf_counter())
+            try:
+                ret, frame = self.cap.read()
+            except Exception as e:
+                logger.error(f"Error leyendo de la cámara: {str(e)}")
+                ret, frame = False, None
+
+            if not ret and self.archivo:
+                if self.repetir and self.frames_leidos:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                logger.info(f"Fin del vídeo {self.fuente}")
+                self.running = False
+                with self.condicion:
+                    self.condicion.notify_all()
+                break
+
+            if not ret:
+                errores += 1
+                if errores >= self.max_errores:
+                    logger.error("Demasiados errores consecutivos de cámara, se detiene la captura")
+                    self.running = False
+                    with self.condicion:
+                        self.condicion.notify_all()
+                    break
+                time.sleep(0.01)
+                continue
+
+            errores = 0
+            with self.condicion:
+                # Si el frame anterior no se llegó a entregar, se descarta
+                if self.frame_id > self._ultimo_entregado:
+                    self.frames_descartados += 1
+                self.frame = frame
+                self.frame_id += 1
+                self.timestamp = time.time()
+                self.frames_leidos += 1
+                self.condicion.notify_all()
+            if self.al_frame:
+                self.al_frame(self)
+
+    def leer(self, ultimo_id=0, timeout=1.0):
+        """
+        Devuelve (frame_id, frame, timestamp) del frame más reciente posterior a
+        ultimo_id, esperando hasta timeout segundos. Si no llega ninguno devuelve
+        (None, None, None).
+        """
+        fin = time.time() + timeout
+        with self.condicion:
+            while self.running and self.frame_id <= ultimo_id:
+                restante = fin - time.time()
+                if restante <= 0:
+                    break
+                self.condicion.wait(restante)
+            if self.frame_id <= ultimo_id or self.frame is None:
+                return None, None, None
+            self._ultimo_entregado = self.frame_id
+            return self.frame_id, self.frame, self.timestamp
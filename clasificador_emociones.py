@@ -0,0 +1,259 @@
+import os
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+import cv2
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("clasificador_emociones")
+
+# Orden de salida del modelo de FER (emotion_model.hdf5)
+ETIQUETAS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+# Margen que FER añade alrededor de cada rostro antes de recortar
+DESPLAZAMIENTO = (10, 10)
+RELLENO = 40
+
+
+def a_cuadrado(caja):
+    """Amplía el lado menor de la caja (x, y, w, h) para que sea cuadrada, como FER"""
+    x, y, w, h = [int(v) for v in caja]
+    if h > w:
+        diferencia = h - w
+        x -= diferencia // 2
+        w += diferencia
+    elif w > h:
+        diferencia = w - h
+        y -= diferencia // 2
+        h += diferencia
+    return x, y, w, h
+
+
+def recortar_rostro(gray, caja, tamano=(64, 64)):
+    """
+    Recorta y redimensiona un rostro de una imagen en escala de grises con el
+    mismo preprocesado geométrico que FER.detect_emotions. Devuelve un array
+    uint8 de `tamano` o None si el recorte queda vacío.
+    """
+    x, y, w, h = a_cuadrado(caja)
+    x1, x2 = x - DESPLAZAMIENTO[0], x + w + DESPLAZAMIENTO[0]
+    y1, y2 = y - DESPLAZAMIENTO[1], y + h + DESPLAZAMIENTO[1]
+    if x1 < 0 or y1 < 0:
+        gray = cv2.copyMakeBorder(gray, RELLENO, RELLENO, RELLENO, RELLENO, cv2.BORDER_CONSTANT, value=0)
+        x1, x2, y1, y2 = x1 + RELLENO, x2 + RELLENO, y1 + RELLENO, y2 + RELLENO
+        x1, y1 = max(x1, 0), max(y1, 0)
+    recorte = gray[y1:y2, x1:x2]
+    if recorte.size == 0:
+        return None
+    return cv2.resize(recorte, tamano)
+
+
+def preprocesar(recortes):
+    """Apila recortes uint8 en un tensor (N, alto, ancho, 1) normalizado a [-1, 1]"""
+    lote = np.asarray(recortes, dtype=np.float32)
+    lote = (lote / 255.0 - 0.5) * 2.0
+    return lote[..., np.newaxis]
+
+
+class ClasificadorEmociones:
+    """
+    Clasificador de emociones que ejecuta el modelo Keras de FER una sola vez
+    por lote de recortes, en lugar de una llamada por rostro y frame.
+    """
+
+    nombre = "keras"
+
+    def __init__(self, ruta_modelo=None):
+        if ruta_modelo is None:
+            from config import DATA_DIR
+            ruta_modelo = os.path.join(DATA_DIR, "emotion_model.hdf5")
+        if not os.path.exists(ruta_modelo):
+            raise FileNotFoundError(f"No se encontró el modelo de emociones: {ruta_modelo}")
+
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+        from tensorflow.keras.models import load_model
+
+        inicio = time.time()
+        self.ruta_modelo = ruta_modelo
+        self.modelo = load_model(ruta_modelo, compile=False)
+        alto, ancho = self.modelo.input_shape[1:3]
+        self.tamano = (int(ancho), int(alto))
+        logger.info(f"Modelo de emociones cargado desde {ruta_modelo} en {time.time() - inicio:.2f} s "
+                    f"(entrada {self.tamano[0]}x{self.tamano[1]})")
+
+    def clasificar_lote(self, recortes):
+        """
+        Clasifica una lista de recortes en escala de grises (ya al tamaño del
+        modelo) con una sola inferencia. Devuelve un array (N, 7) de
+        probabilidades en el orden de ETIQUETAS.
+        """
+        if len(recortes) == 0:
+            return np.zeros((0, len(ETIQUETAS)), dtype=np.float32)
+        # predict_on_batch evita el coste fijo de predict() (dataset, callbacks)
+        return np.asarray(self.modelo.predict_on_batch(preprocesar(recortes)), dtype=np.float32)
+
+
+class MicroLote:
+    """
+    Agrupa peticiones de clasificación de varios hilos (frames, cámaras) en
+    lotes: un hilo espera la primera petición y sigue acumulando hasta reunir
+    `max_lote` recortes o agotar `max_espera_ms`, y entonces ejecuta una sola
+    inferencia. Cada petición recibe un Future con sus filas del resultado.
+    """
+
+    def __init__(self, funcion, max_lote=32, max_espera_ms=5.0):
+        self.funcion = funcion
+        self.max_lote = max(1, int(max_lote))
+        self.max_espera = max(0.0, max_espera_ms) / 1000.0
+        self.cola = queue.Queue()
+        self.running = False
+        self.thread = None
+
+        # Estadísticas
+        self.lock = threading.Lock()
+        self.lotes = 0
+        self.elementos = 0
+
+    def iniciar(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._loop, name="micro-lote", daemon=True)
+            self.thread.start()
+
+    def detener(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+        # Las peticiones pendientes no se quedan esperando para siempre
+        try:
+            while True:
+                _, futuro = self.cola.get_nowait()
+                futuro.set_exception(RuntimeError("Micro-lote detenido"))
+        except queue.Empty:
+            pass
+
+    def enviar(self, recortes):
+        """Encola un grupo de recortes; devuelve un Future con su array (n, 7)"""
+        futuro = Future()
+        if len(recortes) == 0:
+            futuro.set_result(np.zeros((0, len(ETIQUETAS)), dtype=np.float32))
+            return futuro
+        if not self.running:
+            self.iniciar()
+        self.cola.put((list(recortes), futuro))
+        return futuro
+
+    def clasificar(self, recortes, timeout=5.0):
+        """Versión bloqueante de enviar()"""
+        return self.enviar(recortes).result(timeout=timeout)
+
+    def _loop(self):
+        while self.running:
+            try:
+                primera = self.cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            peticiones = [primera]
+            total = len(primera[0])
+            limite = time.perf_counter() + self.max_espera
+            while total < self.max_lote:
+                restante = limite - time.perf_counter()
+                try:
+                    peticion = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                peticiones.append(peticion)
+                total += len(peticion[0])
+
+            recortes = [r for grupo, _ in peticiones for r in grupo]
+            try:
+                resultado = self.funcion(recortes)
+            except Exception as e:
+                logger.error(f"Error en inferencia por lotes: {str(e)}")
+                for _, futuro in peticiones:
+                    futuro.set_exception(e)
+                continue
+
+            inicio = 0
+            for grupo, futuro in peticiones:
+                futuro.set_result(resultado[inicio:inicio + len(grupo)])
+                inicio += len(grupo)
+            with self.lock:
+                self.lotes += 1
+                self.elementos += total
+
+    def tamano_medio(self):
+        """Número medio de recortes por inferencia"""
+        with self.lock:
+            return self.elementos / self.lotes if self.lotes else 0.0
+
+
+class DetectorEmocionesLote:
+    """
+    Adaptador con la interfaz de FER (find_faces / detect_emotions) que recorta
+    los rostros y los clasifica a través de un MicroLote compartido.
+    """
+
+    def __init__(self, clasificador, detector_rostros, micro_lote=None):
+        self.clasificador = clasificador
+        self.detector_rostros = detector_rostros
+        self.micro_lote = micro_lote
+
+    def find_faces(self, frame):
+        """Localiza rostros con el detector compartido (misma interfaz que FER.find_faces)"""
+        return self.detector_rostros.detectar(frame)
+
+    def recortar(self, frame, cajas):
+        """Recortes al tamaño del modelo y cajas a las que corresponden"""
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        recortes, validas = [], []
+        for caja in cajas:
+            recorte = recortar_rostro(gray, caja, self.clasificador.tamano)
+            if recorte is not None:
+                recortes.append(recorte)
+                validas.append(tuple(int(v) for v in caja))
+        return recortes, validas
+
+    def detect_emotions(self, frame, face_rectangles=None):
+        """Devuelve [{"box": (x, y, w, h), "emotions": {...}}] como FER.detect_emotions"""
+        cajas = self.find_faces(frame) if face_rectangles is None else face_rectangles
+        recortes, validas = self.recortar(frame, cajas)
+        if not recortes:
+            return []
+        if self.micro_lote is not None:
+            probabilidades = self.micro_lote.clasificar(recortes)
+        else:
+            probabilidades = self.clasificador.clasificar_lote(recortes)
+        return [
+            {"box": caja, "emotions": {e: round(float(p), 2) for e, p in zip(ETIQUETAS, fila)}}
+            for caja, fila in zip(validas, probabilidades)
+        ]
+
+
+def crear_detector_lote(detector_rostros, clasificador=None, ruta_modelo=None):
+    """
+    Crea un DetectorEmocionesLote con la configuración de config.py sobre el
+    clasificador dado (cualquier backend con `tamano` y `clasificar_lote`) o,
+    si no se indica, sobre el modelo Keras. Devuelve None si no se puede cargar.
+    """
+    from config import MAX_LOTE, ESPERA_LOTE_MS
+    if clasificador is None:
+        try:
+            clasificador = ClasificadorEmociones(ruta_modelo)
+        except Exception as e:
+            logger.warning(f"Clasificador por lotes no disponible: {str(e)}")
+            return None
+    micro_lote = MicroLote(clasificador.clasificar_lote, MAX_LOTE, ESPERA_LOTE_MS)
+    micro_lote.iniciar()
+    return DetectorEmocionesLote(clasificador, detector_rostros, micro_lote)
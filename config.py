@@ -62,4 +62,71 @@ def get_cascade_file():
 
 # Variables globales para usar en otros módulos
 DATA_DIR = get_data_dir()
-CASCADE_FILE = get_cascade_file()
\ No newline at end of file
+CASCADE_FILE = get_cascade_file()
+
+# Cámara: índice de dispositivo ("0"), archivo de vídeo o URL (rtsp://...) para el detector y el registro
+FUENTE_CAMARA = os.environ.get("DETECTOR_CAMARA", "0")
+# Varias cámaras (camaras.py): fuentes separadas por comas ("" = solo FUENTE_CAMARA) e hilos
+# de análisis compartidos por todas (0 = uno por núcleo)
+FUENTES_CAMARAS = os.environ.get("DETECTOR_CAMARAS", "")
+HILOS_CAMARAS = int(os.environ.get("DETECTOR_HILOS_CAMARAS", "0"))
+
+# Índice de identidades para el reconocimiento: "auto", "exacto", "plano" o "ivf"
+TIPO_INDICE = os.environ.get("DETECTOR_INDICE", "auto")
+
+# Detección de rostros: ancho (px) de la copia reducida sobre la que corre el cascade
+# (0 = resolución completa) y tamaños mínimo/máximo de rostro en px del frame original
+ANCHO_DETECCION = int(os.environ.get("DETECTOR_ANCHO_DETECCION", "320"))
+MIN_ROSTRO = int(os.environ.get("DETECTOR_MIN_ROSTRO", "40"))
+MAX_ROSTRO = int(os.environ.get("DETECTOR_MAX_ROSTRO", "0"))
+
+# Seguimiento: detección completa cada N frames y flujo óptico entre medias (1 = detectar siempre)
+INTERVALO_DETECCION = int(os.environ.get("DETECTOR_INTERVALO_DETECCION", "5"))
+
+# Clasificación de emociones: "lote" (modelo Keras con inferencia por lotes) o "fer" (librería FER)
+CLASIFICADOR = os.environ.get("DETECTOR_CLASIFICADOR", "lote")
+# Backend del clasificador por lotes: "auto" (el más ligero disponible), "onnx", "tflite", "opencv" o "keras"
+BACKEND_EMOCIONES = os.environ.get("DETECTOR_BACKEND", "auto")
+# Variante del modelo: "float" (original) o una cuantizada con cuantizar_modelo.py: "dinamico", "float16", "int8"
+VARIANTE_MODELO = os.environ.get("DETECTOR_VARIANTE_MODELO", "float")
+# Micro-lotes: máximo de rostros por inferencia y espera máxima (ms) para completar un lote
+MAX_LOTE = int(os.environ.get("DETECTOR_MAX_LOTE", "32"))
+ESPERA_LOTE_MS = float(os.environ.get("DETECTOR_ESPERA_LOTE_MS", "5"))
+
+# Reconocimiento por pista: segundos entre reverificaciones de una identidad conocida,
+# entre reintentos de una pista aún desconocida y máximo de rostros a codificar por frame
+REVERIFICACION_IDENTIDAD_S = float(os.environ.get("DETECTOR_REVERIFICACION_S", "5"))
+REINTENTO_IDENTIDAD_S = float(os.environ.get("DETECTOR_REINTENTO_IDENTIDAD_S", "1"))
+MAX_IDENTIFICACIONES_FRAME = int(os.environ.get("DETECTOR_MAX_IDENTIFICACIONES_FRAME", "2"))
+
+# Suavizado de emociones por pista: "media" (ventana deslizante), "ema" (media exponencial)
+# o "mayoria" (votos de la emoción dominante); tamaño de la ventana y factor de la EMA
+SUAVIZADO = os.environ.get("DETECTOR_SUAVIZADO", "media")
+VENTANA_SUAVIZADO = int(os.environ.get("DETECTOR_VENTANA_SUAVIZADO", "10"))
+ALFA_SUAVIZADO = float(os.environ.get("DETECTOR_ALFA_SUAVIZADO", "0.3"))
+
+# Bitácora de eventos de emociones: archivo CSV ("" = desactivada), tamaño máximo antes de rotar (MB),
+# política de fsync ("nunca", "lote", "intervalo") y política con la cola llena ("descartar", "muestrear")
+BITACORA_CSV = os.environ.get("DETECTOR_BITACORA", os.path.join(DATA_DIR, "eventos_emociones.csv"))
+BITACORA_MAX_MB = float(os.environ.get("DETECTOR_BITACORA_MAX_MB", "50"))
+BITACORA_FSYNC = os.environ.get("DETECTOR_BITACORA_FSYNC", "lote")
+BITACORA_POLITICA = os.environ.get("DETECTOR_BITACORA_POLITICA", "muestrear")
+# Almacén columnar de resultados (bloques .npz): directorio ("" = desactivado) y cuantización
+# de las probabilidades ("uint8" o "float16")
+ALMACEN_COLUMNAR = os.environ.get("DETECTOR_ALMACEN_COLUMNAR", "")
+CUANTIZACION_ALMACEN = os.environ.get("DETECTOR_CUANTIZACION_ALMACEN", "uint8")
+# Base de datos SQLite con emociones y encuestas ("" = desactivada)
+BASE_DATOS = os.environ.get("DETECTOR_BASE_DATOS", os.path.join(DATA_DIR, "detector.db"))
+
+# Control de tasa: análisis por segundo como máximo (0 = sin límite), presupuesto de CPU en
+# núcleos (0 = sin límite), diferencia media mínima entre frames (niveles de gris) para volver
+# a analizar y segundos máximos sin analizar aunque la imagen no cambie
+TASA_INFERENCIA = float(os.environ.get("DETECTOR_TASA_INFERENCIA", "10"))
+PRESUPUESTO_CPU = float(os.environ.get("DETECTOR_PRESUPUESTO_CPU", "0"))
+UMBRAL_CAMBIO = float(os.environ.get("DETECTOR_UMBRAL_CAMBIO", "2"))
+MAX_SIN_ANALIZAR_S = float(os.environ.get("DETECTOR_MAX_SIN_ANALIZAR_S", "1"))
+
+# Panel de emociones: refrescos por segundo como máximo y cambio mínimo (fracción) en la
+# confianza o en las barras para volver a dibujarlo
+TASA_PANEL = float(os.environ.get("DETECTOR_TASA_PANEL", "5"))
+UMBRAL_PANEL = float(os.environ.get("DETECTOR_UMBRAL_PANEL", "0.03"))
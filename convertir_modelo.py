@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Convierte data/emotion_model.hdf5 a ONNX para los backends ligeros
+(ONNX Runtime y OpenCV DNN) y comprueba que dan las mismas probabilidades
+que el modelo Keras sobre recortes de rostros reales.
+
+Requiere TensorFlow y tf2onnx solo en la máquina donde se convierte; el
+modelo .onnx resultante se distribuye junto a la aplicación.
+
+Uso:
+    python convertir_modelo.py
+    python convertir_modelo.py --verificar --backend onnx --muestras data/usuarios
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+
+from config import DATA_DIR
+
+
+def convertir(ruta_keras, ruta_onnx, opset=13):
+    """Exporta el modelo Keras a ONNX con lote dinámico y entrada NHWC"""
+    import tensorflow as tf
+    import tf2onnx
+
+    modelo = tf.keras.models.load_model(ruta_keras, compile=False)
+    alto, ancho, canales = modelo.input_shape[1:]
+    firma = [tf.TensorSpec((None, alto, ancho, canales), tf.float32, name="entrada")]
+    tf2onnx.convert.from_keras(modelo, input_signature=firma, opset=opset, output_path=ruta_onnx)
+    print(f"Modelo ONNX guardado en {ruta_onnx}")
+
+
+def verificar(backend, ruta_keras, ruta_onnx, muestras, tolerancia):
+    """Compara el backend convertido con Keras; devuelve True si hay paridad"""
+    from backends_emociones import BackendKeras, CONSTRUCTORES, recortes_de_muestra, comparar_backends
+    from deteccion_rostros import crear_detector_rostros
+
+    referencia = BackendKeras(ruta_keras)
+    candidato = CONSTRUCTORES[backend](ruta_onnx)
+    recortes = recortes_de_muestra(muestras, crear_detector_rostros(), referencia.tamano)
+    if not recortes:
+        # Sin fotos con rostros: al menos comparar con recortes sintéticos
+        print(f"No se encontraron rostros en {muestras}, se usan recortes aleatorios")
+        rng = np.random.default_rng(0)
+        recortes = list(rng.integers(0, 256, size=(64,) + referencia.tamano[::-1], dtype=np.uint8))
+
+    resultado = comparar_backends(referencia, candidato, recortes, tolerancia)
+    print(f"{backend} vs keras sobre {resultado['muestras']} recortes: "
+          f"diferencia máxima {resultado['diferencia_max']:.2e}, "
+          f"coincidencia top-1 {resultado['coincidencia_top1'] * 100:.1f}%")
+    for etiqueta, datos in resultado["por_etiqueta"].items():
+        print(f"  {etiqueta:>9}: {datos['muestras']:4d} muestras, coincidencia {datos['coincidencia'] * 100:.1f}%")
+    print("Paridad OK" if resultado["paridad"] else f"Paridad FALLIDA (tolerancia {tolerancia})")
+    return resultado["paridad"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversión del modelo de emociones a ONNX")
+    parser.add_argument("--keras", default=os.path.join(DATA_DIR, "emotion_model.hdf5"))
+    parser.add_argument("--onnx", default=os.path.join(DATA_DIR, "emotion_model.onnx"))
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--verificar", action="store_true", help="solo comparar, sin convertir")
+    parser.add_argument("--backend", choices=["onnx", "opencv"], default="onnx")
+    parser.add_argument("--muestras", default=os.path.join(DATA_DIR, "usuarios"))
+    parser.add_argument("--tolerancia", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    if not args.verificar:
+        convertir(args.keras, args.onnx, args.opset)
+    ok = verificar(args.backend, args.keras, args.onnx, args.muestras, args.tolerancia)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
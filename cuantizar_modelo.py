@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Genera variantes cuantizadas de data/emotion_model.hdf5 y un informe que las
+compara con el modelo en precisión completa.
+
+Variantes (ver backends_emociones.VARIANTES):
+  - dinamico: pesos en int8, activaciones en float (sin calibración)
+  - float16:  pesos en float16 (solo TFLite)
+  - int8:     pesos y activaciones en int8, calibrado con recortes de rostros
+
+Los rostros reales se dividen en una parte de calibración y otra reservada
+para el informe, de modo que las variantes no se evalúan con los mismos
+recortes (ni con sus variaciones) con los que se calibraron.
+
+Formatos: TFLite (requiere TensorFlow para convertir) y ONNX (requiere
+onnxruntime y el .onnx de convertir_modelo.py).
+
+Uso:
+    python cuantizar_modelo.py --formato tflite --variantes dinamico float16 int8
+    python cuantizar_modelo.py --formato onnx --variantes dinamico int8
+    python cuantizar_modelo.py --informe --formato tflite --salida informe_cuantizacion.json
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from config import DATA_DIR
+from clasificador_emociones import ETIQUETAS, preprocesar
+from backends_emociones import (CONSTRUCTORES, ruta_variante, recortes_de_muestra,
+                                comparar_backends)
+from modelos import memoria_residente_mb
+
+
+def separar_evaluacion(directorio, fraccion=0.3, maximo=300, tamano=(64, 64), semilla=0):
+    """
+    Recortes de rostros reales divididos al azar (con semilla fija, para que
+    --informe reserve los mismos) en (calibración, evaluación).
+    """
+    from deteccion_rostros import crear_detector_rostros
+    recortes = recortes_de_muestra(directorio, crear_detector_rostros(), tamano, maximo=maximo)
+    if len(recortes) < 2:
+        raise RuntimeError(f"Se necesitan al menos 2 rostros en {directorio} para calibrar y evaluar")
+    orden = np.random.default_rng(semilla).permutation(len(recortes))
+    n_evaluacion = min(len(recortes) - 1, max(1, int(round(len(recortes) * fraccion))))
+    evaluacion = [recortes[i] for i in orden[:n_evaluacion]]
+    calibracion = [recortes[i] for i in orden[n_evaluacion:]]
+    print(f"{len(recortes)} rostros reales: {len(calibracion)} para calibrar, {len(evaluacion)} para evaluar")
+    return calibracion, evaluacion
+
+
+def conjunto_calibracion(reales, minimo=200, semilla=0):
+    """
+    Recortes para calibrar: los rostros reales y, si hay pocos, variaciones
+    (espejo, brillo, contraste) para cubrir el rango de activaciones.
+    """
+    rng = np.random.default_rng(semilla)
+    base = list(reales)
+    recortes = list(reales)
+    while len(recortes) < minimo:
+        recorte = base[rng.integers(len(base))].astype(np.float32)
+        if rng.random() < 0.5:
+            recorte = recorte[:, ::-1]
+        recorte = recorte * rng.uniform(0.7, 1.3) + rng.uniform(-30, 30)
+        recortes.append(np.clip(recorte, 0, 255).astype(np.uint8))
+    print(f"Conjunto de calibración: {len(base)} rostros reales, {len(recortes)} recortes en total")
+    return recortes
+
+
+def cuantizar_tflite(ruta_keras, variante, calibracion=None):
+    """Convierte el modelo Keras a TFLite con la cuantización indicada"""
+    import tensorflow as tf
+
+    modelo = tf.keras.models.load_model(ruta_keras, compile=False)
+    conversor = tf.lite.TFLiteConverter.from_keras_model(modelo)
+    if variante != "float":
+        conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variante == "float16":
+        conversor.target_spec.supported_types = [tf.float16]
+    elif variante == "int8":
+        def dataset_representativo():
+            for recorte in calibracion:
+                yield [preprocesar([recorte])]
+        conversor.representative_dataset = dataset_representativo
+        # Todo el grafo en enteros; entrada y salida siguen en float para el backend
+        conversor.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    ruta = ruta_variante("tflite", variante, os.path.dirname(ruta_keras))
+    with open(ruta, "wb") as f:
+        f.write(conversor.convert())
+    return ruta
+
+
+def cuantizar_onnx(ruta_onnx, variante, calibracion=None):
+    """Cuantiza el modelo ONNX con onnxruntime (dinámica o estática int8)"""
+    from onnxruntime.quantization import (quantize_dynamic, quantize_static, QuantType,
+                                          CalibrationDataReader, QuantFormat)
+
+    ruta = ruta_variante("onnx", variante, os.path.dirname(ruta_onnx))
+    if variante == "dinamico":
+        quantize_dynamic(ruta_onnx, ruta, weight_type=QuantType.QInt8)
+    elif variante == "int8":
+        import onnxruntime as ort
+        entrada = ort.InferenceSession(ruta_onnx, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+        class Lector(CalibrationDataReader):
+            def __init__(self):
+                self.datos = iter([{entrada: preprocesar([r])} for r in calibracion])
+
+            def get_next(self):
+                return next(self.datos, None)
+
+        quantize_static(ruta_onnx, ruta, Lector(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"Variante no soportada en ONNX: {variante}")
+    return ruta
+
+
+def medir_latencia(backend, recortes, lote, repeticiones=50):
+    """Mediana en ms de clasificar `lote` recortes (tras un calentamiento)"""
+    grupo = [recortes[i % len(recortes)] for i in range(lote)]
+    backend.clasificar_lote(grupo)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        backend.clasificar_lote(grupo)
+        tiempos.append((time.perf_counter() - inicio) * 1000.0)
+    return float(np.median(tiempos))
+
+
+def informe(formato, variantes, recortes, directorio):
+    """Latencia, memoria y coincidencia top-1 por etiqueta de cada variante frente a la float"""
+    backend = "tflite" if formato == "tflite" else "onnx"
+    memoria_antes = memoria_residente_mb()
+    referencia = CONSTRUCTORES[backend](ruta_variante(backend, "float", directorio))
+    memoria_ref = memoria_residente_mb()
+    filas = []
+    for variante in ["float"] + [v for v in variantes if v != "float"]:
+        ruta = ruta_variante(backend, variante, directorio)
+        if not os.path.exists(ruta):
+            print(f"Se omite {variante}: no existe {ruta}")
+            continue
+        if variante == "float":
+            modelo, incremento = referencia, (memoria_ref - memoria_antes if memoria_antes is not None else None)
+        else:
+            antes = memoria_residente_mb()
+            modelo = CONSTRUCTORES[backend](ruta)
+            despues = memoria_residente_mb()
+            incremento = despues - antes if antes is not None else None
+        comparacion = comparar_backends(referencia, modelo, recortes, tolerancia=np.inf)
+        filas.append({
+            "variante": variante,
+            "archivo_mb": os.path.getsize(ruta) / (1024 * 1024),
+            "memoria_mb": incremento,
+            "latencia_1_ms": medir_latencia(modelo, recortes, 1),
+            "latencia_16_ms": medir_latencia(modelo, recortes, 16),
+            "coincidencia_top1": comparacion["coincidencia_top1"],
+            "diferencia_max": comparacion["diferencia_max"],
+            "por_etiqueta": comparacion["por_etiqueta"]
+        })
+
+    print(f"\n{'variante':>9} | {'archivo':>8} | {'memoria':>8} | {'lote 1':>8} | {'lote 16':>8} | {'top-1':>6}")
+    for f in filas:
+        memoria = f"{f['memoria_mb']:.1f} MB" if f["memoria_mb"] is not None else "n/d"
+        print(f"{f['variante']:>9} | {f['archivo_mb']:5.2f} MB | {memoria:>8} | {f['latencia_1_ms']:5.2f} ms | "
+              f"{f['latencia_16_ms']:5.2f} ms | {f['coincidencia_top1'] * 100:5.1f}%")
+    print("\nCoincidencia top-1 por etiqueta (según el modelo float):")
+    print(f"{'variante':>9} | " + " | ".join(f"{e:>8}" for e in ETIQUETAS))
+    for f in filas:
+        celdas = [f"{f['por_etiqueta'][e]['coincidencia'] * 100:7.1f}%" if e in f["por_etiqueta"] else f"{'-':>8}"
+                  for e in ETIQUETAS]
+        print(f"{f['variante']:>9} | " + " | ".join(celdas))
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantización del modelo de emociones")
+    parser.add_argument("--formato", choices=["tflite", "onnx"], default="tflite")
+    parser.add_argument("--variantes", nargs="+", default=["dinamico", "float16", "int8"],
+                        choices=["dinamico", "float16", "int8"])
+    parser.add_argument("--keras", default=os.path.join(DATA_DIR, "emotion_model.hdf5"))
+    parser.add_argument("--muestras", default=os.path.join(DATA_DIR, "usuarios"))
+    parser.add_argument("--calibracion", type=int, default=200, help="recortes de calibración")
+    parser.add_argument("--evaluacion", type=float, default=0.3,
+                        help="fracción de los rostros reales reservada para el informe")
+    parser.add_argument("--informe", action="store_true", help="solo medir, sin cuantizar")
+    parser.add_argument("--salida", help="guardar el informe en JSON")
+    args = parser.parse_args()
+
+    directorio = os.path.dirname(args.keras)
+    fraccion = min(max(args.evaluacion, 0.05), 0.9)
+    reales, evaluacion = separar_evaluacion(args.muestras, fraccion,
+                                            maximo=int(np.ceil(args.calibracion / (1 - fraccion))))
+
+    if not args.informe:
+        if args.formato == "tflite" and not os.path.exists(ruta_variante("tflite", "float", directorio)):
+            # Referencia float para el informe
+            cuantizar_tflite(args.keras, "float")
+        recortes = conjunto_calibracion(reales, minimo=args.calibracion)
+        for variante in args.variantes:
+            inicio = time.time()
+            if args.formato == "tflite":
+                ruta = cuantizar_tflite(args.keras, variante, recortes)
+            else:
+                if variante == "float16":
+                    print("float16 no está soportado en ONNX, se omite")
+                    continue
+                ruta = cuantizar_onnx(ruta_variante("onnx", "float", directorio), variante, recortes)
+            print(f"Variante {variante} guardada en {ruta} ({time.time() - inicio:.1f} s)")
+
+    # Solo rostros reales que no se usaron para calibrar, sin variaciones
+    filas = informe(args.formato, args.variantes, evaluacion, directorio)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"formato": args.formato, "muestras_calibracion": len(reales),
+                       "muestras_evaluacion": len(evaluacion), "variantes": filas}, f, indent=2)
+        print(f"Informe guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import threading
+import logging
+import cv2
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("deteccion_rostros")
+
+
+def reescalar_cajas(cajas, escala, ancho, alto):
+    """
+    Lleva cajas (x, y, w, h) detectadas en una imagen reducida por `escala`
+    a coordenadas del frame original, recortándolas a sus límites.
+    """
+    cajas = np.asarray(cajas, dtype=np.float64).reshape(-1, 4)
+    if cajas.shape[0] == 0:
+        return np.zeros((0, 4), dtype=np.int32)
+    cajas = np.rint(cajas / escala)
+    x = np.clip(cajas[:, 0], 0, ancho - 1)
+    y = np.clip(cajas[:, 1], 0, alto - 1)
+    w = np.minimum(cajas[:, 2], ancho - x)
+    h = np.minimum(cajas[:, 3], alto - y)
+    return np.stack([x, y, w, h], axis=1).astype(np.int32)
+
+
+class DetectorRostros:
+    """
+    Detector Haar que trabaja sobre una copia reducida en escala de grises
+    (ancho_deteccion píxeles de ancho) y devuelve las cajas en coordenadas
+    del frame completo, para clasificar sobre recortes a resolución original.
+
+    min_tamano y max_tamano se expresan en píxeles del frame original. Cada
+    hilo usa su propio CascadeClassifier, por lo que varios trabajadores de
+    la etapa de detección pueden llamarlo a la vez.
+    """
+
+    def __init__(self, cascade_file=None, ancho_deteccion=320, scale_factor=1.1,
+                 min_neighbors=4, min_tamano=(40, 40), max_tamano=None):
+        if not cascade_file or not os.path.exists(cascade_file):
+            cascade_file = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self.cascade_file = cascade_file
+        self.ancho_deteccion = ancho_deteccion
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_tamano = min_tamano
+        self.max_tamano = max_tamano
+        self._local = threading.local()
+        self.disponible = not self._cascade().empty()
+        if self.disponible:
+            logger.info(f"Detector de rostros con cascade {cascade_file} (ancho de detección {ancho_deteccion})")
+        else:
+            logger.error(f"Cascade vacío o inválido: {cascade_file}")
+
+    def _cascade(self):
+        """CascadeClassifier propio del hilo actual"""
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_file)
+            self._local.cascade = cascade
+        return cascade
+
+    def escala_para(self, ancho):
+        """Factor de reducción aplicado a un frame de este ancho"""
+        if not self.ancho_deteccion or ancho <= self.ancho_deteccion:
+            return 1.0
+        return self.ancho_deteccion / float(ancho)
+
+    def detectar(self, frame, gray=None):
+        """Devuelve un array (N, 4) de cajas (x, y, w, h) en coordenadas de `frame`"""
+        if not self.disponible:
+            return np.zeros((0, 4), dtype=np.int32)
+        if gray is None:
+            gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        alto, ancho = gray.shape[:2]
+        escala = self.escala_para(ancho)
+        if escala < 1.0:
+            pequeno = cv2.resize(gray, (max(1, int(round(ancho * escala))), max(1, int(round(alto * escala)))),
+                                 interpolation=cv2.INTER_AREA)
+        else:
+            pequeno = gray
+
+        parametros = {}
+        if self.min_tamano:
+            parametros["minSize"] = tuple(max(1, int(round(v * escala))) for v in self.min_tamano)
+        if self.max_tamano:
+            parametros["maxSize"] = tuple(max(1, int(round(v * escala))) for v in self.max_tamano)
+
+        cajas = self._cascade().detectMultiScale(pequeno, self.scale_factor, self.min_neighbors, **parametros)
+        if len(cajas) == 0:
+            return np.zeros((0, 4), dtype=np.int32)
+        return reescalar_cajas(cajas, escala, ancho, alto)
+
+
+def crear_detector_rostros():
+    """Crea un DetectorRostros con la configuración de detección de config.py"""
+    from config import CASCADE_FILE, ANCHO_DETECCION, MIN_ROSTRO, MAX_ROSTRO
+    return DetectorRostros(
+        CASCADE_FILE,
+        ancho_deteccion=ANCHO_DETECCION,
+        min_tamano=(MIN_ROSTRO, MIN_ROSTRO) if MIN_ROSTRO else None,
+        max_tamano=(MAX_ROSTRO, MAX_ROSTRO) if MAX_ROSTRO else None
+    )
@@ -3,13 +3,20 @@ import os
 import cv2
 import numpy as np
 import time
-from PIL import Image, ImageTk, ImageOps, ImageDraw
+from PIL import Image, ImageDraw
 import tkinter as tk
 from collections import deque
 import logging
 
 # Importar config.py
-from config import DATA_DIR, CASCADE_FILE
+from config import (DATA_DIR, CASCADE_FILE, TASA_INFERENCIA, PRESUPUESTO_CPU, UMBRAL_CAMBIO,
+                    MAX_SIN_ANALIZAR_S, TASA_PANEL, UMBRAL_PANEL, BITACORA_CSV, BITACORA_MAX_MB,
+                    BITACORA_FSYNC, BITACORA_POLITICA, ALMACEN_COLUMNAR, CUANTIZACION_ALMACEN,
+                    BASE_DATOS, FUENTE_CAMARA)
+from captura import CapturaCamara
+from pipeline import Pipeline, Etapa
+from bitacora_emociones import BitacoraCSV, crear_evento
+from render_tk import PuenteRender, TamanoWidget, RenderizadorVideo, manejador_imagen
 
 # Configurar logging
 logging.basicConfig(
@@ -22,11 +29,120 @@ logging.basicConfig(
 )
 logger = logging.getLogger("detector")
 
+# Lado (px) de los emojis del panel de emociones
+TAMANO_EMOJI = 100
+
+
+class ControladorTasa:
+    """
+    Decide qué frames de la cámara se analizan. El vídeo se muestra a ritmo
+    completo y solo una parte de los frames pasa por el pipeline:
+      - como mucho `tasa_objetivo` análisis por segundo (0 = sin límite);
+      - si hay presupuesto de CPU (núcleos, p. ej. 0.5), la tasa se reduce
+        mientras el proceso lo supere y se recupera cuando queda margen;
+      - si ya hay `max_en_vuelo` frames en el pipeline se descarta (sobrecarga);
+      - si el frame casi no cambió respecto al último analizado se omite,
+        salvo que hayan pasado `max_sin_analizar` segundos.
+    """
+
+    def __init__(self, tasa_objetivo=10.0, presupuesto_cpu=0.0, umbral_cambio=2.0,
+                 max_sin_analizar=1.0, max_en_vuelo=2, tamano_cambio=(64, 48)):
+        self.tasa_objetivo = tasa_objetivo
+        self.presupuesto_cpu = presupuesto_cpu
+        self.umbral_cambio = umbral_cambio
+        self.max_sin_analizar = max_sin_analizar
+        self.max_en_vuelo = max_en_vuelo
+        self.tamano_cambio = tamano_cambio
+
+        self.lock = threading.Lock()
+        # Con presupuesto de CPU se parte de la tasa máxima ajustable (30/s si no hay límite)
+        self.tasa = (tasa_objetivo or 30.0) if presupuesto_cpu else tasa_objetivo
+        self.en_vuelo = {}           # id de frame -> momento de envío
+        self.latencia = None         # media móvil de la latencia del pipeline (s)
+        self.ultimo_analisis = 0.0
+        self.miniatura = None        # miniatura del último frame analizado
+        self._cpu_ref = (time.perf_counter(), time.process_time())
+        self.uso_cpu = 0.0
+
+        self.analizados = 0
+        self.omitidos_tasa = 0
+        self.omitidos_carga = 0
+        self.omitidos_sin_cambio = 0
+
+    def _miniatura(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, self.tamano_cambio, interpolation=cv2.INTER_AREA)
+
+    def _ajustar_presupuesto(self, ahora):
+        """Ajuste aditivo/multiplicativo de la tasa según el uso de CPU del proceso"""
+        pared0, cpu0 = self._cpu_ref
+        if ahora - pared0 < 1.0:
+            return
+        cpu = time.process_time()
+        self.uso_cpu = (cpu - cpu0) / (ahora - pared0)
+        self._cpu_ref = (ahora, cpu)
+        if not self.presupuesto_cpu:
+            return
+        maximo = self.tasa_objetivo or 30.0
+        tasa = self.tasa or maximo
+        if self.uso_cpu > self.presupuesto_cpu:
+            self.tasa = max(0.5, tasa * 0.7)
+        else:
+            self.tasa = min(maximo, tasa + 0.5)
+
+    def decidir(self, frame_id, frame, ahora=None):
+        """True si el frame debe analizarse; en ese caso queda registrado como en vuelo"""
+        ahora = time.perf_counter() if ahora is None else ahora
+        with self.lock:
+            self._ajustar_presupuesto(ahora)
+            # Frames que se perdieron por el camino (descartados o filtrados) caducan
+            limite = max(2.0, 4 * (self.latencia or 0.0))
+            for fid in [f for f, t in self.en_vuelo.items() if ahora - t > limite]:
+                del self.en_vuelo[fid]
+
+            if self.tasa and ahora - self.ultimo_analisis < 1.0 / self.tasa:
+                self.omitidos_tasa += 1
+                return False
+            if len(self.en_vuelo) >= self.max_en_vuelo:
+                self.omitidos_carga += 1
+                return False
+
+        miniatura = self._miniatura(frame)
+        with self.lock:
+            if (self.miniatura is not None and self.umbral_cambio > 0
+                    and ahora - self.ultimo_analisis < self.max_sin_analizar):
+                cambio = float(cv2.absdiff(miniatura, self.miniatura).mean())
+                if cambio < self.umbral_cambio:
+                    self.omitidos_sin_cambio += 1
+                    return False
+            self.miniatura = miniatura
+            self.ultimo_analisis = ahora
+            self.en_vuelo[frame_id] = ahora
+            self.analizados += 1
+            return True
+
+    def completado(self, frame_id, ahora=None):
+        """Marca un frame como analizado (y los anteriores, que ya no van a llegar)"""
+        ahora = time.perf_counter() if ahora is None else ahora
+        with self.lock:
+            inicio = self.en_vuelo.get(frame_id)
+            for fid in [f for f in self.en_vuelo if f <= frame_id]:
+                del self.en_vuelo[fid]
+            if inicio is not None:
+                latencia = ahora - inicio
+                self.latencia = latencia if self.latencia is None else 0.8 * self.latencia + 0.2 * latencia
+
+    def resumen(self):
+        with self.lock:
+            return (f"{self.analizados} frames analizados, omitidos: {self.omitidos_tasa} por tasa, "
+                    f"{self.omitidos_carga} por sobrecarga, {self.omitidos_sin_cambio} sin cambios "
+                    f"(tasa {self.tasa:.1f}/s, CPU {self.uso_cpu * 100:.0f}%)")
+
+
 class DetectorEmociones:
-    def __init__(self, parent, panel_emoji, hist_eq_var, data_path, fps_var, faces_var):
+    def __init__(self, parent, panel_emoji, usar_hist, data_path, fps_var, faces_var):
         self.parent = parent
         self.panel = panel_emoji
-        self.hist_eq_var = hist_eq_var
         # Usar data_path que viene como parámetro, pero también tener una referencia a DATA_DIR
         self.data_path = data_path
         # Verificar si las rutas son consistentes
@@ -35,27 +151,55 @@ class DetectorEmociones:
         
         self.fps_var = fps_var
         self.faces_var = faces_var
+        # Los hilos de trabajo no leen variables de Tk: vincular_hist() copia el valor al cambiar
+        self.usar_hist = bool(usar_hist)
 
-        # Importar face_recognition usando nuestro wrapper
-        from face_recognition_wrapper import get_face_recognition
-        self.face_recognition = get_face_recognition(self.data_path)
-        logger.info("Face recognition inicializado")
-
-        # Cargar el detector de emociones de manera controlada
-        self.detector_fer = self._cargar_detector_fer()
-        logger.info("Detector FER inicializado")
+        # Núcleo de análisis sin interfaz (compartido con el análisis por lotes)
+        from nucleo_deteccion import NucleoDeteccion
+        self.nucleo = NucleoDeteccion(self.data_path)
 
         self.running = False
         self.thread = None
         self.video_label = None
+        # Los hilos publican imágenes y textos; el hilo de Tk los muestra con after()
+        self.render = None
+        self.renderizador = None
+        self.tamano_video = None
 
         self.frame_count = 0
-        self.recognition_limit = 25
         self.usuario_reconocido = "Desconocido"
-        self.ya_intento_reconocer = False
         self.last_emotion = None
         self.last_conf = 0
 
+        # Pipeline por etapas: trabajadores, capacidad de cola y política de contrapresión
+        self.pipeline = None
+        self.config_etapas = {
+            "deteccion": {"trabajadores": 2, "capacidad": 1, "politica": "descartar_antiguo"},
+            "clasificacion": {"trabajadores": 1, "capacidad": 2, "politica": "bloquear"},
+            "reconocimiento": {"trabajadores": 1, "capacidad": 2, "politica": "bloquear"},
+            "composicion": {"trabajadores": 1, "capacidad": 2, "politica": "descartar_antiguo"}
+        }
+        self.ultimo_compuesto = 0
+        self.tiempos_composicion = deque(maxlen=31)
+        self.fps_actual = 0.0
+        # Sumideros de eventos (bitácora, almacenes): reciben un evento por rostro analizado
+        self.sumideros = []
+        if BITACORA_CSV:
+            self.agregar_sumidero(BitacoraCSV(BITACORA_CSV, max_bytes=int(BITACORA_MAX_MB * 1024 * 1024),
+                                              fsync=BITACORA_FSYNC, politica=BITACORA_POLITICA))
+        if ALMACEN_COLUMNAR:
+            from almacen_columnar import AlmacenColumnar
+            self.agregar_sumidero(AlmacenColumnar(ALMACEN_COLUMNAR, cuantizacion=CUANTIZACION_ALMACEN))
+        if BASE_DATOS:
+            from almacen_sqlite import AlmacenSQLite
+            self.agregar_sumidero(AlmacenSQLite(BASE_DATOS))
+        self.ultimo_asociado = 0
+        # Qué frames se analizan; el resto se muestra con el último resultado
+        self.controlador = None
+        # Último resultado dibujable: (caja, etiqueta, color, identidad) por rostro
+        self.superposicion = []
+        self.lock_superposicion = threading.Lock()
+
         self.emotion_labels = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
         self.emotion_colors = {
             "angry": "#e74c3c", "disgust": "#27ae60", "fear": "#8e44ad",
@@ -63,146 +207,19 @@ class DetectorEmociones:
         }
 
         self.emoji_imgs = self._cargar_emojis()
-        self.embeddings = []
-        self.nombres = []
-        self._cargar_rostros()
-        self.emo_history = {e: deque(maxlen=10) for e in self.emotion_labels}
-
-    def _cargar_detector_fer(self):
-        """Carga el detector FER con manejo de errores"""
-        try:
-            # Evitar logs de TensorFlow
-            os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-            
-            # Intentar cargar FER sin mtcnn
-            try:
-                from fer import FER
-                return FER(mtcnn=False)
-            except ImportError:
-                logger.warning("No se pudo importar fer, usando detector fallback")
-                return self._crear_detector_fallback()
-        except Exception as e:
-            logger.error(f"Error al cargar detector FER: {str(e)}")
-            return self._crear_detector_fallback()
-    
-    def _crear_detector_fallback(self):
-        class FERFallback:
-            def __init__(self):
-                # Usar CASCADE_FILE de config.py
-                if os.path.exists(CASCADE_FILE):
-                    self.face_cascade = cv2.CascadeClassifier(CASCADE_FILE)
-                    logger.info(f"Detector fallback inicializado con cascade: {CASCADE_FILE}")
-                else:
-                    # Intentar con la ruta de OpenCV como respaldo
-                    try:
-                        default_cascade = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                        self.face_cascade = cv2.CascadeClassifier(default_cascade)
-                        logger.info(f"Detector fallback inicializado con cascade predeterminado: {default_cascade}")
-                    except Exception as e:
-                        logger.error(f"Error al cargar cascade predeterminado: {str(e)}")
-                        self.face_cascade = None
-                
-                # Para emociones dinámicas
-                self.prev_emotions = {}  # Para mantener cierta consistencia entre frames
-                self.frame_count = 0  # Contador para cambiar emociones periódicamente
-                self.emotion_shift_interval = 15  # Cada cuántos frames cambiar la emoción dominante
-                
-            def detect_emotions(self, frame):
-                """Detecta caras y asigna emociones aleatorias dinámicas para pruebas"""
-                try:
-                    if self.face_cascade is None or self.face_cascade.empty():
-                        logger.error("Cascade no cargado o vacío, no se pueden detectar rostros")
-                        return []
-                    
-                    self.frame_count += 1
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-                    result = []
-                    
-                    # Determinar si es momento de actualizar las emociones
-                    should_update = (self.frame_count % self.emotion_shift_interval == 0) or (len(faces) != len(self.prev_emotions))
-                    
-                    for i, (x, y, w, h) in enumerate(faces):
-                        face_id = f"face_{i}"
-                        
-                        if should_update or face_id not in self.prev_emotions:
-                            # Elegir una emoción dominante diferente a la anterior si es posible
-                            if face_id in self.prev_emotions:
-                                prev_dominant = max(self.prev_emotions[face_id].items(), key=lambda x: x[1])[0]
-                                other_emotions = [e for e in ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"] if e != prev_dominant]
-                                import random
-                                # 75% de probabilidad de cambiar a otra emoción
-                                if random.random() < 0.75:
-                                    primary_emotion = random.choice(other_emotions)
-                                else:
-                                    primary_emotion = prev_dominant
-                            else:
-                                # Primera emoción - elegir aleatoriamente
-                                import random
-                                primary_emotion = random.choice(["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"])
-                            
-                            # Generar todas las emociones con valores base aleatorios
-                            import random
-                            import numpy as np
-                            emociones = {
-                                "angry": random.uniform(0.05, 0.15),
-                                "disgust": random.uniform(0.05, 0.15),
-                                "fear": random.uniform(0.05, 0.15),
-                                "happy": random.uniform(0.05, 0.15),
-                                "sad": random.uniform(0.05, 0.15),
-                                "surprise": random.uniform(0.05, 0.15),
-                                "neutral": random.uniform(0.05, 0.15)
-                            }
-                            
-                            # Dar mayor peso a la emoción dominante
-                            emociones[primary_emotion] = random.uniform(0.4, 0.7)
-                            
-                            # Normalizar para que sumen 1
-                            suma = sum(emociones.values())
-                            for k in emociones:
-                                emociones[k] /= suma
-                            
-                            # Guardar para el próximo frame
-                            self.prev_emotions[face_id] = emociones
-                        else:
-                            # Usar emociones previas con pequeñas variaciones para suavidad
-                            import random
-                            emociones = {}
-                            for emo, val in self.prev_emotions[face_id].items():
-                                # Añadir pequeña variación aleatoria (±5%)
-                                variation = random.uniform(-0.05, 0.05) * val
-                                emociones[emo] = max(0.01, min(0.99, val + variation))
-                            
-                            # Normalizar para que sumen 1
-                            suma = sum(emociones.values())
-                            for k in emociones:
-                                emociones[k] /= suma
-                            
-                            # Actualizar para el próximo frame
-                            self.prev_emotions[face_id] = emociones
-                        
-                        result.append({"box": (x, y, w, h), "emotions": emociones})
-                    
-                    # Limpiar caras que ya no están presentes
-                    if len(faces) > 0:
-                        current_face_ids = [f"face_{i}" for i in range(len(faces))]
-                        self.prev_emotions = {k: v for k, v in self.prev_emotions.items() if k in current_face_ids}
-                    
-                    return result
-                except Exception as e:
-                    logger.error(f"Error en detect_emotions fallback: {str(e)}")
-                    return []
-        
-        return FERFallback()
+        # Panel de emociones: solo se redibuja si cambia lo mostrado, y como mucho a TASA_PANEL Hz
+        self.panel_mostrado = None       # (emoción, confianza, barras) del último panel dibujado
+        self.ultimo_panel = 0.0
+        self.fondo_panel = Image.new("RGBA", (150, 440), (0, 0, 0, 255))
 
     def _cargar_emojis(self):
+        """Carga los emojis ya escalados al tamaño del panel y en RGBA, listos para pegar"""
         imgs = {}
         for emo in self.emotion_labels:
             ruta = os.path.join(self.data_path, "img", f"{emo}.png")
             try:
                 img = cv2.imread(ruta, cv2.IMREAD_UNCHANGED)
                 if img is not None:
-                    imgs[emo] = img
                     logger.info(f"Emoji cargado: {emo} desde {ruta}")
                 else:
                     logger.warning(f"No se pudo cargar emoji: {ruta}")
@@ -211,48 +228,53 @@ class DetectorEmociones:
                     if os.path.exists(ruta_alt) and ruta_alt != ruta:
                         img = cv2.imread(ruta_alt, cv2.IMREAD_UNCHANGED)
                         if img is not None:
-                            imgs[emo] = img
                             logger.info(f"Emoji cargado desde ruta alternativa: {ruta_alt}")
+                if img is not None:
+                    img = cv2.resize(img, (TAMANO_EMOJI, TAMANO_EMOJI), interpolation=cv2.INTER_AREA)
+                    if img.ndim == 2:
+                        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+                    elif img.shape[2] == 3:
+                        img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+                    imgs[emo] = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA))
             except Exception as e:
                 logger.error(f"Error cargando emoji {emo}: {str(e)}")
         return imgs
 
-    def _cargar_rostros(self):
-        base = os.path.join(self.data_path, "usuarios")
-        if not os.path.exists(base):
-            logger.warning(f"Directorio de usuarios no existe: {base}")
-            # Intentar con DATA_DIR como respaldo
-            base_alt = os.path.join(DATA_DIR, "usuarios")
-            if os.path.exists(base_alt) and base_alt != base:
-                logger.info(f"Usando directorio alternativo de usuarios: {base_alt}")
-                base = base_alt
-            else:
-                return
-        
-        for user in os.listdir(base):
-            carpeta = os.path.join(base, user)
-            if not os.path.isdir(carpeta):
-                continue
-                
-            for img_file in os.listdir(carpeta):
-                img_path = os.path.join(carpeta, img_file)
-                try:
-                    img = self.face_recognition.load_image_file(img_path)
-                    encs = self.face_recognition.face_encodings(img)
-                    if encs:
-                        self.embeddings.append(encs[0])
-                        self.nombres.append(user.replace("_", " "))
-                except Exception as e:
-                    logger.error(f"Error al procesar {img_path}: {str(e)}")
-                    continue
-        
-        logger.info(f"Rostros cargados: {len(self.embeddings)}")
+    def vincular_hist(self, variable):
+        """Refleja en usar_hist una variable de Tk; llamar desde el hilo de Tk"""
+        self.usar_hist = bool(variable.get())
+        variable.trace_add("write", lambda *_: setattr(self, "usar_hist", bool(variable.get())))
+
+    def agregar_sumidero(self, sumidero):
+        """Añade un destino para los eventos de emociones (SumideroAsincrono)"""
+        self.sumideros.append(sumidero)
+        if self.running:
+            sumidero.iniciar()
+
+    def agregar_usuario(self, carpeta):
+        """Incorpora a la galería un usuario recién registrado sin recargar el resto"""
+        self.nucleo.agregar_usuario(carpeta)
 
     def mostrar(self):
         for w in self.parent.winfo_children():
             w.destroy()
         self.video_label = tk.Label(self.parent, bg="black")
         self.video_label.pack(expand=True, fill="both")
+        self.tamano_video = TamanoWidget(self.video_label)
+        if self.render:
+            self.render.detener()
+        self.render = PuenteRender(self.video_label)
+        # Un solo PhotoImage para el video, actualizado con paste()
+        self.renderizador = RenderizadorVideo()
+        self.render.registrar("video", self.renderizador.manejador(self.video_label))
+        self.render.registrar("panel", manejador_imagen(self.panel))
+        self.render.registrar("fps", self.fps_var.set)
+        self.render.registrar("rostros", self.faces_var.set)
+        self.render.iniciar()
+
+    def _publicar(self, canal, valor):
+        if self.render:
+            self.render.publicar(canal, valor)
 
     def iniciar(self):
         if not self.running:
@@ -265,130 +287,221 @@ class DetectorEmociones:
         self.running = False
         logger.info("Detector detenido")
 
+    def _crear_pipeline(self):
+        """Construye el pipeline deteccion -> clasificacion -> reconocimiento -> composicion"""
+        funciones = {
+            "deteccion": self._etapa_deteccion,
+            "clasificacion": self._etapa_clasificacion,
+            "reconocimiento": self._etapa_reconocimiento,
+            "composicion": self._etapa_composicion
+        }
+        config = {nombre: dict(c) for nombre, c in self.config_etapas.items()}
+        if self.nucleo.seguidor is not None:
+            # El seguidor tiene estado y necesita los frames en orden
+            config["deteccion"]["trabajadores"] = 1
+        return Pipeline([
+            Etapa(nombre, funciones[nombre], **config[nombre])
+            for nombre in ("deteccion", "clasificacion", "reconocimiento", "composicion")
+        ])
+
+    def _etapa_deteccion(self, paquete):
+        """Ecualiza (opcional) y localiza los rostros sobre una copia reducida del frame"""
+        # Las cajas vuelven en coordenadas del frame completo; la clasificación
+        # recorta los rostros a resolución original
+        paquete["frame"], paquete["cajas"], paquete["detectado"] = self.nucleo.detectar(
+            paquete["original"], paquete["usar_hist"])
+        return paquete
+
+    def _etapa_clasificacion(self, paquete):
+        """Clasifica en una sola llamada las emociones de todos los rostros detectados"""
+        paquete["caras"] = self.nucleo.clasificar(paquete["frame"], paquete["cajas"])
+        return paquete
+
+    def _etapa_reconocimiento(self, paquete):
+        """Asocia cada rostro a su pista e identifica las pistas nuevas o pendientes de reverificar"""
+        # El gestor de pistas tiene estado: solo avanza con frames en orden
+        if paquete["id"] <= self.ultimo_asociado:
+            return None
+        self.ultimo_asociado = paquete["id"]
+        paquete["pistas"], principal = self.nucleo.asociar(paquete["caras"])
+        paquete["principal"] = principal
+        self.nucleo.identificar(paquete["original"], paquete["pistas"])
+        if principal is not None:
+            self.usuario_reconocido = principal.identidad or "Desconocido"
+        return paquete
+
+    def _etapa_composicion(self, paquete):
+        """Guarda el resultado del análisis para dibujarlo y actualiza el panel de emociones"""
+        if self.controlador is not None:
+            self.controlador.completado(paquete["id"])
+        # Con varios trabajadores los paquetes pueden llegar desordenados: no retroceder
+        if paquete["id"] <= self.ultimo_compuesto:
+            return None
+        self.ultimo_compuesto = paquete["id"]
+
+        pares = paquete.get("pistas", [])
+        principal = paquete.get("principal")
+        emo, conf = None, 0
+
+        self._publicar("rostros", str(len(pares)))
+        superposicion = []
+        for pista, face in pares:
+            emociones = face["emotions"]
+            if not emociones:
+                continue
+            emo_pista = max(emociones, key=emociones.get)
+            conf_pista = int(emociones[emo_pista] * 100)
+            caja = tuple(int(v) for v in face["box"])
+            color = (0, 255, 0) if pista is principal else (0, 200, 255)
+            superposicion.append((caja, f"#{pista.id} {emo_pista} ({conf_pista}%)", color, pista.identidad))
+            if pista is principal:
+                emo, conf = emo_pista, conf_pista
+            if self.sumideros:
+                evento = crear_evento(paquete["t_captura"], pista, face, self.fps_actual)
+                for sumidero in self.sumideros:
+                    sumidero.registrar(evento)
+        with self.lock_superposicion:
+            self.superposicion = superposicion
+
+        try:
+            if emo and emo in self.emoji_imgs:
+                self._actualizar_panel(emo, conf, principal)
+        except Exception as e:
+            logger.error(f"Error actualizando panel emoji: {str(e)}")
+
+        return paquete
+
+    def _actualizar_panel(self, emo, conf, principal):
+        """Redibuja el panel de emociones si cambió de forma apreciable y ha pasado el intervalo mínimo"""
+        ahora = time.time()
+        if TASA_PANEL and ahora - self.ultimo_panel < 1.0 / TASA_PANEL:
+            return
+        # Emociones suavizadas de la pista principal (no se mezclan personas)
+        suavizadas = principal.suavizado.como_dict()
+        barras = [suavizadas.get(e, 0.0) for e in self.emotion_labels]
+        if self.panel_mostrado is not None:
+            emo_prev, conf_prev, barras_prev = self.panel_mostrado
+            if (emo == emo_prev and abs(conf - conf_prev) < UMBRAL_PANEL * 100
+                    and max(abs(a - b) for a, b in zip(barras, barras_prev)) < UMBRAL_PANEL):
+                return
+        self.panel_mostrado = (emo, conf, barras)
+        self.ultimo_panel = ahora
+
+        canvas = self.fondo_panel.copy()
+        sprite = self.emoji_imgs[emo]
+        canvas.paste(sprite, (25, 20), sprite)
+
+        draw = ImageDraw.Draw(canvas)
+        draw.text((25, 130), f"{emo.capitalize()}\n{conf}%", fill=(255, 255, 255, 255))
+
+        bar_y = 200
+        for e, promedio in zip(self.emotion_labels, barras):
+            ancho = int(promedio * 100)
+            color = self.emotion_colors[e]
+            draw.rectangle([10, bar_y, 10+ancho, bar_y+10], fill=color)
+            draw.text((10, bar_y+12), f"{e}: {int(promedio*100)}%", fill=(255,255,255,255))
+            bar_y += 35
+
+        self._publicar("panel", canvas)
+
+    def _mostrar_frame(self, frame, usar_hist):
+        """Muestra un frame de la cámara con el último resultado del análisis"""
+        if usar_hist:
+            gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        with self.lock_superposicion:
+            superposicion = self.superposicion
+        for (x, y, w, h), etiqueta, color, identidad in superposicion:
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+            cv2.putText(frame, etiqueta, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+            if identidad:
+                cv2.putText(frame, identidad, (x, y + h + 22),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+        cv2.putText(frame, f"Usuario: {self.usuario_reconocido}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+
+        try:
+            if self.renderizador:
+                self._publicar("video", self.renderizador.preparar(frame, self.tamano_video.actual()))
+        except Exception as e:
+            logger.error(f"Error actualizando frame en UI: {str(e)}")
+
+        # FPS = ritmo real de frames mostrados
+        ahora = time.time()
+        self.tiempos_composicion.append(ahora)
+        if len(self.tiempos_composicion) > 1:
+            transcurrido = self.tiempos_composicion[-1] - self.tiempos_composicion[0]
+            if transcurrido > 0:
+                self.fps_actual = (len(self.tiempos_composicion) - 1) / transcurrido
+                self._publicar("fps", f"{self.fps_actual:.1f}")
+
     def _loop(self):
+        captura = None
+        pipeline = None
         try:
-            cap = cv2.VideoCapture(0)
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # La captura corre en su propio hilo y solo entrega el frame más reciente
+            captura = CapturaCamara(FUENTE_CAMARA, 640, 480)
+            if not captura.iniciar():
+                return
+            ultimo_id = 0
             self.frame_count = 0
+            self.ultimo_compuesto = 0
+            self.tiempos_composicion = deque(maxlen=31)
             self.usuario_reconocido = "Desconocido"
-            self.ya_intento_reconocer = False
-
-            times = []
+            self.ultimo_asociado = 0
+            self.nucleo.reiniciar()
+            with self.lock_superposicion:
+                self.superposicion = []
+            self.panel_mostrado = None
+            for sumidero in self.sumideros:
+                sumidero.iniciar()
+            self.controlador = controlador = ControladorTasa(
+                TASA_INFERENCIA, PRESUPUESTO_CPU, UMBRAL_CAMBIO, MAX_SIN_ANALIZAR_S)
+            self.pipeline = pipeline = self._crear_pipeline()
+            pipeline.iniciar()
 
             while self.running:
-                start = time.time()
-                ret, frame = cap.read()
-                if not ret:
+                frame_id, frame, t_captura = captura.leer(ultimo_id)
+                if frame is None:
+                    if not captura.running:
+                        logger.error("La captura de cámara se detuvo")
+                        break
                     logger.warning("Error al leer frame de cámara")
                     continue
-
+                ultimo_id = frame_id
                 self.frame_count += 1
-                usar_hist = self.hist_eq_var.get()
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                if usar_hist:
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    gray = cv2.equalizeHist(gray)
-                    frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-
-                emo, conf, box = None, 0, None
-                emociones_actuales = {}
-
-                try:
-                    faces = self.detector_fer.detect_emotions(frame)
-                    self.faces_var.set(str(len(faces)))
-                    if faces:
-                        face = faces[0]
-                        box = face["box"]
-                        emociones = face["emotions"]
-                        for e, v in emociones.items():
-                            emociones_actuales[e] = v
-                            self.emo_history[e].append(v)
-                        emo = max(emociones, key=emociones.get)
-                        conf = int(emociones[emo] * 100)
-                        x, y, w, h = box
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                        cv2.putText(frame, f"{emo} ({conf}%)", (x, y - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 0, 0), 2)
-                except Exception as e:
-                    logger.error(f"Error en detección de emociones: {str(e)}")
-                    continue
 
-                if box is not None and not self.ya_intento_reconocer and self.frame_count <= self.recognition_limit:
-                    try:
-                        x, y, w, h = box
-                        encs = self.face_recognition.face_encodings(frame_rgb, known_face_locations=[(y, x+w, y+h, x)])
-                        if encs:
-                            matches = self.face_recognition.compare_faces(self.embeddings, encs[0])
-                            if True in matches:
-                                idx = matches.index(True)
-                                self.usuario_reconocido = self.nombres[idx]
-                                self.ya_intento_reconocer = True
-                        elif self.frame_count == self.recognition_limit:
-                            self.ya_intento_reconocer = True
-                    except Exception as e:
-                        logger.error(f"Error en reconocimiento facial: {str(e)}")
-
-                cv2.putText(frame, f"Usuario: {self.usuario_reconocido}", (10, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-
-                try:
-                    width = self.video_label.winfo_width() or 780
-                    height = self.video_label.winfo_height() or 440
-                    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                    img = ImageOps.contain(img, (width, height))
-                    tk_img = ImageTk.PhotoImage(img)
-                    if self.video_label and self.video_label.winfo_exists():
-                        self.video_label.imgtk = tk_img
-                        self.video_label.configure(image=tk_img)
-                except Exception as e:
-                    logger.error(f"Error actualizando frame en UI: {str(e)}")
-
-                try:
-                    if emo and emo in self.emoji_imgs:
-                        im = self.emoji_imgs[emo]
-                        im = cv2.resize(im, (100, 100))
-                        rgba = cv2.cvtColor(im, cv2.COLOR_BGRA2RGBA)
-                        pil_e = Image.fromarray(rgba)
-
-                        canvas = Image.new("RGBA", (150, 440), (0, 0, 0, 255))
-                        canvas.paste(pil_e, (25, 20), pil_e)
-
-                        draw = ImageDraw.Draw(canvas)
-                        draw.text((25, 130), f"{emo.capitalize()}\n{conf}%", fill=(255, 255, 255, 255))
-
-                        bar_y = 200
-                        for e in self.emotion_labels:
-                            valores = list(self.emo_history[e])
-                            promedio = sum(valores) / len(valores) if valores else 0
-                            ancho = int(promedio * 100)
-                            color = self.emotion_colors[e]
-                            draw.rectangle([10, bar_y, 10+ancho, bar_y+10], fill=color)
-                            draw.text((10, bar_y+12), f"{e}: {int(promedio*100)}%", fill=(255,255,255,255))
-                            bar_y += 35
-
-                        tk_emo = ImageTk.PhotoImage(canvas)
-                        if self.panel and self.panel.winfo_exists():
-                            self.panel.imgtk = tk_emo
-                            self.panel.configure(image=tk_emo)
-                except Exception as e:
-                    logger.error(f"Error actualizando panel emoji: {str(e)}")
-
-                elapsed = time.time() - start
-                times.append(elapsed)
-                if len(times) > 30:
-                    times.pop(0)
-                if times:
-                    fps = len(times) / sum(times)
-                    self.fps_var.set(f"{fps:.1f}")
+                usar_hist = self.usar_hist
+                if controlador.decidir(frame_id, frame):
+                    # La primera etapa descarta el paquete más antiguo si va atrasada
+                    pipeline.poner({
+                        "id": frame_id,
+                        "n": self.frame_count,
+                        "t_captura": t_captura,
+                        "original": frame,
+                        "usar_hist": usar_hist
+                    })
+                # Todos los frames se muestran, con el último resultado disponible
+                self._mostrar_frame(frame.copy(), usar_hist)
 
         except Exception as e:
             logger.error(f"Error en loop principal: {str(e)}")
         finally:
-            if cap:
-                cap.release()
-            if self.video_label:
-                self.video_label.configure(image=None)
-            if self.panel:
-                self.panel.configure(image=None)
\ No newline at end of file
+            if pipeline:
+                pipeline.detener()
+                pipeline.reportar()
+            for sumidero in self.sumideros:
+                sumidero.detener()
+            if self.controlador:
+                logger.info(f"Control de tasa: {self.controlador.resumen()}")
+            logger.info(f"Reconocimiento: {self.nucleo.identificaciones} rostros codificados")
+            if self.nucleo.seguidor:
+                logger.info(f"Seguimiento: {self.nucleo.seguidor.detecciones} detecciones, "
+                            f"{self.nucleo.seguidor.propagaciones} frames propagados")
+            if captura:
+                captura.detener()
+            self._publicar("video", None)
+            self._publicar("panel", None)
+            if self.render:
+                logger.info(f"Render: {self.render.resumen()}")
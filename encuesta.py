@@ -7,7 +7,7 @@ import csv
 import logging
 
 # Importar config.py
-from config import DATA_DIR
+from config import DATA_DIR, BASE_DATOS
 
 # Configurar logging
 logging.basicConfig(
@@ -96,48 +96,60 @@ class EncuestaEmocional:
                 "comentario": self.preg3_var.get().strip()
             }
 
-            # Intentar guardar en la ruta data_path, con DATA_DIR como respaldo
-            csv_path = os.path.join(self.data_path, "respuestas_encuesta.csv")
-            encabezados = ["timestamp", "nombre", "email", "emocion", "intensidad", "comentario"]
-
-            # Verificar si podemos escribir en data_path
-            try:
-                # Crear directorio si no existe
-                os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+            # Guardar en la base de datos local; el CSV queda como respaldo
+            guardado = False
+            if BASE_DATOS:
+                try:
+                    from almacen_sqlite import obtener_base_datos
+                    obtener_base_datos(BASE_DATOS).insertar_encuestas([datos])
+                    guardado = True
+                    logger.info(f"Encuesta guardada correctamente para {nombre} en {BASE_DATOS}")
+                except Exception as e:
+                    logger.error(f"Error al guardar encuesta en la base de datos: {str(e)}")
+
+            if not guardado:
+                # Intentar guardar en la ruta data_path, con DATA_DIR como respaldo
+                csv_path = os.path.join(self.data_path, "respuestas_encuesta.csv")
+                encabezados = ["timestamp", "nombre", "email", "emocion", "intensidad", "comentario"]
+
+                # Verificar si podemos escribir en data_path
+                try:
+                    # Crear directorio si no existe
+                    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
                 
-                nuevo = not os.path.exists(csv_path)
+                    nuevo = not os.path.exists(csv_path)
                 
-                with open(csv_path, "a", newline="", encoding="utf-8") as f:
-                    writer = csv.DictWriter(f, fieldnames=encabezados)
-                    if nuevo:
-                        writer.writeheader()
-                    writer.writerow(datos)
-                logger.info(f"Encuesta guardada correctamente para {nombre} en {csv_path}")
-            except Exception as e:
-                logger.error(f"Error al guardar encuesta en {csv_path}: {str(e)}")
+                    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+                        writer = csv.DictWriter(f, fieldnames=encabezados)
+                        if nuevo:
+                            writer.writeheader()
+                        writer.writerow(datos)
+                    logger.info(f"Encuesta guardada correctamente para {nombre} en {csv_path}")
+                except Exception as e:
+                    logger.error(f"Error al guardar encuesta en {csv_path}: {str(e)}")
                 
-                # Intentar con DATA_DIR como alternativa si es diferente
-                if self.data_path != DATA_DIR:
-                    try:
-                        alt_csv_path = os.path.join(DATA_DIR, "respuestas_encuesta.csv")
-                        os.makedirs(os.path.dirname(alt_csv_path), exist_ok=True)
+                    # Intentar con DATA_DIR como alternativa si es diferente
+                    if self.data_path != DATA_DIR:
+                        try:
+                            alt_csv_path = os.path.join(DATA_DIR, "respuestas_encuesta.csv")
+                            os.makedirs(os.path.dirname(alt_csv_path), exist_ok=True)
                         
-                        alt_nuevo = not os.path.exists(alt_csv_path)
+                            alt_nuevo = not os.path.exists(alt_csv_path)
                         
-                        with open(alt_csv_path, "a", newline="", encoding="utf-8") as f:
-                            writer = csv.DictWriter(f, fieldnames=encabezados)
-                            if alt_nuevo:
-                                writer.writeheader()
-                            writer.writerow(datos)
-                        logger.info(f"Encuesta guardada en ruta alternativa {alt_csv_path}")
-                        csv_path = alt_csv_path  # Actualizar ruta para mensaje de éxito
-                    except Exception as e2:
-                        logger.error(f"Error al guardar encuesta en ruta alternativa {alt_csv_path}: {str(e2)}")
-                        messagebox.showerror("Error", f"No se pudo guardar la encuesta en ninguna ubicación:\n{str(e2)}")
+                            with open(alt_csv_path, "a", newline="", encoding="utf-8") as f:
+                                writer = csv.DictWriter(f, fieldnames=encabezados)
+                                if alt_nuevo:
+                                    writer.writeheader()
+                                writer.writerow(datos)
+                            logger.info(f"Encuesta guardada en ruta alternativa {alt_csv_path}")
+                            csv_path = alt_csv_path  # Actualizar ruta para mensaje de éxito
+                        except Exception as e2:
+                            logger.error(f"Error al guardar encuesta en ruta alternativa {alt_csv_path}: {str(e2)}")
+                            messagebox.showerror("Error", f"No se pudo guardar la encuesta en ninguna ubicación:\n{str(e2)}")
+                            return
+                    else:
+                        messagebox.showerror("Error", f"No se pudo guardar la encuesta:\n{str(e)}")
                         return
-                else:
-                    messagebox.showerror("Error", f"No se pudo guardar la encuesta:\n{str(e)}")
-                    return
 
             messagebox.showinfo("Gracias", "Tus respuestas han sido registradas exitosamente.")
             self.name_var.set("")
@@ -0,0 +1,181 @@
+import threading
+import logging
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("galeria")
+
+
+class GaleriaRostros:
+    """
+    Galería de identidades respaldada por una única matriz float32 contigua.
+
+    La distancia euclídea se obtiene como ||q||² + ||x||² - 2·q·x con las
+    normas precalculadas, de modo que cada consulta exacta es una única
+    multiplicación matriz-vector (BLAS). Las distancias de las fotos de cada
+    usuario se agregan con un reduceat sobre la permutación que las agrupa.
+
+    Con un índice de indice_identidades (p.ej. IVF) la galería solo obtiene
+    candidatos del índice y recalcula de forma exacta la distancia de esos
+    usuarios, para poblaciones grandes donde la fuerza bruta no cabe en el
+    presupuesto de cada frame.
+    """
+
+    def __init__(self, dim=128, tolerancia=0.6, agregacion="min", indice=None, filas_candidatas=64):
+        self.dim = dim
+        # Misma tolerancia por defecto que face_recognition.compare_faces
+        self.tolerancia = tolerancia
+        if agregacion not in ("min", "media"):
+            raise ValueError(f"Agregación no soportada: {agregacion}")
+        self.agregacion = agregacion
+        self.indice = indice
+        self.filas_candidatas = filas_candidatas
+        self.lock = threading.Lock()
+        self.lock_escritura = threading.Lock()  # serializa agregar() concurrentes
+
+        self.nombres = []                      # nombre por usuario
+        self.matriz = np.zeros((0, dim), dtype=np.float32)
+        self.normas2 = np.zeros(0, dtype=np.float32)
+        self.etiquetas = np.zeros(0, dtype=np.int64)  # usuario de cada fila
+        self.orden = np.zeros(0, dtype=np.int64)      # filas agrupadas por usuario
+        self.inicios = np.zeros(0, dtype=np.int64)    # inicio de cada usuario en orden
+        self.conteos = np.zeros(0, dtype=np.int64)    # fotos por usuario
+
+    @classmethod
+    def desde_embeddings(cls, embeddings, nombres, **kwargs):
+        """Construye la galería a partir de embeddings y nombres fila a fila"""
+        galeria = cls(**kwargs)
+        galeria.reconstruir(embeddings, nombres)
+        return galeria
+
+    def __len__(self):
+        return len(self.nombres)
+
+    @property
+    def total_fotos(self):
+        return self.matriz.shape[0]
+
+    def _publicar(self, nombres, matriz, normas2, etiquetas, indice):
+        """Calcula la agrupación por usuario y reemplaza el estado (índice incluido) en bloque"""
+        orden = np.argsort(etiquetas, kind="stable")
+        conteos = np.bincount(etiquetas, minlength=len(nombres)).astype(np.int64)
+        inicios = np.concatenate(([0], np.cumsum(conteos)[:-1])).astype(np.int64) if len(conteos) else conteos
+        with self.lock:
+            self.nombres = nombres
+            self.matriz = matriz
+            self.normas2 = normas2
+            self.etiquetas = etiquetas
+            self.orden = orden
+            self.conteos = conteos
+            self.inicios = inicios
+            self.indice = indice
+
+    def reconstruir(self, embeddings, nombres):
+        """Reemplaza el contenido de la galería (y reconstruye el índice si lo hay)"""
+        matriz = np.array(embeddings, dtype=np.float32, order="C", copy=True).reshape(-1, self.dim)
+        nombres_unicos = list(dict.fromkeys(nombres))
+        posicion = {n: i for i, n in enumerate(nombres_unicos)}
+        etiquetas = np.array([posicion[n] for n in nombres], dtype=np.int64)
+        with self.lock_escritura:
+            # El índice nuevo se construye en una copia y se publica junto con la matriz:
+            # una búsqueda en curso nunca mezcla ids del índice nuevo con filas antiguas
+            indice = self.indice
+            if indice is not None:
+                indice = indice.copia()
+                indice.construir(matriz)
+            self._publicar(nombres_unicos, matriz, np.einsum("ij,ij->i", matriz, matriz), etiquetas, indice)
+        logger.info(f"Galería construida: {len(nombres_unicos)} usuarios, {matriz.shape[0]} fotos")
+
+    def agregar(self, nombre, embeddings):
+        """Añade fotos de un usuario (nuevo o existente) sin reconstruir el índice"""
+        nuevos = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if nuevos.shape[0] == 0:
+            return
+        with self.lock_escritura:
+            nombres, matriz, normas2, etiquetas = self.nombres, self.matriz, self.normas2, self.etiquetas
+            if nombre in nombres:
+                etiqueta = nombres.index(nombre)
+            else:
+                nombres = nombres + [nombre]
+                etiqueta = len(nombres) - 1
+            id_inicial = matriz.shape[0]
+            indice = self.indice
+            if indice is not None:
+                indice = indice.copia()
+                indice.agregar(nuevos, id_inicial)
+            self._publicar(
+                nombres,
+                np.vstack([matriz, nuevos]),
+                np.concatenate([normas2, np.einsum("ij,ij->i", nuevos, nuevos)]),
+                np.concatenate([etiquetas, np.full(nuevos.shape[0], etiqueta, dtype=np.int64)]),
+                indice
+            )
+        logger.info(f"Añadidas {nuevos.shape[0]} fotos de '{nombre}' a la galería")
+
+    def _instantanea(self):
+        """Referencias consistentes al estado actual (_publicar las reemplaza en bloque)"""
+        with self.lock:
+            return (self.nombres, self.matriz, self.normas2, self.etiquetas,
+                    self.orden, self.inicios, self.conteos, self.indice)
+
+    @staticmethod
+    def _distancias(q, matriz, normas2):
+        d2 = normas2 - 2.0 * (matriz @ q) + float(q @ q)
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def distancias(self, encoding):
+        """Distancias euclídeas de una consulta a todas las fotos (una sola llamada BLAS)"""
+        q = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        _, matriz, normas2, _, _, _, _, _ = self._instantanea()
+        return self._distancias(q, matriz, normas2)
+
+    def _reducir(self, distancias, inicios, conteos):
+        """Agrega distancias de filas contiguas por usuario (min o media)"""
+        if self.agregacion == "media":
+            return np.add.reduceat(distancias, inicios) / conteos
+        return np.minimum.reduceat(distancias, inicios)
+
+    def buscar(self, encoding, k=3):
+        """
+        Devuelve la identidad más cercana como dict con las claves "nombre"
+        (None si supera la tolerancia), "distancia" y "candidatos" (top-k de
+        tuplas (nombre, distancia) ordenadas de menor a mayor).
+        """
+        nombres, matriz, normas2, etiquetas, orden, inicios, conteos, indice = self._instantanea()
+        if not nombres:
+            return {"nombre": None, "distancia": None, "candidatos": []}
+
+        q = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        if indice is None:
+            usuarios = np.arange(len(nombres))
+            por_usuario = self._reducir(self._distancias(q, matriz, normas2)[orden], inicios, conteos)
+        else:
+            # El índice propone filas candidatas; se recalculan exactas todas las
+            # fotos de los usuarios propuestos para agregar igual que sin índice
+            _, filas = indice.buscar(q, max(self.filas_candidatas, k))
+            if len(filas) == 0:
+                return {"nombre": None, "distancia": None, "candidatos": []}
+            usuarios = np.unique(etiquetas[filas])
+            filas_usuarios = np.concatenate([orden[inicios[u]:inicios[u] + conteos[u]] for u in usuarios])
+            inicios_locales = np.concatenate(([0], np.cumsum(conteos[usuarios])[:-1]))
+            d = self._distancias(q, matriz[filas_usuarios], normas2[filas_usuarios])
+            por_usuario = self._reducir(d, inicios_locales, conteos[usuarios])
+
+        k = min(k, len(usuarios))
+        top = np.argpartition(por_usuario, k - 1)[:k]
+        top = top[np.argsort(por_usuario[top])]
+        candidatos = [(nombres[usuarios[i]], float(por_usuario[i])) for i in top]
+        mejor_nombre, mejor_dist = candidatos[0]
+        return {
+            "nombre": mejor_nombre if mejor_dist <= self.tolerancia else None,
+            "distancia": mejor_dist,
+            "candidatos": candidatos
+        }
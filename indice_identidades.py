@@ -0,0 +1,245 @@
+import copy
+import time
+import threading
+import logging
+import numpy as np
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("indice_identidades")
+
+# A partir de cuántas fotos el modo "auto" cambia la búsqueda exacta por IVF
+UMBRAL_AUTO_IVF = 20000
+
+
+def _top_k(distancias, ids, k):
+    """Selecciona las k distancias menores (ordenadas) y sus ids"""
+    if len(distancias) == 0:
+        return distancias, ids
+    k = min(k, len(distancias))
+    top = np.argpartition(distancias, k - 1)[:k]
+    top = top[np.argsort(distancias[top])]
+    return distancias[top], ids[top]
+
+
+def _distancias(q, vectores, normas2):
+    """Distancias euclídeas de q a cada fila usando normas precalculadas"""
+    d2 = normas2 - 2.0 * (vectores @ q) + float(q @ q)
+    return np.sqrt(np.maximum(d2, 0.0))
+
+
+class IndicePlano:
+    """Índice exacto por fuerza bruta; sirve de referencia para medir recall"""
+
+    nombre = "plano"
+
+    def __init__(self, dim=128):
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.vectores = np.zeros((0, dim), dtype=np.float32)
+        self.normas2 = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    def copia(self):
+        """Copia con lock propio: se puede modificar mientras se sigue buscando en esta"""
+        nueva = copy.copy(self)
+        nueva.lock = threading.Lock()
+        return nueva
+
+    def __len__(self):
+        return self.vectores.shape[0]
+
+    def construir(self, matriz, ids=None):
+        """Indexa todas las filas de la matriz (por defecto el id es su posición)"""
+        matriz = np.ascontiguousarray(matriz, dtype=np.float32).reshape(-1, self.dim)
+        if ids is None:
+            ids = np.arange(matriz.shape[0], dtype=np.int64)
+        with self.lock:
+            self.vectores = matriz
+            self.normas2 = np.einsum("ij,ij->i", matriz, matriz)
+            self.ids = ids
+
+    def agregar(self, vectores, id_inicial):
+        """Inserta vectores nuevos con ids consecutivos a partir de id_inicial"""
+        vectores = np.asarray(vectores, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.arange(id_inicial, id_inicial + vectores.shape[0], dtype=np.int64)
+        with self.lock:
+            self.vectores = np.vstack([self.vectores, vectores])
+            self.normas2 = np.concatenate([self.normas2, np.einsum("ij,ij->i", vectores, vectores)])
+            self.ids = np.concatenate([self.ids, ids])
+
+    def buscar(self, q, k):
+        """Devuelve (distancias, ids) de las k filas más cercanas"""
+        q = np.asarray(q, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            vectores, normas2, ids = self.vectores, self.normas2, self.ids
+        return _top_k(_distancias(q, vectores, normas2), ids, k)
+
+
+class IndiceIVF:
+    """
+    Índice aproximado de archivo invertido (IVF) implementado en NumPy.
+
+    Un k-means grueso reparte los vectores en listas; cada lista ocupa un
+    tramo contiguo de una matriz ordenada (formato CSR), de modo que una
+    consulta solo recorre las n_sondeo listas más cercanas. Las inserciones
+    incrementales van a un búfer de pendientes que se busca por fuerza bruta
+    y se fusiona en las listas cuando supera max_pendientes.
+    """
+
+    nombre = "ivf"
+
+    def __init__(self, dim=128, n_listas=None, n_sondeo=16, iteraciones=10,
+                 max_pendientes=2048, min_por_lista=32, semilla=0):
+        self.dim = dim
+        self.n_listas = n_listas
+        self.n_sondeo = n_sondeo
+        self.iteraciones = iteraciones
+        self.max_pendientes = max_pendientes
+        self.min_por_lista = min_por_lista
+        self.rng = np.random.default_rng(semilla)
+        self.lock = threading.Lock()
+        self._vaciar()
+
+    def _vaciar(self):
+        self.centroides = None
+        self.vectores = np.zeros((0, self.dim), dtype=np.float32)
+        self.normas2 = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.pend_vectores = np.zeros((0, self.dim), dtype=np.float32)
+        self.pend_ids = np.zeros(0, dtype=np.int64)
+
+    def copia(self):
+        """Copia con lock propio: se puede modificar mientras se sigue buscando en esta"""
+        nueva = copy.copy(self)
+        nueva.lock = threading.Lock()
+        return nueva
+
+    def __len__(self):
+        return self.vectores.shape[0] + self.pend_vectores.shape[0]
+
+    @property
+    def entrenado(self):
+        return self.centroides is not None
+
+    def _asignar(self, vectores, centroides, bloque=8192):
+        """Lista más cercana de cada vector, procesando por bloques para acotar memoria"""
+        normas_c = np.einsum("ij,ij->i", centroides, centroides)
+        asignacion = np.empty(vectores.shape[0], dtype=np.int64)
+        for i in range(0, vectores.shape[0], bloque):
+            v = vectores[i:i + bloque]
+            asignacion[i:i + bloque] = np.argmin(normas_c - 2.0 * (v @ centroides.T), axis=1)
+        return asignacion
+
+    def _kmeans(self, matriz, n_listas):
+        """K-means sobre una muestra de la matriz; devuelve los centroides"""
+        n_muestra = min(matriz.shape[0], n_listas * 64)
+        muestra = matriz[self.rng.choice(matriz.shape[0], n_muestra, replace=False)]
+        centroides = muestra[self.rng.choice(n_muestra, n_listas, replace=False)].copy()
+        for _ in range(self.iteraciones):
+            asignacion = self._asignar(muestra, centroides)
+            conteos = np.bincount(asignacion, minlength=n_listas)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, muestra)
+            vacias = conteos == 0
+            centroides[~vacias] = sumas[~vacias] / conteos[~vacias, None]
+            # Reubicar las listas vacías en puntos aleatorios de la muestra
+            if vacias.any():
+                centroides[vacias] = muestra[self.rng.choice(n_muestra, int(vacias.sum()), replace=False)]
+        return centroides.astype(np.float32)
+
+    def _empaquetar(self, vectores, ids):
+        """Ordena vectores por lista y calcula los offsets de cada tramo"""
+        asignacion = self._asignar(vectores, self.centroides)
+        orden = np.argsort(asignacion, kind="stable")
+        conteos = np.bincount(asignacion, minlength=self.centroides.shape[0])
+        self.vectores = np.ascontiguousarray(vectores[orden])
+        self.normas2 = np.einsum("ij,ij->i", self.vectores, self.vectores)
+        self.ids = ids[orden]
+        self.offsets = np.concatenate(([0], np.cumsum(conteos))).astype(np.int64)
+
+    def construir(self, matriz, ids=None):
+        """Entrena el cuantizador grueso y reparte todas las filas en listas"""
+        matriz = np.ascontiguousarray(matriz, dtype=np.float32).reshape(-1, self.dim)
+        if ids is None:
+            ids = np.arange(matriz.shape[0], dtype=np.int64)
+        inicio = time.time()
+        with self.lock:
+            self._vaciar()
+            n_listas = self.n_listas or max(1, int(np.sqrt(matriz.shape[0])))
+            if matriz.shape[0] < n_listas * self.min_por_lista:
+                # Pocos datos: todo queda en pendientes y la búsqueda es exacta
+                self.pend_vectores, self.pend_ids = matriz, ids
+                return
+            self.centroides = self._kmeans(matriz, n_listas)
+            self._empaquetar(matriz, ids)
+        logger.info(f"Índice IVF construido: {matriz.shape[0]} vectores en {n_listas} listas "
+                    f"({time.time() - inicio:.2f} s)")
+
+    def agregar(self, vectores, id_inicial):
+        """Inserta vectores nuevos con ids consecutivos a partir de id_inicial"""
+        vectores = np.asarray(vectores, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.arange(id_inicial, id_inicial + vectores.shape[0], dtype=np.int64)
+        with self.lock:
+            self.pend_vectores = np.vstack([self.pend_vectores, vectores])
+            self.pend_ids = np.concatenate([self.pend_ids, ids])
+            if self.entrenado and self.pend_vectores.shape[0] > self.max_pendientes:
+                self._empaquetar(np.vstack([self.vectores, self.pend_vectores]),
+                                 np.concatenate([self.ids, self.pend_ids]))
+                self.pend_vectores = np.zeros((0, self.dim), dtype=np.float32)
+                self.pend_ids = np.zeros(0, dtype=np.int64)
+                return
+        if not self.entrenado:
+            n_listas = self.n_listas or max(1, int(np.sqrt(len(self))))
+            if len(self) >= n_listas * self.min_por_lista:
+                # Ya hay datos suficientes para entrenar el cuantizador
+                self.construir(self.pend_vectores, self.pend_ids)
+
+    def buscar(self, q, k):
+        """Devuelve (distancias, ids) aproximados de las k filas más cercanas"""
+        q = np.asarray(q, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            centroides, offsets = self.centroides, self.offsets
+            vectores, normas2, ids = self.vectores, self.normas2, self.ids
+            pend_vectores, pend_ids = self.pend_vectores, self.pend_ids
+
+        partes_d, partes_i = [], []
+        if pend_vectores.shape[0]:
+            partes_d.append(np.linalg.norm(pend_vectores - q, axis=1))
+            partes_i.append(pend_ids)
+        if centroides is not None:
+            n_sondeo = min(self.n_sondeo, centroides.shape[0])
+            d_c = np.einsum("ij,ij->i", centroides, centroides) - 2.0 * (centroides @ q)
+            for lista in np.argpartition(d_c, n_sondeo - 1)[:n_sondeo]:
+                a, b = offsets[lista], offsets[lista + 1]
+                if a < b:
+                    partes_d.append(_distancias(q, vectores[a:b], normas2[a:b]))
+                    partes_i.append(ids[a:b])
+        if not partes_d:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return _top_k(np.concatenate(partes_d), np.concatenate(partes_i), k)
+
+
+def crear_indice(tipo, total_fotos=0, dim=128, **kwargs):
+    """
+    Crea el índice de identidades indicado: "plano", "ivf", "exacto" (sin
+    índice, búsqueda directa en la galería) o "auto" según el tamaño.
+    """
+    tipo = (tipo or "auto").lower()
+    if tipo == "auto":
+        tipo = "ivf" if total_fotos >= UMBRAL_AUTO_IVF else "exacto"
+    if tipo == "exacto":
+        return None
+    if tipo == "plano":
+        return IndicePlano(dim=dim)
+    if tipo == "ivf":
+        return IndiceIVF(dim=dim, **kwargs)
+    raise ValueError(f"Tipo de índice desconocido: {tipo}")
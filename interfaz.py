@@ -43,38 +43,16 @@ class EmotionDashboard:
         self.fps_var = tk.StringVar(value="FPS: 0.0")
         self.faces_var = tk.StringVar(value="Rostros: 0")
 
+        # Arranque en segundo plano: "Iniciar" y "Registrar" quedan deshabilitados hasta que termine
+        self.arranque = None
+        self.botones_iniciar = []
+        self.botones_registro = []
+        self.registro = None
+
         # Configurar estilos modernos
         self._configurar_estilos()
         self._crear_gui()
 
-        # Inicializar módulos con manejo de errores
-        try:
-            # Importar módulos dinámicamente para mejorar la robustez
-            from face_recognition_wrapper import get_face_recognition
-            from tensorflow_minimal import get_fer_detector
-            
-            # Inicializar comprobando si existe TensorFlow
-            try:
-                detector_fer = get_fer_detector()
-                logger.info(f"Detector FER inicializado: {detector_fer.__class__.__name__}")
-            except Exception as e:
-                logger.error(f"Error al cargar detector FER: {str(e)}")
-            
-            # Inicializar detector de emociones
-            from detector import DetectorEmociones
-            self.detector = DetectorEmociones(
-                self.content_frame, self.emoji_panel,
-                self.use_hist_eq, self.data_path,
-                self.fps_var, self.faces_var
-            )
-            logger.info("Detector inicializado correctamente")
-        except Exception as e:
-            logger.error(f"Error al inicializar detector: {str(e)}")
-            messagebox.showerror(
-                "Error", 
-                f"Error al inicializar detector: {str(e)}\nAlgunas funciones pueden no estar disponibles."
-            )
-        
         # Inicializar encuesta
         try:
             from encuesta import EncuestaEmocional
@@ -83,17 +61,77 @@ class EmotionDashboard:
         except Exception as e:
             logger.error(f"Error al inicializar encuesta: {str(e)}")
             self.encuesta = None
-        
-        # Inicializar registro
+
+        # La bienvenida se muestra ya; modelos, detector y registro se cargan detrás
+        self.show_welcome()
+        self._iniciar_arranque()
+
+    def _iniciar_arranque(self):
+        """Carga y calienta los modelos y el detector en un hilo de fondo"""
+        from arranque import crear_arranque_modelos
+        self.arranque = crear_arranque_modelos(self.data_path)
+        # El valor de la variable de Tk se lee aquí, en el hilo de Tk
+        usar_hist = bool(self.use_hist_eq.get())
+        self.arranque.agregar("detector", lambda: self._crear_detector(usar_hist))
+        self.arranque.iniciar()
+        self._actualizar_botones_iniciar()
+        self.root.after(100, self._comprobar_arranque)
+
+    def _crear_detector(self, usar_hist):
+        """Construye el detector de emociones (se ejecuta en el hilo de arranque, sin tocar Tk)"""
+        from detector import DetectorEmociones
+        return DetectorEmociones(
+            self.content_frame, self.emoji_panel,
+            usar_hist, self.data_path,
+            self.fps_var, self.faces_var
+        )
+
+    def _comprobar_arranque(self):
+        """Sondea el arranque desde el hilo de Tk y habilita la interfaz al terminar"""
+        hechas, total, mensaje = self.arranque.progreso()
+        if not self.arranque.terminado():
+            self.status_label.config(text=f"⏳ {mensaje} ({hechas}/{total})", fg="#94a3b8")
+            self.root.after(100, self._comprobar_arranque)
+            return
+
+        detector = self.arranque.resultados.get("detector")
+        if detector is not None:
+            self.detector = detector
+            detector.vincular_hist(self.use_hist_eq)
+            logger.info("Detector inicializado correctamente")
+        else:
+            error = self.arranque.errores.get("detector")
+            logger.error(f"Error al inicializar detector: {str(error)}")
+            messagebox.showerror(
+                "Error", 
+                f"Error al inicializar detector: {str(error)}\nAlgunas funciones pueden no estar disponibles."
+            )
+
+        # Inicializar registro (face_recognition ya está cargado en el registro de modelos)
         try:
             from registro import RegistroUsuario
-            self.registro = RegistroUsuario(self.content_frame, self.data_path, self.show_welcome)
+            self.registro = RegistroUsuario(
+                self.content_frame, self.data_path, self.show_welcome,
+                on_usuario_registrado=self.detector.agregar_usuario if hasattr(self, 'detector') else None
+            )
             logger.info("Registro inicializado correctamente")
         except Exception as e:
             logger.error(f"Error al inicializar registro: {str(e)}")
             self.registro = None
 
-        self.show_welcome()
+        self.status_label.config(text="🔴 Sistema Detenido", fg="#fbbf24")
+        self._actualizar_botones_iniciar()
+
+    def _actualizar_botones_iniciar(self):
+        """Habilita los botones "Iniciar" cuando el detector está listo y los de registro al terminar el arranque"""
+        listo = hasattr(self, 'detector')
+        self.botones_iniciar = [b for b in self.botones_iniciar if b.winfo_exists()]
+        for boton in self.botones_iniciar:
+            boton.configure(state="normal" if listo else "disabled")
+        terminado = self.arranque is not None and self.arranque.terminado()
+        self.botones_registro = [b for b in self.botones_registro if b.winfo_exists()]
+        for boton in self.botones_registro:
+            boton.configure(state="normal" if terminado else "disabled")
 
     def _configurar_estilos(self):
         """Configurar estilos modernos para la aplicación"""
@@ -233,6 +271,7 @@ class EmotionDashboard:
                                style="Success.TButton", 
                                command=self.iniciar)
         btn_iniciar.pack(fill="x", pady=(0, 10))
+        self.botones_iniciar.append(btn_iniciar)
         
         # Botón Detener
         btn_detener = ttk.Button(grp1, 
@@ -261,6 +300,8 @@ class EmotionDashboard:
         for text, command in nav_buttons:
             btn = ttk.Button(grp2, text=text, style="Primary.TButton", command=command)
             btn.pack(fill="x", pady=(0, 8))
+            if command == self.show_registro:
+                self.botones_registro.append(btn)
 
         # Grupo de Configuración
         grp3 = tk.LabelFrame(menu, 
@@ -487,20 +528,25 @@ class EmotionDashboard:
         buttons_frame.pack()
 
         # Botones de acceso rápido
-        ttk.Button(buttons_frame, 
+        btn_iniciar = ttk.Button(buttons_frame, 
                   text="🚀 Iniciar Detección", 
                   style="Success.TButton", 
-                  command=self.iniciar).pack(side="left", padx=(0, 10))
+                  command=self.iniciar)
+        btn_iniciar.pack(side="left", padx=(0, 10))
+        self.botones_iniciar.append(btn_iniciar)
 
         ttk.Button(buttons_frame, 
                   text="📋 Hacer Encuesta", 
                   style="Primary.TButton", 
                   command=self.show_survey).pack(side="left", padx=(0, 10))
 
-        ttk.Button(buttons_frame, 
+        btn_registro = ttk.Button(buttons_frame, 
                   text="👤 Registrarse", 
                   style="Secondary.TButton", 
-                  command=self.show_registro).pack(side="left")
+                  command=self.show_registro)
+        btn_registro.pack(side="left")
+        self.botones_registro.append(btn_registro)
+        self._actualizar_botones_iniciar()
 
     def show_detector(self):
         try:
@@ -546,6 +592,9 @@ class EmotionDashboard:
             messagebox.showerror("Error", f"Error al mostrar registro: {str(e)}")
 
     def iniciar(self):
+        if self.arranque is not None and not self.arranque.terminado():
+            messagebox.showinfo("Cargando", "Los modelos aún se están cargando, espera unos segundos.")
+            return
         try:
             self.status_label.config(text="🟢 Sistema Activo", fg="#22c55e")
             self.show_detector()
@@ -67,20 +67,6 @@ def main():
 
 if __name__ == "__main__":
     try:
-        # Intentar configurar TensorFlow y face_recognition de manera segura
-        try:
-            from tensorflow_minimal import setup_minimal_tensorflow
-            tf_available = setup_minimal_tensorflow()
-            logger.info(f"TensorFlow disponible: {tf_available}")
-        except Exception as e:
-            logger.warning(f"No se pudo inicializar TensorFlow: {str(e)}")
-        
-        try:
-            from face_recognition_wrapper import get_face_recognition
-            logger.info("Face recognition wrapper cargado correctamente")
-        except Exception as e:
-            logger.warning(f"No se pudo cargar face_recognition_wrapper: {str(e)}")
-        
         # Iniciar aplicación
         main()
     except Exception as e:
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import threading
+import logging
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("modelos")
+
+
+def memoria_residente_mb():
+    """Memoria residente del proceso en MB (psutil si está instalado), o None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        # ru_maxrss es el pico, en KB en Linux y en bytes en macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class RegistroModelos:
+    """
+    Registro de modelos compartido por todo el proceso. Cada modelo se crea
+    una sola vez con su función de carga, aunque lo pidan varios hilos a la
+    vez, y se registra cuánto tardó y cuánta memoria añadió.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.modelos = {}
+        self.locks = {}
+        self.estadisticas = {}
+
+    def obtener(self, nombre, fabrica):
+        """Devuelve el modelo `nombre`, creándolo con fabrica() la primera vez"""
+        if nombre in self.modelos:
+            return self.modelos[nombre]
+        with self.lock:
+            lock = self.locks.setdefault(nombre, threading.Lock())
+        with lock:
+            if nombre in self.modelos:
+                return self.modelos[nombre]
+            memoria_antes = memoria_residente_mb()
+            inicio = time.perf_counter()
+            modelo = fabrica()
+            segundos = time.perf_counter() - inicio
+            memoria = memoria_residente_mb()
+            incremento = memoria - memoria_antes if memoria is not None and memoria_antes is not None else None
+            self.estadisticas[nombre] = {"segundos": segundos, "memoria_mb": incremento}
+            self.modelos[nombre] = modelo
+            if memoria is not None:
+                logger.info(f"Modelo '{nombre}' cargado en {segundos:.2f} s "
+                            f"(+{incremento:.1f} MB, residente {memoria:.1f} MB)")
+            else:
+                logger.info(f"Modelo '{nombre}' cargado en {segundos:.2f} s")
+            return modelo
+
+    def cargado(self, nombre):
+        return nombre in self.modelos
+
+    def resumen(self):
+        """Estadísticas de carga de todos los modelos"""
+        return dict(self.estadisticas)
+
+
+# Instancia única del proceso
+registro_modelos = RegistroModelos()
+
+
+def obtener_tensorflow():
+    """Configura TensorFlow una sola vez; devuelve si está disponible"""
+    from tensorflow_minimal import setup_minimal_tensorflow
+    return registro_modelos.obtener("tensorflow", setup_minimal_tensorflow)
+
+
+def obtener_face_recognition(data_path=None):
+    """face_recognition (o su fallback) compartido por detector y registro"""
+    from face_recognition_wrapper import get_face_recognition
+    if data_path is None:
+        from config import DATA_DIR
+        data_path = DATA_DIR
+    return registro_modelos.obtener("face_recognition", lambda: get_face_recognition(data_path))
+
+
+def obtener_detector_rostros():
+    """Detector de rostros Haar compartido"""
+    from deteccion_rostros import crear_detector_rostros
+    return registro_modelos.obtener("detector_rostros", crear_detector_rostros)
+
+
+def obtener_backend_emociones(tipo=None, variante=None):
+    """Backend de inferencia de emociones (ONNX Runtime, TFLite, OpenCV DNN o Keras), o None"""
+    from config import BACKEND_EMOCIONES, VARIANTE_MODELO
+    tipo = (tipo or BACKEND_EMOCIONES).lower()
+    variante = (variante or VARIANTE_MODELO).lower()
+
+    def cargar():
+        from backends_emociones import crear_backend
+        return crear_backend(tipo, variante=variante)
+    return registro_modelos.obtener(f"backend_emociones:{tipo}:{variante}", cargar)
+
+
+def obtener_detector_lote():
+    """Clasificador de emociones por lotes sobre el backend configurado, o None si no hay ninguno"""
+    def cargar():
+        backend = obtener_backend_emociones()
+        if backend is None:
+            return None
+        from clasificador_emociones import crear_detector_lote
+        return crear_detector_lote(obtener_detector_rostros(), backend)
+    return registro_modelos.obtener("detector_emociones_lote", cargar)
+
+
+def obtener_fer():
+    """Detector de la librería FER (sin MTCNN), o None si no se puede cargar"""
+    def cargar():
+        if not obtener_tensorflow():
+            return None
+        try:
+            os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+            from fer import FER
+            return FER(mtcnn=False)
+        except ImportError:
+            logger.warning("No se pudo importar fer")
+        except Exception as e:
+            logger.error(f"Error al cargar detector FER: {str(e)}")
+        return None
+    return registro_modelos.obtener("fer", cargar)
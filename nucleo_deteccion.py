@@ -0,0 +1,377 @@
+import os
+import copy
+import time
+import threading
+import logging
+import cv2
+
+from config import (DATA_DIR, TIPO_INDICE, INTERVALO_DETECCION, CLASIFICADOR,
+                    REVERIFICACION_IDENTIDAD_S, REINTENTO_IDENTIDAD_S, MAX_IDENTIFICACIONES_FRAME,
+                    SUAVIZADO, VENTANA_SUAVIZADO, ALFA_SUAVIZADO)
+from seguimiento import SeguidorRostros, GestorPistas, asociar_cajas
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("nucleo_deteccion")
+
+
+class FERFallback:
+    """Emociones aleatorias pero estables por rostro, para probar sin TensorFlow ni FER"""
+
+    def __init__(self, detector_rostros):
+        # Detección a resolución reducida compartida con el detector
+        self.detector_rostros = detector_rostros
+        logger.info(f"Detector fallback inicializado con cascade: {detector_rostros.cascade_file}")
+
+        # Para emociones dinámicas
+        self.prev_emotions = {}  # Para mantener cierta consistencia entre frames
+        self.prev_boxes = {}  # Caja previa de cada cara, para emparejar por solapamiento
+        self.next_face = 0
+        self.frame_count = 0  # Contador para cambiar emociones periódicamente
+        self.emotion_shift_interval = 15  # Cada cuántos frames cambiar la emoción dominante
+
+    def find_faces(self, frame):
+        """Localiza rostros con el cascade (misma interfaz que FER.find_faces)"""
+        return self.detector_rostros.detectar(frame)
+
+    def detect_emotions(self, frame, face_rectangles=None):
+        """Detecta caras y asigna emociones aleatorias dinámicas para pruebas"""
+        try:
+            if not self.detector_rostros.disponible:
+                logger.error("Cascade no cargado o vacío, no se pueden detectar rostros")
+                return []
+
+            self.frame_count += 1
+            faces = self.find_faces(frame) if face_rectangles is None else face_rectangles
+            result = []
+
+            # Determinar si es momento de actualizar las emociones
+            should_update = (self.frame_count % self.emotion_shift_interval == 0) or (len(faces) != len(self.prev_emotions))
+
+            # Emparejar cada cara con la del frame anterior que más se solapa,
+            # así el estado no salta entre personas al cambiar el orden
+            prev_ids = list(self.prev_boxes)
+            asignacion = asociar_cajas([self.prev_boxes[k] for k in prev_ids], faces)
+            face_ids = []
+            for previa in asignacion:
+                if previa >= 0:
+                    face_ids.append(prev_ids[previa])
+                else:
+                    face_ids.append(f"face_{self.next_face}")
+                    self.next_face += 1
+
+            for i, (x, y, w, h) in enumerate(faces):
+                face_id = face_ids[i]
+
+                if should_update or face_id not in self.prev_emotions:
+                    # Elegir una emoción dominante diferente a la anterior si es posible
+                    if face_id in self.prev_emotions:
+                        prev_dominant = max(self.prev_emotions[face_id].items(), key=lambda x: x[1])[0]
+                        other_emotions = [e for e in ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"] if e != prev_dominant]
+                        import random
+                        # 75% de probabilidad de cambiar a otra emoción
+                        if random.random() < 0.75:
+                            primary_emotion = random.choice(other_emotions)
+                        else:
+                            primary_emotion = prev_dominant
+                    else:
+                        # Primera emoción - elegir aleatoriamente
+                        import random
+                        primary_emotion = random.choice(["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"])
+
+                    # Generar todas las emociones con valores base aleatorios
+                    import random
+                    import numpy as np
+                    emociones = {
+                        "angry": random.uniform(0.05, 0.15),
+                        "disgust": random.uniform(0.05, 0.15),
+                        "fear": random.uniform(0.05, 0.15),
+                        "happy": random.uniform(0.05, 0.15),
+                        "sad": random.uniform(0.05, 0.15),
+                        "surprise": random.uniform(0.05, 0.15),
+                        "neutral": random.uniform(0.05, 0.15)
+                    }
+
+                    # Dar mayor peso a la emoción dominante
+                    emociones[primary_emotion] = random.uniform(0.4, 0.7)
+
+                    # Normalizar para que sumen 1
+                    suma = sum(emociones.values())
+                    for k in emociones:
+                        emociones[k] /= suma
+
+                    # Guardar para el próximo frame
+                    self.prev_emotions[face_id] = emociones
+                else:
+                    # Usar emociones previas con pequeñas variaciones para suavidad
+                    import random
+                    emociones = {}
+                    for emo, val in self.prev_emotions[face_id].items():
+                        # Añadir pequeña variación aleatoria (±5%)
+                        variation = random.uniform(-0.05, 0.05) * val
+                        emociones[emo] = max(0.01, min(0.99, val + variation))
+
+                    # Normalizar para que sumen 1
+                    suma = sum(emociones.values())
+                    for k in emociones:
+                        emociones[k] /= suma
+
+                    # Actualizar para el próximo frame
+                    self.prev_emotions[face_id] = emociones
+
+                result.append({"box": (x, y, w, h), "emotions": emociones})
+
+            # Limpiar caras que ya no están presentes
+            if len(faces) > 0:
+                self.prev_emotions = {k: v for k, v in self.prev_emotions.items() if k in face_ids}
+            self.prev_boxes = dict(zip(face_ids, (tuple(c) for c in faces)))
+
+            return result
+        except Exception as e:
+            logger.error(f"Error en detect_emotions fallback: {str(e)}")
+            return []
+
+
+class NucleoDeteccion:
+    """
+    Análisis de frames sin interfaz: detección de rostros (con seguimiento
+    opcional), clasificación de emociones, pistas e identificación. Lo usan
+    tanto el detector de la GUI como el análisis por lotes.
+
+    Tiene estado (seguidor y pistas): una instancia debe recibir los frames
+    de una misma secuencia en orden; reiniciar() empieza una secuencia nueva.
+    """
+
+    def __init__(self, data_path=None, intervalo_deteccion=None, reconocer=True):
+        self.data_path = data_path or DATA_DIR
+        self.intervalo_deteccion = INTERVALO_DETECCION if intervalo_deteccion is None else intervalo_deteccion
+        self.reconocer = reconocer
+
+        # Modelos compartidos del proceso: se cargan una sola vez
+        from modelos import obtener_face_recognition, obtener_detector_rostros
+        self.face_recognition = obtener_face_recognition(self.data_path) if reconocer else None
+        # Detección de rostros a resolución reducida (compartida por FER y el fallback)
+        self.detector_rostros = obtener_detector_rostros()
+        self.detector_fer = self._cargar_detector_fer()
+        logger.info("Detector FER inicializado")
+
+        # Identidad por pista: se codifica al aparecer y se reverifica cada cierto tiempo
+        self.reverificacion_identidad = REVERIFICACION_IDENTIDAD_S
+        self.reintento_identidad = REINTENTO_IDENTIDAD_S
+        self.max_identificaciones_frame = MAX_IDENTIFICACIONES_FRAME
+
+        self.embeddings = []
+        self.nombres = []
+        self.cache_embeddings = None
+        # Las altas se aplican de una en una (caché en disco y galería); lo comparten los clones
+        self.lock_altas = threading.Lock()
+        if reconocer:
+            self._cargar_rostros()
+        # Galería vectorizada para identificar al usuario más cercano
+        from galeria import GaleriaRostros
+        from indice_identidades import crear_indice
+        self.galeria = GaleriaRostros.desde_embeddings(
+            self.embeddings, self.nombres,
+            indice=crear_indice(TIPO_INDICE, total_fotos=len(self.embeddings))
+        )
+        self.reiniciar()
+
+    def clonar(self):
+        """
+        Núcleo para otra secuencia (otra cámara) que comparte modelos, galería
+        y caché de embeddings con este, pero con seguidor y pistas propios.
+        """
+        copia = copy.copy(self)
+        if isinstance(self.detector_fer, FERFallback):
+            # El fallback guarda estado por rostro
+            copia.detector_fer = FERFallback(self.detector_rostros)
+        copia.reiniciar()
+        return copia
+
+    def reiniciar(self):
+        """Empieza una secuencia nueva: seguidor, pistas y contadores desde cero"""
+        # Modo seguimiento: detección completa cada N frames, flujo óptico entre medias
+        self.seguidor = None
+        if self.intervalo_deteccion > 1:
+            self.seguidor = SeguidorRostros(self.detector_rostros, self.intervalo_deteccion)
+        # Pistas con ID persistente por rostro (emociones suavizadas e identidad propias)
+        self.pistas = GestorPistas(ventana=VENTANA_SUAVIZADO, modo_suavizado=SUAVIZADO, alfa=ALFA_SUAVIZADO)
+        self.identificaciones = 0
+
+    def _cargar_detector_fer(self):
+        """Obtiene el clasificador de emociones del registro de modelos, o el fallback"""
+        from modelos import obtener_detector_lote, obtener_fer
+        try:
+            # Preferir el clasificador por lotes: una inferencia para todos los rostros
+            if CLASIFICADOR == "lote":
+                detector = obtener_detector_lote()
+                if detector is not None:
+                    return detector
+            detector = obtener_fer()
+            if detector is not None:
+                return detector
+            logger.warning("FER no disponible, usando detector fallback")
+        except Exception as e:
+            logger.error(f"Error al cargar detector FER: {str(e)}")
+        return FERFallback(self.detector_rostros)
+
+    def _cargar_rostros(self):
+        base = os.path.join(self.data_path, "usuarios")
+        if not os.path.exists(base):
+            logger.warning(f"Directorio de usuarios no existe: {base}")
+            # Intentar con DATA_DIR como respaldo
+            base_alt = os.path.join(DATA_DIR, "usuarios")
+            if os.path.exists(base_alt) and base_alt != base:
+                logger.info(f"Usando directorio alternativo de usuarios: {base_alt}")
+                base = base_alt
+            else:
+                return
+        
+        # Reutilizar embeddings de la caché en disco; solo se codifican las fotos nuevas o modificadas
+        from cache_embeddings import CacheEmbeddings
+        from face_recognition_wrapper import FaceRecognitionFallback
+        self.cache_embeddings = cache = CacheEmbeddings(
+            base,
+            os.path.join(os.path.dirname(base), "cache_embeddings"),
+            self.face_recognition,
+            # Los encodings aleatorios del fallback no deben persistirse
+            persistir=not isinstance(self.face_recognition, FaceRecognitionFallback)
+        )
+        try:
+            matriz, nombres = cache.sincronizar()
+            self.embeddings = list(matriz)
+            self.nombres = nombres
+        except Exception as e:
+            logger.error(f"Error al sincronizar caché de embeddings: {str(e)}")
+        
+        logger.info(f"Rostros cargados: {len(self.embeddings)}")
+
+    def agregar_usuario(self, carpeta):
+        """Incorpora a la galería un usuario recién registrado sin recargar el resto"""
+        if self.cache_embeddings is None:
+            # Sin reconocimiento no hay galería que actualizar
+            return
+
+        def tarea():
+            with self.lock_altas:
+                self._agregar_usuario(carpeta)
+
+        threading.Thread(target=tarea, daemon=True).start()
+
+    def _agregar_usuario(self, carpeta):
+        """Sincroniza la caché y publica el usuario en la galería (con lock_altas tomado)"""
+        try:
+            nombre = os.path.basename(carpeta).replace("_", " ")
+            existia = nombre in self.galeria.nombres
+            # La caché solo codifica las fotos nuevas y queda persistida
+            matriz, nombres = self.cache_embeddings.sincronizar()
+            if existia:
+                # Se sobrescribieron sus fotos: reconstruir para descartar las anteriores
+                self.galeria.reconstruir(matriz, nombres)
+            else:
+                filas = [i for i, n in enumerate(nombres) if n == nombre]
+                self.galeria.agregar(nombre, matriz[filas])
+        except Exception as e:
+            logger.error(f"Error al agregar usuario {carpeta} a la galería: {str(e)}")
+
+    def detectar(self, frame, usar_hist=False):
+        """
+        Ecualiza (opcional) y localiza los rostros sobre una copia reducida del
+        frame. Devuelve (frame, cajas, detectado): el frame a clasificar, las
+        cajas en coordenadas del frame completo y si vienen de una detección
+        completa o del seguimiento.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if usar_hist:
+            gray = cv2.equalizeHist(gray)
+            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        if self.seguidor is not None:
+            cajas, detectado = self.seguidor.actualizar(frame, gray)
+        else:
+            cajas, detectado = self.detector_rostros.detectar(frame, gray), True
+        return frame, cajas, detectado
+
+    def clasificar(self, frame, cajas):
+        """Clasifica en una sola llamada las emociones de todos los rostros"""
+        try:
+            if len(cajas):
+                return self.detector_fer.detect_emotions(frame, face_rectangles=cajas)
+        except Exception as e:
+            logger.error(f"Error en detección de emociones: {str(e)}")
+        return []
+
+    def asociar(self, caras):
+        """Asigna cada cara a su pista; devuelve (pares (pista, cara), pista principal)"""
+        pares = self.pistas.actualizar(caras)
+        return pares, self.pistas.principal(pares)
+
+    def _pistas_a_identificar(self, pares, ahora):
+        """Pistas que hay que identificar en este frame: nuevas primero, luego las más antiguas"""
+        pendientes = []
+        for pista, _ in pares:
+            if pista.verificada_en is None:
+                prioridad = 0
+            elif pista.identidad is None and ahora - pista.verificada_en >= self.reintento_identidad:
+                prioridad = 1
+            elif pista.identidad is not None and ahora - pista.verificada_en >= self.reverificacion_identidad:
+                prioridad = 2
+            else:
+                continue
+            pendientes.append((prioridad, -1.0 if pista.verificada_en is None else pista.verificada_en, pista))
+        pendientes.sort(key=lambda p: (p[0], p[1]))
+        return [p for _, _, p in pendientes[:self.max_identificaciones_frame]]
+
+    def identificar(self, original, pares, ahora=None):
+        """
+        Codifica y busca en la galería las pistas nuevas o pendientes de
+        reverificar. `ahora` es el reloj de la secuencia (por defecto
+        time.time(); en vídeos grabados, el instante del frame).
+        """
+        if not self.reconocer:
+            return
+        ahora = time.time() if ahora is None else ahora
+        pendientes = self._pistas_a_identificar(pares, ahora)
+        if not pendientes:
+            return
+        try:
+            ubicaciones = []
+            for pista in pendientes:
+                x, y, w, h = [int(v) for v in pista.caja]
+                ubicaciones.append((y, x+w, y+h, x))
+            # Una sola llamada codifica todas las pistas pendientes del frame
+            frame_rgb = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
+            encs = self.face_recognition.face_encodings(frame_rgb, known_face_locations=ubicaciones)
+            for pista, enc in zip(pendientes, encs):
+                resultado = self.galeria.buscar(enc)
+                if pista.registrar_identidad(resultado["nombre"], resultado["distancia"], ahora):
+                    logger.info(f"Pista #{pista.id} identificada como {pista.identidad or 'Desconocido'}")
+            # Las pistas sin encoding también esperan al siguiente intento
+            for pista in pendientes[len(encs):]:
+                pista.verificada_en = ahora
+            self.identificaciones += len(encs)
+        except Exception as e:
+            logger.error(f"Error en reconocimiento facial: {str(e)}")
+            for pista in pendientes:
+                pista.verificada_en = ahora
+
+    def procesar(self, original, usar_hist=False, momento=None):
+        """Análisis completo de un frame; devuelve cajas, caras, pares (pista, cara) y la pista principal"""
+        frame, cajas, detectado = self.detectar(original, usar_hist)
+        caras = self.clasificar(frame, cajas)
+        pares, principal = self.asociar(caras)
+        self.identificar(original, pares, momento)
+        return {
+            "frame": frame,
+            "cajas": cajas,
+            "detectado": detectado,
+            "caras": caras,
+            "pistas": pares,
+            "principal": principal
+        }
@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("pipeline")
+
+POLITICAS = ("bloquear", "descartar_antiguo", "descartar_nuevo")
+
+
+class Etapa:
+    """
+    Etapa de un pipeline: una cola de entrada acotada atendida por N hilos.
+
+    La función recibe un paquete y devuelve el paquete para la siguiente
+    etapa (o None para no propagarlo). La política de contrapresión decide
+    qué pasa cuando la cola está llena:
+      - "bloquear": el productor espera a que haya hueco.
+      - "descartar_antiguo": se tira el paquete más viejo de la cola.
+      - "descartar_nuevo": se tira el paquete entrante.
+    """
+
+    def __init__(self, nombre, funcion, trabajadores=1, capacidad=2, politica="bloquear"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de contrapresión desconocida: {politica}")
+        self.nombre = nombre
+        self.funcion = funcion
+        self.trabajadores = max(1, int(trabajadores))
+        self.politica = politica
+        self.cola = queue.Queue(maxsize=max(1, int(capacidad)))
+        self.siguiente = None
+        self.running = False
+        self.hilos = []
+
+        # Estadísticas (protegidas por lock)
+        self.lock = threading.Lock()
+        self.procesados = 0
+        self.descartados = 0
+        self.errores = 0
+        self.tiempo_ocupado = 0.0
+        self._ultimo_reporte = (time.time(), 0, 0.0)
+
+    def iniciar(self):
+        self.running = True
+        self.hilos = [
+            threading.Thread(target=self._trabajador, name=f"{self.nombre}-{i}", daemon=True)
+            for i in range(self.trabajadores)
+        ]
+        for h in self.hilos:
+            h.start()
+
+    def detener(self):
+        self.running = False
+        for h in self.hilos:
+            if h is not threading.current_thread():
+                h.join(timeout=1.0)
+        self.hilos = []
+        # Vaciar lo que quedara pendiente
+        try:
+            while True:
+                self.cola.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _descartar(self):
+        with self.lock:
+            self.descartados += 1
+
+    def poner(self, paquete):
+        """Encola un paquete aplicando la política de contrapresión; devuelve si entró"""
+        if self.politica == "bloquear":
+            while self.running:
+                try:
+                    self.cola.put(paquete, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        if self.politica == "descartar_nuevo":
+            try:
+                self.cola.put_nowait(paquete)
+                return True
+            except queue.Full:
+                self._descartar()
+                return False
+
+        # descartar_antiguo: hacer sitio sacando el paquete más viejo
+        while True:
+            try:
+                self.cola.put_nowait(paquete)
+                return True
+            except queue.Full:
+                try:
+                    self.cola.get_nowait()
+                    self._descartar()
+                except queue.Empty:
+                    pass
+
+    def _trabajador(self):
+        while self.running:
+            try:
+                paquete = self.cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            inicio = time.perf_counter()
+            try:
+                resultado = self.funcion(paquete)
+            except Exception as e:
+                logger.error(f"Error en etapa {self.nombre}: {str(e)}")
+                with self.lock:
+                    self.errores += 1
+                continue
+            with self.lock:
+                self.procesados += 1
+                self.tiempo_ocupado += time.perf_counter() - inicio
+            if resultado is not None and self.siguiente is not None:
+                self.siguiente.poner(resultado)
+
+    def estadisticas(self):
+        """Rendimiento (paquetes/s) y latencia media desde la última consulta"""
+        ahora = time.time()
+        with self.lock:
+            t0, procesados0, ocupado0 = self._ultimo_reporte
+            procesados, ocupado = self.procesados, self.tiempo_ocupado
+            self._ultimo_reporte = (ahora, procesados, ocupado)
+            descartados, errores = self.descartados, self.errores
+        n = procesados - procesados0
+        return {
+            "etapa": self.nombre,
+            "trabajadores": self.trabajadores,
+            "rendimiento": n / max(ahora - t0, 1e-6),
+            "latencia_ms": (ocupado - ocupado0) / n * 1000.0 if n else 0.0,
+            "en_cola": self.cola.qsize(),
+            "descartados": descartados,
+            "errores": errores
+        }
+
+
+class Pipeline:
+    """Encadena etapas y reporta periódicamente el rendimiento de cada una"""
+
+    def __init__(self, etapas, intervalo_reporte=5.0):
+        self.etapas = list(etapas)
+        for actual, siguiente in zip(self.etapas, self.etapas[1:]):
+            actual.siguiente = siguiente
+        self.intervalo_reporte = intervalo_reporte
+        self.ultimo_reporte = []
+        self.running = False
+        self._monitor = None
+
+    def iniciar(self):
+        self.running = True
+        for etapa in self.etapas:
+            etapa.iniciar()
+        if self.intervalo_reporte:
+            self._monitor = threading.Thread(target=self._reportar_periodicamente, daemon=True)
+            self._monitor.start()
+
+    def detener(self):
+        self.running = False
+        # Marcar primero todas las etapas para que ningún productor quede bloqueado
+        for etapa in self.etapas:
+            etapa.running = False
+        for etapa in self.etapas:
+            etapa.detener()
+
+    def poner(self, paquete):
+        """Entrega un paquete a la primera etapa"""
+        return self.etapas[0].poner(paquete)
+
+    def reportar(self):
+        """Calcula y registra en el log las estadísticas de todas las etapas"""
+        self.ultimo_reporte = [etapa.estadisticas() for etapa in self.etapas]
+        resumen = " | ".join(
+            f"{s['etapa']} x{s['trabajadores']}: {s['rendimiento']:.1f}/s, "
+            f"{s['latencia_ms']:.1f} ms, cola {s['en_cola']}, descartados {s['descartados']}"
+            for s in self.ultimo_reporte
+        )
+        logger.info(f"Pipeline: {resumen}")
+        return self.ultimo_reporte
+
+    def _reportar_periodicamente(self):
+        while self.running:
+            time.sleep(self.intervalo_reporte)
+            if self.running:
+                self.reportar()
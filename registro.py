@@ -2,14 +2,15 @@ import os
 import cv2
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
+from render_tk import PuenteRender, RenderizadorVideo
 import threading
 import re
 import time
 import logging
 
 # Importar config.py
-from config import DATA_DIR, CASCADE_FILE
+from config import DATA_DIR, CASCADE_FILE, FUENTE_CAMARA
+from captura import interpretar_fuente
 
 # Configurar logging
 logging.basicConfig(
@@ -23,7 +24,7 @@ logging.basicConfig(
 logger = logging.getLogger("registro")
 
 class RegistroUsuario:
-    def __init__(self, parent, data_path, volver_callback):
+    def __init__(self, parent, data_path, volver_callback, on_usuario_registrado=None):
         self.parent = parent
         self.data_path = data_path
         # Verificar si la ruta data_path es consistente con DATA_DIR
@@ -31,11 +32,13 @@ class RegistroUsuario:
             logger.warning(f"Inconsistencia de rutas: data_path={data_path}, DATA_DIR={DATA_DIR}")
         
         self.volver_callback = volver_callback
+        # Se invoca con la carpeta del usuario tras un registro exitoso
+        self.on_usuario_registrado = on_usuario_registrado
 
-        # Importar face_recognition usando nuestro wrapper
+        # face_recognition compartido con el detector (registro de modelos)
         try:
-            from face_recognition_wrapper import get_face_recognition
-            self.face_recognition = get_face_recognition(self.data_path)
+            from modelos import obtener_face_recognition
+            self.face_recognition = obtener_face_recognition(self.data_path)
             logger.info("Face recognition inicializado correctamente")
         except Exception as e:
             logger.error(f"Error al cargar face_recognition: {str(e)}")
@@ -49,6 +52,9 @@ class RegistroUsuario:
         self.video_label = None
         self.thread = None
         self.camera_active = False  # Flag para controlar si la cámara está activa
+        # El hilo de video publica; el hilo de Tk muestra con after()
+        self.render = None
+        self.renderizador = None
 
     def mostrar(self):
         if self.frame and self.frame.winfo_exists():
@@ -70,7 +76,7 @@ class RegistroUsuario:
             # Intentar obtener la cámara con varios intentos
             for attempt in range(3):  # Intentar 3 veces
                 try:
-                    self.cap = cv2.VideoCapture(0)
+                    self.cap = cv2.VideoCapture(interpretar_fuente(FUENTE_CAMARA))
                     if self.cap.isOpened():
                         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
                         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
@@ -147,6 +153,14 @@ class RegistroUsuario:
         self.cam_status = tk.StringVar(value="Estado: Iniciando cámara...")
         tk.Label(self.frame, textvariable=self.cam_status, fg="blue", bg="white").pack(pady=5)
 
+        if self.render:
+            self.render.detener()
+        self.render = PuenteRender(self.frame)
+        self.renderizador = RenderizadorVideo()
+        self.render.registrar("video", self.renderizador.manejador(self.video_label))
+        self.render.registrar("estado", self.cam_status.set)
+        self.render.iniciar()
+
     def _reiniciar_camara(self):
         """Función para reiniciar la cámara si hay problemas"""
         try:
@@ -165,7 +179,7 @@ class RegistroUsuario:
             
             # Reiniciar la cámara
             self.stop_flag = False
-            self.cap = cv2.VideoCapture(0)
+            self.cap = cv2.VideoCapture(interpretar_fuente(FUENTE_CAMARA))
             if self.cap.isOpened():
                 self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
                 self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
@@ -196,7 +210,7 @@ class RegistroUsuario:
                         logger.warning(f"Error leyendo frame de cámara ({error_count}/{max_errors})")
                         if error_count >= max_errors:
                             logger.error("Demasiados errores consecutivos de cámara")
-                            self.cam_status.set("Estado: Error - Cámara no disponible")
+                            self.render.publicar("estado", "Estado: Error - Cámara no disponible")
                             # No cerrar automáticamente - dejar que el usuario use el botón de reinicio
                             break
                         time.sleep(0.1)
@@ -208,15 +222,9 @@ class RegistroUsuario:
                     
                     # Actualizar mensaje de estado periódicamente
                     if frame_count % 30 == 0:  # Aproximadamente cada segundo
-                        self.cam_status.set("Estado: Cámara funcionando correctamente")
+                        self.render.publicar("estado", "Estado: Cámara funcionando correctamente")
                     
-                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    pil = Image.fromarray(rgb).resize((640, 480))
-                    tk_img = ImageTk.PhotoImage(pil)
-
-                    if self.video_label and self.video_label.winfo_exists():
-                        self.video_label.imgtk = tk_img
-                        self.video_label.configure(image=tk_img)
+                    self.render.publicar("video", self.renderizador.preparar(frame, (640, 480)))
                     
                     time.sleep(0.03)  # ~30 FPS
                 except Exception as e:
@@ -224,7 +232,7 @@ class RegistroUsuario:
                     logger.error(f"Error en loop de video: {str(e)}")
                     if error_count >= max_errors:
                         logger.error("Demasiados errores en loop de video")
-                        self.cam_status.set(f"Estado: Error - {str(e)}")
+                        self.render.publicar("estado", f"Estado: Error - {str(e)}")
                         break
                     time.sleep(0.1)
             
@@ -303,11 +311,7 @@ class RegistroUsuario:
 
                 # Actualizar la vista previa
                 rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil = Image.fromarray(rgb).resize((640, 480))
-                tk_img = ImageTk.PhotoImage(pil)
-                if self.video_label and self.video_label.winfo_exists():
-                    self.video_label.imgtk = tk_img
-                    self.video_label.configure(image=tk_img)
+                self.render.publicar("video", self.renderizador.preparar(frame, (640, 480)))
                 self.frame.update()  # Actualizar la interfaz
                 
                 try:
@@ -344,12 +348,7 @@ class RegistroUsuario:
                                 cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
                         
                         # Mostrar frame con rectángulo
-                        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        pil = Image.fromarray(rgb).resize((640, 480))
-                        tk_img = ImageTk.PhotoImage(pil)
-                        if self.video_label and self.video_label.winfo_exists():
-                            self.video_label.imgtk = tk_img
-                            self.video_label.configure(image=tk_img)
+                        self.render.publicar("video", self.renderizador.preparar(frame, (640, 480)))
                         self.frame.update()
                         
                         time.sleep(0.8)  # Esperar más tiempo entre fotos
@@ -365,6 +364,11 @@ class RegistroUsuario:
                 self.cam_status.set("Estado: Usuario registrado correctamente")
                 messagebox.showinfo("Registro exitoso", f"Usuario '{nombre}' registrado correctamente con {fotos_guardadas} fotos.")
                 logger.info(f"Usuario '{nombre}' registrado exitosamente con {fotos_guardadas} fotos")
+                if self.on_usuario_registrado:
+                    try:
+                        self.on_usuario_registrado(carpeta)
+                    except Exception as e:
+                        logger.error(f"Error al notificar registro de usuario: {str(e)}")
                 self._volver()
             else:
                 self.cam_status.set("Estado: No se detectó el rostro claramente")
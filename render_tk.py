@@ -0,0 +1,225 @@
+import threading
+import logging
+from collections import deque
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("render_tk")
+
+# Ritmo al que el hilo de Tk recoge lo publicado (~60 Hz)
+INTERVALO_RENDER_MS = 16
+
+
+class PuenteRender:
+    """
+    Puente entre los hilos de trabajo y el hilo de Tk. Tkinter no admite
+    llamadas desde otros hilos: los trabajadores solo publican valores
+    listos para mostrar (imágenes PIL, textos) y el bucle de Tk los recoge
+    con after() y aplica el manejador de cada canal.
+
+    Cada canal es un buzón de una sola posición: si llega un valor nuevo
+    antes de mostrarse el anterior, el anterior se descarta.
+    """
+
+    def __init__(self, widget, intervalo_ms=INTERVALO_RENDER_MS):
+        self.widget = widget
+        self.intervalo_ms = intervalo_ms
+        self.lock = threading.Lock()
+        self.buzon = {}
+        self.manejadores = {}
+        self.activo = False
+
+        self.publicados = 0
+        self.mostrados = 0
+        self.descartados = 0
+
+    def registrar(self, canal, manejador):
+        """Asocia a un canal la función (ejecutada en el hilo de Tk) que muestra sus valores"""
+        self.manejadores[canal] = manejador
+        return self
+
+    def publicar(self, canal, valor):
+        """Deja un valor en el buzón del canal; se puede llamar desde cualquier hilo"""
+        with self.lock:
+            if canal in self.buzon:
+                self.descartados += 1
+            self.buzon[canal] = valor
+            self.publicados += 1
+
+    def iniciar(self):
+        if not self.activo:
+            self.activo = True
+            self.widget.after(self.intervalo_ms, self._drenar)
+
+    def detener(self):
+        self.activo = False
+
+    def _drenar(self):
+        if not self.activo:
+            return
+        try:
+            if not self.widget.winfo_exists():
+                self.activo = False
+                return
+        except Exception:
+            self.activo = False
+            return
+        with self.lock:
+            pendientes, self.buzon = self.buzon, {}
+        for canal, valor in pendientes.items():
+            try:
+                self.manejadores[canal](valor)
+                self.mostrados += 1
+            except Exception as e:
+                logger.error(f"Error mostrando canal {canal}: {str(e)}")
+        self.widget.after(self.intervalo_ms, self._drenar)
+
+    def resumen(self):
+        with self.lock:
+            return f"{self.publicados} publicados, {self.mostrados} mostrados, {self.descartados} descartados"
+
+
+def manejador_imagen(label):
+    """Manejador que muestra una imagen PIL en un Label (None lo vacía)"""
+    def mostrar(imagen):
+        if not label.winfo_exists():
+            return
+        if imagen is None:
+            label.configure(image="")
+            label.imgtk = None
+            return
+        tk_img = ImageTk.PhotoImage(imagen)
+        label.imgtk = tk_img
+        label.configure(image=tk_img)
+    return mostrar
+
+
+def manejador_texto(label):
+    """Manejador que cambia el texto (y opcionalmente el color) de un Label"""
+    def mostrar(valor):
+        if not label.winfo_exists():
+            return
+        if isinstance(valor, tuple):
+            texto, color = valor
+            label.config(text=texto, fg=color)
+        else:
+            label.config(text=valor)
+    return mostrar
+
+
+class TamanoWidget:
+    """
+    Tamaño de un widget leído de los eventos <Configure>, para que los
+    hilos de trabajo no llamen a winfo_width()/winfo_height().
+    """
+
+    def __init__(self, widget, ancho=780, alto=440):
+        self.ancho = ancho
+        self.alto = alto
+        widget.bind("<Configure>", self._configurar, add="+")
+
+    def _configurar(self, evento):
+        if evento.width > 1 and evento.height > 1:
+            self.ancho, self.alto = evento.width, evento.height
+
+    def actual(self):
+        return self.ancho, self.alto
+
+
+class RenderizadorVideo:
+    """
+    Prepara frames BGR para mostrarlos en un Label con el menor coste posible:
+    una sola conversión a RGB y un cv2.resize (INTER_AREA al reducir,
+    INTER_LINEAR al ampliar) sobre buffers reservados de antemano, y un
+    único PhotoImage que se actualiza con paste(). El tamaño de destino solo
+    se recalcula cuando cambia el del frame o el del Label.
+
+    preparar() corre en el hilo de trabajo y devuelve el valor a publicar;
+    manejador() da la función que lo muestra en el hilo de Tk. Los buffers
+    rotan sin reutilizar el que se está pegando ni los dos últimos
+    publicados (el del buzón y el que Tk pudo acabar de recoger).
+    """
+
+    def __init__(self, buffers=4):
+        self.lock = threading.Lock()
+        self.num_buffers = buffers
+        self.buffers_bgr = []
+        self.buffers_rgb = []
+        self.siguiente = 0
+        self.publicados = deque(maxlen=2)
+        self.mostrando = None
+        self.clave = None            # (tamaño del frame, tamaño del Label)
+        self.destino = None          # (ancho, alto) del frame mostrado
+        self.interpolacion = cv2.INTER_AREA
+        self.foto = None
+        self.tamano_foto = None
+
+    def _recalcular(self, ancho_frame, alto_frame, ancho, alto):
+        """Tamaño que cabe en el Label conservando la proporción, y buffers para él"""
+        escala = min(ancho / ancho_frame, alto / alto_frame)
+        destino = (max(1, int(round(ancho_frame * escala))), max(1, int(round(alto_frame * escala))))
+        self.interpolacion = cv2.INTER_AREA if escala < 1.0 else cv2.INTER_LINEAR
+        self.destino = destino
+        self.buffers_bgr = [np.empty((destino[1], destino[0], 3), dtype=np.uint8)
+                            for _ in range(self.num_buffers)]
+        self.buffers_rgb = [np.empty_like(b) for b in self.buffers_bgr]
+        self.publicados.clear()
+        self.mostrando = None
+
+    def preparar(self, frame, tamano):
+        """Redimensiona y convierte el frame en un buffer libre; devuelve el valor a publicar"""
+        alto_frame, ancho_frame = frame.shape[:2]
+        clave = ((ancho_frame, alto_frame), tuple(tamano))
+        with self.lock:
+            if clave != self.clave:
+                self.clave = clave
+                self._recalcular(ancho_frame, alto_frame, *tamano)
+            ocupados = set(self.publicados) | {self.mostrando}
+            indice = next(i % self.num_buffers for i in range(self.siguiente, self.siguiente + self.num_buffers)
+                          if i % self.num_buffers not in ocupados)
+            self.siguiente = (indice + 1) % self.num_buffers
+            self.publicados.append(indice)
+            bgr, rgb, destino = self.buffers_bgr[indice], self.buffers_rgb[indice], self.destino
+            interpolacion = self.interpolacion
+        if destino == (ancho_frame, alto_frame):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        else:
+            cv2.resize(frame, destino, dst=bgr, interpolation=interpolacion)
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+        return indice, rgb
+
+    def manejador(self, label):
+        """Manejador para PuenteRender que pega el buffer en el PhotoImage del Label"""
+        def mostrar(valor):
+            if not label.winfo_exists():
+                return
+            if valor is None:
+                label.configure(image="")
+                label.imgtk = self.foto = self.tamano_foto = None
+                return
+            indice, rgb = valor
+            with self.lock:
+                self.mostrando = indice
+            try:
+                tamano = (rgb.shape[1], rgb.shape[0])
+                if self.foto is None or self.tamano_foto != tamano:
+                    # Solo se crea un PhotoImage nuevo cuando cambia el tamaño
+                    self.foto = ImageTk.PhotoImage("RGB", tamano)
+                    self.tamano_foto = tamano
+                    label.imgtk = self.foto
+                    label.configure(image=self.foto)
+                self.foto.paste(Image.fromarray(rgb))
+            finally:
+                with self.lock:
+                    self.mostrando = None
+        return mostrar
@@ -0,0 +1,265 @@
+import logging
+import cv2
+import numpy as np
+
+from suavizado import EMOCIONES, SuavizadorEmociones
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("detector_app.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("seguimiento")
+
+# Parámetros de Lucas-Kanade piramidal
+PARAMS_LK = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class SeguidorRostros:
+    """
+    Detecta rostros cada `intervalo_deteccion` frames y, entre detecciones,
+    propaga las cajas con flujo óptico Lucas-Kanade sobre puntos de interés
+    del interior de cada rostro. Si la confianza del seguimiento (fracción de
+    puntos que superan la verificación ida y vuelta) cae por debajo de
+    `confianza_minima`, se fuerza una detección completa en ese frame.
+
+    Es un componente con estado: debe recibir los frames en orden.
+    """
+
+    def __init__(self, detector_rostros, intervalo_deteccion=5, confianza_minima=0.5,
+                 max_puntos=30, min_puntos=4, error_ida_vuelta=1.0):
+        self.detector_rostros = detector_rostros
+        self.intervalo_deteccion = max(1, int(intervalo_deteccion))
+        self.confianza_minima = confianza_minima
+        self.max_puntos = max_puntos
+        self.min_puntos = min_puntos
+        self.error_ida_vuelta = error_ida_vuelta
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.gray_prev = None
+        self.cajas = np.zeros((0, 4), dtype=np.int32)
+        self.puntos = []            # puntos (n, 1, 2) float32 por caja
+        self.confianzas = np.zeros(0)
+        self.desde_deteccion = 0
+        self.detecciones = 0
+        self.propagaciones = 0
+
+    def _puntos_en_caja(self, gray, caja):
+        """Puntos de interés del 60% central de la caja (evita el fondo)"""
+        x, y, w, h = [int(v) for v in caja]
+        mascara = np.zeros(gray.shape[:2], dtype=np.uint8)
+        mx, my = int(w * 0.2), int(h * 0.2)
+        mascara[y + my:y + h - my, x + mx:x + w - mx] = 255
+        puntos = cv2.goodFeaturesToTrack(gray, self.max_puntos, 0.01, 3, mask=mascara)
+        if puntos is None:
+            return np.zeros((0, 1, 2), dtype=np.float32)
+        return puntos.astype(np.float32)
+
+    def _detectar(self, frame, gray):
+        self.cajas = self.detector_rostros.detectar(frame, gray)
+        self.puntos = [self._puntos_en_caja(gray, c) for c in self.cajas]
+        self.confianzas = np.ones(len(self.cajas))
+        self.desde_deteccion = 0
+        self.detecciones += 1
+
+    def _propagar(self, gray):
+        """Mueve cada caja según la mediana del desplazamiento y escala de sus puntos"""
+        conteos = [len(p) for p in self.puntos]
+        if sum(conteos) == 0:
+            return False
+        p0 = np.concatenate(self.puntos)
+        # Todas las cajas en una sola llamada, con verificación ida y vuelta
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(self.gray_prev, gray, p0, None, **PARAMS_LK)
+        p0r, st_r, _ = cv2.calcOpticalFlowPyrLK(gray, self.gray_prev, p1, None, **PARAMS_LK)
+        buenos = (st.ravel() == 1) & (st_r.ravel() == 1) & \
+            (np.abs(p0 - p0r).reshape(-1, 2).max(axis=1) < self.error_ida_vuelta)
+
+        alto, ancho = gray.shape[:2]
+        cajas, puntos, confianzas = [], [], []
+        inicio = 0
+        for caja, n in zip(self.cajas, conteos):
+            sel = slice(inicio, inicio + n)
+            inicio += n
+            ok = buenos[sel]
+            confianza = ok.mean() if n else 0.0
+            if ok.sum() < self.min_puntos:
+                return False
+            a = p0[sel][ok].reshape(-1, 2)
+            b = p1[sel][ok].reshape(-1, 2)
+            dx, dy = np.median(b - a, axis=0)
+            # Escala: cociente mediano de distancias al centroide
+            da = np.linalg.norm(a - a.mean(axis=0), axis=1)
+            db = np.linalg.norm(b - b.mean(axis=0), axis=1)
+            validas = da > 1e-3
+            escala = float(np.median(db[validas] / da[validas])) if validas.any() else 1.0
+
+            x, y, w, h = caja.astype(np.float64)
+            cx, cy = x + w / 2.0 + dx, y + h / 2.0 + dy
+            w, h = w * escala, h * escala
+            x = min(max(cx - w / 2.0, 0), ancho - 1)
+            y = min(max(cy - h / 2.0, 0), alto - 1)
+            cajas.append([x, y, min(w, ancho - x), min(h, alto - y)])
+            puntos.append(b.reshape(-1, 1, 2).astype(np.float32))
+            confianzas.append(confianza)
+
+        self.cajas = np.rint(np.array(cajas)).astype(np.int32).reshape(-1, 4)
+        self.puntos = puntos
+        self.confianzas = np.array(confianzas)
+        self.propagaciones += 1
+        return True
+
+    def actualizar(self, frame, gray):
+        """
+        Devuelve (cajas, detectado): las cajas del frame actual y si provienen
+        de una detección completa (True) o del seguimiento (False).
+        """
+        detectado = False
+        if self.gray_prev is None or self.desde_deteccion + 1 >= self.intervalo_deteccion:
+            self._detectar(frame, gray)
+            detectado = True
+        else:
+            self.desde_deteccion += 1
+            if len(self.cajas) and (not self._propagar(gray) or self.confianzas.min() < self.confianza_minima):
+                self._detectar(frame, gray)
+                detectado = True
+        self.gray_prev = gray
+        return self.cajas.copy(), detectado
+
+
+def matriz_iou(a, b):
+    """IoU entre cada caja (x, y, w, h) de `a` y cada caja de `b`"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    iw = np.clip(np.minimum(ax2[:, None], bx2) - np.maximum(a[:, None, 0], b[:, 0]), 0, None)
+    ih = np.clip(np.minimum(ay2[:, None], by2) - np.maximum(a[:, None, 1], b[:, 1]), 0, None)
+    inter = iw * ih
+    union = (a[:, 2] * a[:, 3])[:, None] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def asociar_cajas(previas, nuevas, umbral_iou=0.3):
+    """
+    Empareja de forma voraz (mayor IoU primero) cada caja nueva con una
+    previa. Devuelve una lista con el índice previo de cada caja nueva o -1.
+    """
+    iou = matriz_iou(previas, nuevas)
+    asignacion = [-1] * iou.shape[1]
+    if iou.size == 0:
+        return asignacion
+    usadas = set()
+    for plano in np.argsort(-iou, axis=None):
+        i, j = np.unravel_index(plano, iou.shape)
+        if iou[i, j] < umbral_iou:
+            break
+        if i in usadas or asignacion[j] != -1:
+            continue
+        asignacion[j] = int(i)
+        usadas.add(i)
+    return asignacion
+
+
+class Pista:
+    """Un rostro seguido entre frames con su historial de emociones e identidad"""
+
+    def __init__(self, id_pista, caja, ventana=10, modo_suavizado="media", alfa=0.3):
+        self.id = id_pista
+        self.caja = caja
+        self.emociones = {}
+        self.suavizado = SuavizadorEmociones(ventana, modo_suavizado, alfa)
+        self.identidad = None
+        self.distancia_identidad = None
+        self.verificada_en = None    # momento del último intento de identificación (None = nunca)
+        self.fallos_identidad = 0    # reverificaciones seguidas sin coincidencia
+        self.frames_sin_ver = 0
+        self.frames_vista = 0
+
+    @property
+    def area(self):
+        return int(self.caja[2]) * int(self.caja[3])
+
+    def registrar_emociones(self, emociones):
+        self.emociones = emociones
+        self.suavizado.agregar(emociones)
+
+    def registrar_identidad(self, nombre, distancia, momento, fallos_para_olvidar=2):
+        """
+        Guarda el resultado de una identificación. Un nombre distinto sustituye
+        al anterior; la falta de coincidencia solo borra una identidad ya
+        conocida tras `fallos_para_olvidar` intentos seguidos (pose, desenfoque).
+        Devuelve True si la identidad cambió.
+        """
+        self.verificada_en = momento
+        anterior = self.identidad
+        if nombre is None and anterior is not None:
+            self.fallos_identidad += 1
+            if self.fallos_identidad < fallos_para_olvidar:
+                return False
+        else:
+            self.fallos_identidad = 0
+        self.identidad = nombre
+        self.distancia_identidad = distancia
+        return nombre != anterior
+
+
+class GestorPistas:
+    """
+    Asigna IDs persistentes a los rostros de cada frame por solapamiento (IoU)
+    con las pistas del frame anterior. Las pistas no vistas durante más de
+    `max_sin_ver` frames se eliminan.
+    """
+
+    def __init__(self, umbral_iou=0.3, max_sin_ver=10, ventana=10, modo_suavizado="media", alfa=0.3):
+        self.umbral_iou = umbral_iou
+        self.max_sin_ver = max_sin_ver
+        self.ventana = ventana
+        self.modo_suavizado = modo_suavizado
+        self.alfa = alfa
+        self.pistas = []
+        self.siguiente_id = 1
+
+    def actualizar(self, caras):
+        """
+        Recibe las caras del frame (dicts con "box" y "emotions") y devuelve la
+        lista de (pista, cara) correspondiente, en el mismo orden que `caras`.
+        """
+        cajas = [c["box"] for c in caras]
+        asignacion = asociar_cajas([p.caja for p in self.pistas], cajas, self.umbral_iou)
+
+        resultado = []
+        vistas = set()
+        for cara, previa in zip(caras, asignacion):
+            if previa >= 0:
+                pista = self.pistas[previa]
+            else:
+                pista = Pista(self.siguiente_id, cara["box"], self.ventana, self.modo_suavizado, self.alfa)
+                self.siguiente_id += 1
+                self.pistas.append(pista)
+            pista.caja = cara["box"]
+            pista.frames_sin_ver = 0
+            pista.frames_vista += 1
+            if cara.get("emotions"):
+                pista.registrar_emociones(cara["emotions"])
+            vistas.add(pista.id)
+            resultado.append((pista, cara))
+
+        for pista in self.pistas:
+            if pista.id not in vistas:
+                pista.frames_sin_ver += 1
+        self.pistas = [p for p in self.pistas if p.frames_sin_ver <= self.max_sin_ver]
+        return resultado
+
+    def principal(self, pares):
+        """Pista del rostro más grande del frame (la que se muestra en el panel)"""
+        if not pares:
+            return None
+        return max(pares, key=lambda par: par[0].area)[0]
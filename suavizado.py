@@ -0,0 +1,101 @@
+import numpy as np
+
+EMOCIONES = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+MODOS = ("media", "ema", "mayoria")
+
+
+class SuavizadorEmociones:
+    """
+    Suavizado de las probabilidades de emoción de un rostro en tiempo constante.
+
+    Modos:
+      - "media": media de las últimas `ventana` muestras. Un buffer circular
+        de NumPy (emociones x ventana) y una suma acumulada evitan recorrer
+        el historial en cada frame.
+      - "ema": media móvil exponencial con factor `alfa`.
+      - "mayoria": fracción de votos de la emoción dominante de cada una de
+        las últimas `ventana` muestras (sustituye a Counter.most_common).
+    """
+
+    def __init__(self, ventana=10, modo="media", alfa=0.3, etiquetas=EMOCIONES):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de suavizado desconocido: {modo}")
+        self.ventana = max(1, int(ventana))
+        self.modo = modo
+        self.alfa = alfa
+        self.etiquetas = list(etiquetas)
+        self.indices = {e: i for i, e in enumerate(self.etiquetas)}
+        n = len(self.etiquetas)
+        self.buffer = np.zeros((n, self.ventana), dtype=np.float64)
+        self.sumas = np.zeros(n, dtype=np.float64)
+        self.ema = np.zeros(n, dtype=np.float64)
+        self.posicion = 0
+        self.n = 0
+        self.actualizaciones = 0
+
+    def reiniciar(self):
+        self.buffer.fill(0.0)
+        self.sumas.fill(0.0)
+        self.ema.fill(0.0)
+        self.posicion = 0
+        self.n = 0
+        self.actualizaciones = 0
+
+    def __len__(self):
+        return self.n
+
+    def _vector(self, emociones):
+        if isinstance(emociones, dict):
+            vector = np.zeros(len(self.etiquetas), dtype=np.float64)
+            for e, v in emociones.items():
+                i = self.indices.get(e)
+                if i is not None:
+                    vector[i] = v
+            return vector
+        return np.asarray(emociones, dtype=np.float64)
+
+    def agregar(self, emociones):
+        """Añade una muestra (dict etiqueta -> probabilidad o vector en el orden de `etiquetas`)"""
+        vector = self._vector(emociones)
+        self.actualizaciones += 1
+        if self.modo == "ema":
+            self.ema = vector.copy() if self.n == 0 else self.alfa * vector + (1.0 - self.alfa) * self.ema
+            self.n = min(self.n + 1, self.ventana)
+            return
+
+        if self.modo == "mayoria":
+            # Los votos se guardan como un vector one-hot para reutilizar la suma acumulada
+            voto = int(vector.argmax())
+            vector = np.zeros_like(vector)
+            vector[voto] = 1.0
+
+        columna = self.buffer[:, self.posicion]
+        if self.n == self.ventana:
+            self.sumas -= columna
+        else:
+            self.n += 1
+        columna[:] = vector
+        self.sumas += vector
+        self.posicion = (self.posicion + 1) % self.ventana
+        if self.actualizaciones % (self.ventana * 1000) == 0:
+            # Recalcular de vez en cuando para que no se acumule error de redondeo
+            self.sumas = self.buffer.sum(axis=1)
+
+    def valores(self):
+        """Vector suavizado en el orden de `etiquetas` (ceros si no hay muestras)"""
+        if self.n == 0:
+            return np.zeros(len(self.etiquetas), dtype=np.float64)
+        if self.modo == "ema":
+            return self.ema.copy()
+        return self.sumas / self.n
+
+    def como_dict(self):
+        return dict(zip(self.etiquetas, self.valores().tolist()))
+
+    def dominante(self):
+        """(etiqueta, valor) de la emoción suavizada más alta, o (None, 0.0) sin muestras"""
+        if self.n == 0:
+            return None, 0.0
+        valores = self.valores()
+        i = int(valores.argmax())
+        return self.etiquetas[i], float(valores[i])
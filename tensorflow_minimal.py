@@ -112,6 +112,15 @@ class TensorFlowFallback:
         
         return DummyModel()
 
+def get_emotion_backend(tipo=None, variante=None):
+    """
+    Backend de inferencia de emociones con las mismas 7 probabilidades que FER:
+    "onnx" (ONNX Runtime), "tflite", "opencv" (cv2.dnn) o "keras". Los ONNX
+    salen de convertir_modelo.py y las variantes cuantizadas de cuantizar_modelo.py.
+    """
+    from modelos import obtener_backend_emociones
+    return obtener_backend_emociones(tipo, variante)
+
 def get_fer_detector():
     """
     Intenta cargar el detector FER o proporciona una alternativa
@@ -155,54 +164,54 @@ def get_fer_detector():
     # Si no se puede cargar FER, usar un detector fallback
     class FERFallback:
         def __init__(self):
-            self.face_cascade = None
+            self.detector_rostros = None
             self.prev_emotions = {}  # Para mantener cierta consistencia entre frames
+            self.prev_boxes = {}  # Caja previa de cada cara, para emparejar por solapamiento
+            self.next_face = 0
             self.frame_count = 0  # Contador para cambiar emociones periódicamente
             self.emotion_shift_interval = 15  # Cada cuántos frames cambiar la emoción dominante
             
             try:
-                import cv2
-                from config import CASCADE_FILE
-                
-                # Intentar cargar desde CASCADE_FILE primero
-                if CASCADE_FILE and os.path.exists(CASCADE_FILE):
-                    self.face_cascade = cv2.CascadeClassifier(CASCADE_FILE)
-                    logger.info(f"Detector fallback inicializado con cascade personalizado: {CASCADE_FILE}")
-                else:
-                    # Intentar con la ruta predeterminada
-                    self.face_cascade = cv2.CascadeClassifier(
-                        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                    )
-                    logger.info("Detector fallback inicializado con cascade de OpenCV")
+                # Detección a resolución reducida con la configuración de config.py
+                from deteccion_rostros import crear_detector_rostros
+                self.detector_rostros = crear_detector_rostros()
+                logger.info(f"Detector fallback inicializado con cascade: {self.detector_rostros.cascade_file}")
             except Exception as e:
                 logger.error(f"Error al inicializar detector fallback: {str(e)}")
         
-        def detect_emotions(self, frame):
+        def find_faces(self, frame):
+            """Localiza rostros (misma interfaz que FER.find_faces)"""
+            if self.detector_rostros is None:
+                from deteccion_rostros import crear_detector_rostros
+                self.detector_rostros = crear_detector_rostros()
+            return self.detector_rostros.detectar(frame)
+        
+        def detect_emotions(self, frame, face_rectangles=None):
             """Detecta caras y asigna emociones aleatorias que varían con el tiempo"""
             try:
-                import cv2
-                import numpy as np
                 import random
                 
-                if self.face_cascade is None:
-                    from config import CASCADE_FILE
-                    if CASCADE_FILE and os.path.exists(CASCADE_FILE):
-                        self.face_cascade = cv2.CascadeClassifier(CASCADE_FILE)
-                    else:
-                        self.face_cascade = cv2.CascadeClassifier(
-                            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                        )
-                
                 self.frame_count += 1
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+                faces = self.find_faces(frame) if face_rectangles is None else face_rectangles
                 result = []
                 
                 # Actualizar si es momento de cambiar emociones o si cambió el número de caras
                 should_update = (self.frame_count % self.emotion_shift_interval == 0) or (len(faces) != len(self.prev_emotions))
                 
+                # Emparejar cada cara con la del frame anterior que más se solapa
+                from seguimiento import asociar_cajas
+                prev_ids = list(self.prev_boxes)
+                asignacion = asociar_cajas([self.prev_boxes[k] for k in prev_ids], faces)
+                face_ids = []
+                for previa in asignacion:
+                    if previa >= 0:
+                        face_ids.append(prev_ids[previa])
+                    else:
+                        face_ids.append(f"face_{self.next_face}")
+                        self.next_face += 1
+                
                 for i, (x, y, w, h) in enumerate(faces):
-                    face_id = f"face_{i}"
+                    face_id = face_ids[i]
                     
                     if should_update or face_id not in self.prev_emotions:
                         # Elegir una emoción dominante diferente a la anterior si es posible
@@ -259,8 +268,8 @@ def get_fer_detector():
                 
                 # Limpiar caras que ya no están presentes
                 if len(faces) > 0:
-                    current_face_ids = [f"face_{i}" for i in range(len(faces))]
-                    self.prev_emotions = {k: v for k, v in self.prev_emotions.items() if k in current_face_ids}
+                    self.prev_emotions = {k: v for k, v in self.prev_emotions.items() if k in face_ids}
+                self.prev_boxes = dict(zip(face_ids, (tuple(c) for c in faces)))
                 
                 return result
             except Exception as e: